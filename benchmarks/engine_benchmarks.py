@@ -0,0 +1,366 @@
+#!/usr/bin/env python
+
+"""
+Micro and macro benchmarks for the Minesweeper game engine.
+
+The benchmarks run on headless boards (screen=None) so they measure the game logic only. Results are written to a
+json file which can later be compared against another run to catch regressions on the hot paths:
+
+    python benchmarks/engine_benchmarks.py --output before.json
+    python benchmarks/engine_benchmarks.py --output after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from timeit import default_timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'minesweeper'))
+
+from board import Board
+from highscore.file_manager import FileManager
+
+# The board sizes to benchmark as (rows, cols, mines) keyed by name
+BOARD_SIZES = (
+    ('beginner', (9, 9, 10)),
+    ('intermediate', (16, 16, 40)),
+    ('expert', (16, 30, 99)),
+    ('large', (200, 200, 8000)),
+    ('huge', (1000, 1000, 200000)),
+    ('giant', (2000, 2000, 800000)),
+)
+
+# The number of high score records stored in the file for the FileManager benchmarks
+HIGH_SCORE_RECORDS = 1000
+
+# The observation renderer benchmark renders a batch of boards with about this many tiles in total, at this tile size
+OBSERVATION_BATCH_TILES = 100000
+OBSERVATION_TILE_SIZE = 2
+
+# A benchmark is reported as a regression if it is this much slower than the baseline
+DEFAULT_THRESHOLD = 0.1
+
+
+def parse_args():
+    """
+    Parses the command line arguments
+
+    returns:
+        (argparse.Namespace): An object containing all the arguments
+    """
+
+    size_names = [name for name, _ in BOARD_SIZES]
+
+    parser = argparse.ArgumentParser(description='Benchmarks the Minesweeper game engine')
+
+    parser.add_argument('--sizes', default=','.join(size_names),
+                        help='Comma separated board sizes to benchmark (default: %(default)s)')
+    parser.add_argument('--benchmarks', help='Comma separated benchmarks to run (default: all). Choose from ' +
+                        ','.join(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='The number of times each benchmark is repeated (default: %(default)s)')
+    parser.add_argument('--output', help='The json file to write the results to')
+    parser.add_argument('--compare', help='A json file with baseline results to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='The relative slowdown reported as a regression (default: %(default)s)')
+
+    args = parser.parse_args()
+
+    args.sizes = args.sizes.split(',')
+    for size in args.sizes:
+        if size not in size_names:
+            parser.error('unknown size {}. Choose from {}'.format(size, ','.join(size_names)))
+
+    args.benchmarks = BENCHMARKS.keys() if args.benchmarks is None else args.benchmarks.split(',')
+    for benchmark in args.benchmarks:
+        if benchmark not in BENCHMARKS:
+            parser.error('unknown benchmark {}. Choose from {}'.format(benchmark, ','.join(BENCHMARKS)))
+
+    return args
+
+
+def create_board(rows, cols, mines):
+    """
+    Creates a headless board. The board is seeded so every run places the same mines.
+
+    Args:
+        rows (int): The total number of rows on the board
+        cols (int): The total number of columns on the board
+        mines (int): The total number of mines on the board
+    Returns:
+        Board: The headless board
+    """
+
+    return Board(rows, cols, mines, None, seed=0)
+
+
+def get_center_tile(board):
+    """
+    Args:
+        board (Board): The board
+    Returns:
+        Tile: The tile in the center of the board
+    """
+
+    return board.tile_grid[board.rows / 2][board.cols / 2]
+
+
+def bench_board_construction(rows, cols, mines):
+    """Times creating a board, including all its tiles and their neighbors"""
+    start_time = default_timer()
+    Board(rows, cols, mines, None, seed=0)
+    return default_timer() - start_time
+
+
+def bench_set_neighbors(rows, cols, mines):
+    """Times setting the neighbors of every tile"""
+    board = create_board(rows, cols, mines)
+    for tile in board.flattened_board:
+        tile.neighbors = []
+
+    start_time = default_timer()
+    board.set_neighbors()
+    return default_timer() - start_time
+
+
+def bench_set_mines(rows, cols, mines):
+    """Times randomly distributing the mines"""
+    board = create_board(rows, cols, mines)
+
+    start_time = default_timer()
+    board.set_mines(get_center_tile(board))
+    return default_timer() - start_time
+
+
+def bench_first_click(rows, cols, mines):
+    """Times the first click, which distributes the mines and sets the tile colors"""
+    board = create_board(rows, cols, mines)
+
+    start_time = default_timer()
+    board.first_click(get_center_tile(board))
+    return default_timer() - start_time
+
+
+def bench_worst_case_cascade(rows, cols, mines):
+    """Times a single click which reveals every non-mine tile. All the mines are packed at the bottom of the board."""
+    board = create_board(rows, cols, mines)
+    for tile in board.flattened_board[-mines:]:
+        tile.set_mine()
+    board.set_tile_colors()
+
+    start_time = default_timer()
+    board.left_click_up(board.tile_grid[0][0])
+    return default_timer() - start_time
+
+
+def bench_chord_storm(rows, cols, mines):
+    """Times chording every tile of an opened board on which every mine is flagged"""
+    board = create_board(rows, cols, mines)
+    board.first_click(get_center_tile(board))
+    board.left_click_up(get_center_tile(board))
+    for tile in board.flattened_board:
+        if tile.is_mine:
+            tile.toggle_flag()
+
+    start_time = default_timer()
+    for tile in board.flattened_board:
+        board.left_click_up(tile, is_shortcut_click=True)
+    return default_timer() - start_time
+
+
+def bench_reveal_all_tiles(rows, cols, mines):
+    """Times revealing all the tiles after losing"""
+    board = create_board(rows, cols, mines)
+    board.first_click(get_center_tile(board))
+    losing_tile = next(tile for tile in board.flattened_board if tile.is_mine)
+
+    start_time = default_timer()
+    board.reveal_all_tiles([losing_tile])
+    return default_timer() - start_time
+
+
+def bench_render_observations(rows, cols, mines):
+    """Times rendering a batch of half revealed boards into a NumPy image tensor. Needs numpy."""
+    import numpy
+    from observation_renderer import ObservationRenderer, get_tile_states
+
+    board = create_board(rows, cols, mines)
+    board.first_click(get_center_tile(board))
+    for tile in board.flattened_board[:rows * cols / 2]:
+        if not tile.is_mine:
+            tile.show_value()
+    states = numpy.stack([get_tile_states(board)] * max(1, OBSERVATION_BATCH_TILES / (rows * cols)))
+    renderer = ObservationRenderer(OBSERVATION_TILE_SIZE)
+
+    start_time = default_timer()
+    renderer.render(states)
+    return default_timer() - start_time
+
+
+def write_high_score_file(temp_dir, cols, mines):
+    """
+    Writes a high score file holding HIGH_SCORE_RECORDS records
+
+    Args:
+        temp_dir (str): The directory to write the file to
+        cols (int): The total number of columns on the board of every record
+        mines (int): The total number of mines on the board of every record
+    Returns:
+        str: The high score filename
+    """
+
+    high_score_file = os.path.join(temp_dir, 'high_score.csv')
+    with open(high_score_file, 'w') as f:
+        f.write('rows,cols,mines,highscore\n')
+        for i in xrange(HIGH_SCORE_RECORDS):
+            f.write('{},{},{},999\n'.format(i + 1, cols, mines))
+    return high_score_file
+
+
+def bench_file_manager_load(rows, cols, mines):
+    """Times loading a high score file holding HIGH_SCORE_RECORDS records"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        high_score_file = write_high_score_file(temp_dir, cols, mines)
+
+        start_time = default_timer()
+        FileManager(high_score_file)
+        return default_timer() - start_time
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def bench_file_manager(rows, cols, mines):
+    """Times looking up and saving a high score in a file holding HIGH_SCORE_RECORDS records"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        file_manager = FileManager(write_high_score_file(temp_dir, cols, mines))
+
+        start_time = default_timer()
+        file_manager.get_high_score(rows, cols, mines)
+        file_manager.save_high_score(rows, cols, mines, 100)
+        return default_timer() - start_time
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+# The benchmarks keyed by name. Each takes the board rows, cols and mines and returns the timed duration in seconds.
+BENCHMARKS = {
+    'board_construction': bench_board_construction,
+    'set_neighbors': bench_set_neighbors,
+    'set_mines': bench_set_mines,
+    'first_click': bench_first_click,
+    'worst_case_cascade': bench_worst_case_cascade,
+    'chord_storm': bench_chord_storm,
+    'reveal_all_tiles': bench_reveal_all_tiles,
+    'render_observations': bench_render_observations,
+    'file_manager': bench_file_manager,
+    'file_manager_load': bench_file_manager_load,
+}
+
+# The optional modules some benchmarks need, keyed by benchmark. The benchmarks are skipped if they are missing.
+BENCHMARK_DEPENDENCIES = {
+    'render_observations': 'numpy',
+}
+
+
+def is_module_available(module_name):
+    """
+    Args:
+        module_name (str): A module name
+    Returns:
+        bool: Can the module be imported?
+    """
+
+    try:
+        __import__(module_name)
+    except ImportError:
+        return False
+    return True
+
+
+def run_benchmarks(benchmark_names, size_names, repeat):
+    """
+    Runs the benchmarks on every board size
+
+    Args:
+        benchmark_names (list<str>): The benchmarks to run
+        size_names (list<str>): The board sizes to run them on
+        repeat (int): The number of times each benchmark is repeated
+    Returns:
+        dict<str, dict>: The timings in seconds keyed by '<benchmark>/<size>'
+    """
+
+    missing_dependencies = {benchmark_name: BENCHMARK_DEPENDENCIES[benchmark_name]
+                            for benchmark_name in benchmark_names if benchmark_name in BENCHMARK_DEPENDENCIES and
+                            not is_module_available(BENCHMARK_DEPENDENCIES[benchmark_name])}
+    for benchmark_name, module_name in sorted(missing_dependencies.items()):
+        print 'Skipping {} since {} is not installed'.format(benchmark_name, module_name)
+
+    results = {}
+    for size_name, (rows, cols, mines) in BOARD_SIZES:
+        if size_name not in size_names:
+            continue
+        for benchmark_name in sorted(set(benchmark_names) - set(missing_dependencies)):
+            timings = [BENCHMARKS[benchmark_name](rows, cols, mines) for _ in xrange(repeat)]
+            key = '{}/{}'.format(benchmark_name, size_name)
+            results[key] = {'min': min(timings), 'mean': sum(timings) / len(timings), 'repeat': repeat}
+            print '{:<40} {:>12.6f}s'.format(key, results[key]['min'])
+            sys.stdout.flush()
+
+    return results
+
+
+def compare_results(results, baseline, threshold):
+    """
+    Prints how the results compare to the baseline
+
+    Args:
+        results (dict<str, dict>): The timings of this run
+        baseline (dict<str, dict>): The timings of the baseline run
+        threshold (float): The relative slowdown reported as a regression
+    Returns:
+        list<str>: The benchmarks that regressed
+    """
+
+    regressions = []
+    print
+    print '{:<40} {:>12} {:>12} {:>8}'.format('benchmark', 'baseline', 'current', 'ratio')
+    for key in sorted(results):
+        if key not in baseline:
+            continue
+        ratio = results[key]['min'] / baseline[key]['min'] if baseline[key]['min'] else 1.0
+        is_regression = ratio > 1 + threshold
+        if is_regression:
+            regressions.append(key)
+        print '{:<40} {:>11.6f}s {:>11.6f}s {:>7.2f}x{}'.format(key, baseline[key]['min'], results[key]['min'], ratio,
+                                                                 ' REGRESSION' if is_regression else '')
+
+    return regressions
+
+
+def main():
+    """Runs the benchmarks, writes the results and compares them against the baseline"""
+    args = parse_args()
+
+    results = run_benchmarks(args.benchmarks, args.sizes, args.repeat)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({'python': platform.python_version(), 'platform': platform.platform(), 'time': time.time(),
+                       'results': results}, f, indent=2, sort_keys=True)
+
+    if args.compare is not None:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)['results']
+        if compare_results(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+
+"""
+End-to-end input replay benchmark for the Minesweeper game.
+
+A Game is created under the dummy SDL video driver and fed a scripted stream of synthetic pygame events (clicks,
+flags, chords and mouse motion sweeps) through the real Game.event_handler. The stream is generated from a seeded
+random number generator so every run plays the same moves. For each kind of input the benchmark reports the
+event-to-handled latency and the overall throughput:
+
+    python benchmarks/input_replay_benchmark.py --rows 100 --cols 100 --mines 2000 --moves 5000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+from timeit import default_timer
+
+os.environ['SDL_VIDEODRIVER'] = 'dummy'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'minesweeper'))
+
+import pygame
+from pygame.locals import MOUSEMOTION, MOUSEBUTTONUP, MOUSEBUTTONDOWN
+from game import Game
+from histogram import Histogram
+from instrumentation import DURATION_BUCKETS
+from constants import LEFT_CLICK, RIGHT_CLICK
+import frame_scheduler
+
+# The kinds of input in the scripted stream and how often each one is picked
+INPUT_WEIGHTS = (('click', 5), ('flag', 2), ('chord', 2), ('motion_sweep', 1))
+
+# The number of motion events in a single sweep. A sweep is delivered as one batch, like a fast mouse movement.
+SWEEP_LENGTH = 50
+
+
+def parse_args():
+    """
+    Parses the command line arguments
+
+    returns:
+        (argparse.Namespace): An object containing all the arguments
+    """
+
+    parser = argparse.ArgumentParser(description='Replays synthetic input through the Minesweeper game')
+
+    parser.add_argument('--rows', '-r', type=int, default=16)
+    parser.add_argument('--cols', '-c', type=int, default=30)
+    parser.add_argument('--mines', '-m', type=int, default=99)
+    parser.add_argument('--moves', type=int, default=2000, help='The number of moves to replay (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='The random seed (default: %(default)s)')
+    parser.add_argument('--with-display', action='store_true',
+                        help='Include rendering the frame in the latency of each batch')
+
+    return parser.parse_args()
+
+
+def mouse_event(event_type, tile, button=None):
+    """
+    Creates a synthetic mouse event in the center of a tile
+
+    Args:
+        event_type (int): MOUSEMOTION, MOUSEBUTTONDOWN or MOUSEBUTTONUP
+        tile (Tile): The tile the event happens on
+        button (int|None): The mouse button for button events. Defaults to None.
+    Returns:
+        pygame.event.Event: The event
+    """
+
+    if event_type == MOUSEMOTION:
+        return pygame.event.Event(event_type, pos=tile.location.center, rel=(0, 0), buttons=(0, 0, 0))
+    return pygame.event.Event(event_type, pos=tile.location.center, button=button)
+
+
+def generate_batches(game, rng, moves):
+    """
+    Generates the scripted input. Each move is one or more batches of events, where a batch is handled in a single
+    call to Game.event_handler, like the events pending when the game loop wakes up.
+    The moves look at the board to pick sensible tiles, so they are generated lazily as the game progresses.
+
+    Args:
+        game (Game): The game being played
+        rng (random.Random): The random number generator picking the moves
+        moves (int): The number of moves to generate
+    Yields:
+        (str, list<pygame.event.Event>): The kind of input and the batch of events
+    """
+
+    kinds = [kind for kind, weight in INPUT_WEIGHTS for _ in xrange(weight)]
+
+    for _ in xrange(moves):
+        board = game.board
+
+        # Restart once the game is over. Winning is avoided so the high score file is never touched.
+        if game.is_game_over or game.num_of_hidden_non_mines_tiles <= game.cols:
+            reset_position = game.reset_button.rect.center
+            yield 'reset', [pygame.event.Event(MOUSEBUTTONUP, pos=reset_position, button=LEFT_CLICK)]
+            continue
+
+        kind = 'click' if game.is_new_game else rng.choice(kinds)
+        chord_tiles = [tile for tile in board.flattened_board if tile.is_shown and tile.value > 0]
+        if kind == 'chord' and not chord_tiles:
+            kind = 'click'
+
+        if kind == 'click':
+            tiles = [tile for tile in board.flattened_board if not tile.is_shown and not tile.is_mine]
+            tile = rng.choice(tiles)
+            yield kind, [mouse_event(MOUSEBUTTONDOWN, tile, LEFT_CLICK)]
+            yield kind, [mouse_event(MOUSEBUTTONUP, tile, LEFT_CLICK)]
+        elif kind == 'flag':
+            tile = rng.choice([tile for tile in board.flattened_board if not tile.is_shown])
+            yield kind, [mouse_event(MOUSEBUTTONDOWN, tile, RIGHT_CLICK)]
+            yield kind, [mouse_event(MOUSEBUTTONUP, tile, RIGHT_CLICK)]
+        elif kind == 'chord':
+            tile = rng.choice(chord_tiles)
+            yield kind, [mouse_event(MOUSEBUTTONDOWN, tile, LEFT_CLICK)]
+            yield kind, [mouse_event(MOUSEBUTTONDOWN, tile, RIGHT_CLICK)]
+            yield kind, [mouse_event(MOUSEBUTTONUP, tile, RIGHT_CLICK)]
+            yield kind, [mouse_event(MOUSEBUTTONUP, tile, LEFT_CLICK)]
+        else:
+            row = rng.randrange(board.rows)
+            yield kind, [mouse_event(MOUSEMOTION, board.tile_grid[row][i * board.cols / SWEEP_LENGTH])
+                         for i in xrange(SWEEP_LENGTH)]
+
+
+def replay(game, batches, with_display):
+    """
+    Feeds the batches of events through the game and measures how long each batch takes to handle
+
+    Args:
+        game (Game): The game to feed the events to
+        batches (iterator<(str, list<pygame.event.Event>)>): The kind of input and the batch of events
+        with_display (bool): Should rendering the frame be included in the latency of each batch?
+    Returns:
+        (dict<str, Histogram>, int, float): The latency histograms (in milliseconds) keyed by the kind of input,
+            the total number of events and the total time (in seconds) spent handling them
+    """
+
+    latencies = {}
+    num_of_events = 0
+    total_time = 0
+
+    for kind, events in batches:
+        start_time = default_timer()
+        game.event_handler(events)
+        if with_display:
+            frame_scheduler.render_frame()
+        elapsed_time = default_timer() - start_time
+
+        if kind not in latencies:
+            latencies[kind] = Histogram(DURATION_BUCKETS)
+        latencies[kind].add(elapsed_time * 1000)
+        num_of_events += len(events)
+        total_time += elapsed_time
+
+    return latencies, num_of_events, total_time
+
+
+def main():
+    """Replays the scripted input and prints the latency and throughput"""
+    args = parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        game = Game(args.rows, args.cols, args.mines, high_score_file=os.path.join(temp_dir, 'high_score.csv'),
+                    seed=args.seed, leaderboard_file=os.path.join(temp_dir, 'leaderboard.csv'),
+                    stats_file=os.path.join(temp_dir, 'game_history.csv'), replay_dir=temp_dir,
+                    save_file=os.path.join(temp_dir, 'saved_game.msav'))
+        batches = generate_batches(game, random.Random(args.seed), args.moves)
+        latencies, num_of_events, total_time = replay(game, batches, args.with_display)
+        game.writer.close()
+    finally:
+        shutil.rmtree(temp_dir)
+
+    print '{:<14} {:>8} {:>10} {:>10} {:>10}'.format('input', 'batches', 'mean ms', 'p99 ms', 'max ms')
+    for kind in sorted(latencies):
+        summary = latencies[kind].as_dict()
+        print '{:<14} {:>8} {:>10.3f} {:>10.3f} {:>10.3f}'.format(kind, summary['count'], summary['mean'],
+                                                                  summary['p99'], summary['max'])
+    print
+    print '{} events in {:.3f}s: {:.0f} events/s'.format(num_of_events, total_time, num_of_events / total_time)
+
+
+if __name__ == '__main__':
+    main()
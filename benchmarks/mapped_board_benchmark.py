@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+"""
+Benchmark for memory-mapped giant puzzle boards.
+
+Creates a board file, opens it again and plays random reveals of safe tiles on it, reporting the time of each step
+and the resident set size of the process, which should only grow with the regions played rather than the board size:
+
+    python benchmarks/mapped_board_benchmark.py --rows 10000 --cols 10000 --mines 16000000
+    python benchmarks/mapped_board_benchmark.py --rows 30000 --cols 30000 --mines 144000000 --moves 10000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+from timeit import default_timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'minesweeper'))
+
+from mapped_board import MappedBoard
+from memory_report import get_rss
+
+# The fraction of the tiles that are mines unless --mines is given, about the density of an expert board
+DEFAULT_MINE_DENSITY = 0.16
+
+
+def parse_args():
+    """
+    Parses the command line arguments
+
+    returns:
+        (argparse.Namespace): An object containing all the arguments
+    """
+
+    parser = argparse.ArgumentParser(description='Benchmarks memory-mapped giant boards')
+
+    parser.add_argument('--rows', '-r', type=int, default=10000)
+    parser.add_argument('--cols', '-c', type=int, default=10000)
+    parser.add_argument('--mines', '-m', type=int,
+                        help='The number of mines (default: {:.0f}%% of the tiles)'.format(100 * DEFAULT_MINE_DENSITY))
+    parser.add_argument('--moves', type=int, default=2000,
+                        help='The number of random safe reveals after the start tile (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='The random seed (default: %(default)s)')
+    parser.add_argument('--dir', help='The directory to create the board file in (default: a temporary directory)')
+
+    args = parser.parse_args()
+    if args.mines is None:
+        args.mines = int(args.rows * args.cols * DEFAULT_MINE_DENSITY)
+    return args
+
+
+def print_step(name, elapsed_time):
+    """
+    Args:
+        name (str): The name of the step
+        elapsed_time (float): The time (in seconds) the step took
+    """
+
+    rss = get_rss()
+    print '{:<24} {:>10.4f}s {:>10}'.format(name, elapsed_time, 'n/a' if rss is None else
+                                            '{:.1f} MB'.format(rss / 1024.0 ** 2))
+
+
+def main():
+    """Creates, opens and plays a mapped board and prints the time and memory of each step"""
+    args = parse_args()
+
+    temp_dir = tempfile.mkdtemp(dir=args.dir)
+    board_file = os.path.join(temp_dir, 'board.msmb')
+    try:
+        print '{}x{} with {} mines'.format(args.rows, args.cols, args.mines)
+        print '{:<24} {:>11} {:>10}'.format('step', 'time', 'RSS')
+
+        start_time = default_timer()
+        MappedBoard.create(board_file, args.rows, args.cols, args.mines, args.seed).close()
+        print_step('create', default_timer() - start_time)
+
+        start_time = default_timer()
+        board = MappedBoard(board_file)
+        print_step('open', default_timer() - start_time)
+
+        start_time = default_timer()
+        board.reveal(board.start_tile_index)
+        print_step('reveal start tile', default_timer() - start_time)
+
+        # Seeded apart from the board, whose mines were picked by the same sequence of random tiles
+        rng = random.Random(args.seed + 1)
+        size = args.rows * args.cols
+        num_of_moves = num_of_revealed_tiles = 0
+        start_time = default_timer()
+        while num_of_moves < args.moves and not board.is_game_over:
+            tile_index = rng.randrange(size)
+            if not board.is_mine(tile_index) and not board.is_shown(tile_index):
+                num_of_revealed_tiles += board.reveal(tile_index).non_mines_uncovered
+                num_of_moves += 1
+        print_step('{} reveals'.format(num_of_moves), default_timer() - start_time)
+
+        start_time = default_timer()
+        board.flush()
+        print_step('flush (save)', default_timer() - start_time)
+        board.close()
+
+        print
+        print 'Revealed {} tiles. The board file takes {:.1f} MB ({:.1f} MB on disk).'.format(
+            num_of_revealed_tiles, os.path.getsize(board_file) / 1024.0 ** 2,
+            os.stat(board_file).st_blocks * 512 / 1024.0 ** 2)
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
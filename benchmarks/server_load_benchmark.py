@@ -0,0 +1,331 @@
+#!/usr/bin/env python
+
+"""
+Load generator for the Minesweeper game server.
+
+Many concurrent sessions are opened to the server and each one plays seeded random moves (reveals and flags of hidden
+tiles and chords of numbered tiles), waiting for the response to a move before sending the next one and starting a new
+game whenever its game is over. The sessions only learn the board from the deltas of the responses. The benchmark
+reports the number of moves per second and the move latency as seen by the clients:
+
+    python benchmarks/server_load_benchmark.py --sessions 2000 --duration 10
+    python benchmarks/server_load_benchmark.py --address /tmp/minesweeper.sock --client-processes 4
+
+Unless --address points at a running server, a server is started in a child process for the benchmark. Each session
+uses a file descriptor on both ends, so the open file limit is raised as far as allowed.
+"""
+
+import argparse
+import asynchat
+import asyncore
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import socket
+import sys
+import tempfile
+import time
+from timeit import default_timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'minesweeper'))
+
+from histogram import Histogram
+from server import protocol
+from server.game_server import GameServer
+
+# The kinds of move the sessions play and how often each one is picked
+MOVE_WEIGHTS = ((protocol.REVEAL, 6), (protocol.FLAG, 2), (protocol.CHORD, 2))
+
+# The bucket upper bounds (in milliseconds) of the latency histogram
+LATENCY_BUCKETS = tuple(0.05 * 2 ** (i / 2.0) for i in xrange(30))
+
+
+def parse_args():
+    """
+    Parses the command line arguments
+
+    returns:
+        (argparse.Namespace): An object containing all the arguments
+    """
+
+    parser = argparse.ArgumentParser(description='Generates load on the Minesweeper game server')
+
+    parser.add_argument('--address', help='The HOST:PORT or Unix socket path of a running server (default: start a '
+                                          'server on a temporary Unix socket)')
+    parser.add_argument('--sessions', type=int, default=1000,
+                        help='The number of concurrent sessions (default: %(default)s)')
+    parser.add_argument('--duration', type=float, default=10,
+                        help='How long (in seconds) to generate load (default: %(default)s)')
+    parser.add_argument('--client-processes', type=int, default=1,
+                        help='The number of processes the sessions are spread over (default: %(default)s)')
+    parser.add_argument('--rows', '-r', type=int, default=16)
+    parser.add_argument('--cols', '-c', type=int, default=30)
+    parser.add_argument('--mines', '-m', type=int, default=99)
+    parser.add_argument('--seed', type=int, default=0, help='The random seed (default: %(default)s)')
+
+    return parser.parse_args()
+
+
+class LoadSession(asynchat.async_chat):
+    """
+    This class represents a single client session which plays random moves as fast as the server answers them
+    """
+
+    def __init__(self, address, args, rng, latencies, socket_map):
+        """
+        Args:
+            address (str): The server address
+            args (argparse.Namespace): The benchmark arguments
+            rng (random.Random): The random number generator picking the moves
+            latencies (Histogram): The histogram the move latencies (in milliseconds) are added to
+            socket_map (dict): The asyncore socket map of the process
+        """
+
+        asynchat.async_chat.__init__(self, map=socket_map)
+        self.set_terminator(protocol.TERMINATOR)
+        self.args = args
+        self.rng = rng
+        self.latencies = latencies
+        self.moves = [move for move, weight in MOVE_WEIGHTS for _ in xrange(weight)]
+        self.buffered_data = []
+        self.sent_time = None
+        self.is_stopping = False
+        self.num_of_errors = 0
+        self.num_of_games = 0
+        self.hidden_tiles = []
+        self.hidden_tile_positions = []
+        self.numbered_tiles = []
+
+        family, socket_address = protocol.parse_address(address)
+        self.create_socket(family, socket.SOCK_STREAM)
+        self.connect(socket_address)
+
+    def handle_connect(self):
+        """Starts the first game"""
+        self.send_new_game()
+
+    def collect_incoming_data(self, data):
+        """
+        Args:
+            data (str): Part of a response line
+        """
+
+        self.buffered_data.append(data)
+
+    def found_terminator(self):
+        """Measures the latency of the response and sends the next move"""
+        self.latencies.add((default_timer() - self.sent_time) * 1000)
+        response = protocol.decode(''.join(self.buffered_data))
+        self.buffered_data = []
+
+        if 'error' in response:
+            self.num_of_errors += 1
+        for tile_index, value in response.get('shown', ()):
+            self.remove_hidden_tile(tile_index)
+            if value > 0:
+                self.numbered_tiles.append(tile_index)
+
+        if self.is_stopping:
+            self.close()
+        elif response.get('state') != protocol.PLAYING:
+            self.send_new_game()
+        else:
+            move = self.rng.choice(self.moves)
+            if move == protocol.CHORD and self.numbered_tiles:
+                tile_index = self.rng.choice(self.numbered_tiles)
+            else:
+                move = protocol.REVEAL if move == protocol.CHORD else move
+                tile_index = self.rng.choice(self.hidden_tiles)
+            self.send_request({'cmd': move, 'tile': tile_index})
+
+    def remove_hidden_tile(self, tile_index):
+        """
+        Removes a tile the server showed from the hidden tiles. The last hidden tile takes its place, so this costs
+        O(1).
+
+        Args:
+            tile_index (int): The tile index
+        """
+
+        position = self.hidden_tile_positions[tile_index]
+        last_tile_index = self.hidden_tiles.pop()
+        if last_tile_index != tile_index:
+            self.hidden_tiles[position] = last_tile_index
+            self.hidden_tile_positions[last_tile_index] = position
+
+    def send_new_game(self):
+        """Starts a new game. The session keeps track of the hidden and numbered tiles from the deltas it receives."""
+        num_of_tiles = self.args.rows * self.args.cols
+        self.hidden_tiles = range(num_of_tiles)
+        self.hidden_tile_positions = range(num_of_tiles)
+        self.numbered_tiles = []
+        self.num_of_games += 1
+        self.send_request({'cmd': protocol.NEW, 'rows': self.args.rows, 'cols': self.args.cols,
+                           'mines': self.args.mines, 'seed': self.rng.randrange(2 ** 31)})
+
+    def send_request(self, request):
+        """
+        Args:
+            request (dict): The request to send
+        """
+
+        self.sent_time = default_timer()
+        self.push(protocol.encode(request))
+
+    def handle_close(self):
+        """The server hung up"""
+        self.close()
+
+
+def run_sessions(address, args, num_of_sessions, seed):
+    """
+    Runs sessions for the duration of the benchmark
+
+    Args:
+        address (str): The server address
+        args (argparse.Namespace): The benchmark arguments
+        num_of_sessions (int): The number of sessions to run
+        seed (int): The seed of the random number generator picking the moves
+    Returns:
+        (dict, int, int): The latency histogram state (see Histogram.get_state), the number of error responses and the
+            number of games started
+    """
+
+    raise_open_file_limit()
+    rng = random.Random(seed)
+    latencies = Histogram(LATENCY_BUCKETS)
+    socket_map = {}
+    sessions = [LoadSession(address, args, random.Random(rng.random()), latencies, socket_map)
+                for _ in xrange(num_of_sessions)]
+
+    end_time = time.time() + args.duration
+    while socket_map and time.time() < end_time:
+        asyncore.loop(timeout=0.1, use_poll=True, map=socket_map, count=1)
+
+    # Let the moves in flight finish so that their latency is counted
+    for session in sessions:
+        session.is_stopping = True
+    asyncore.loop(timeout=0.1, use_poll=True, map=socket_map)
+
+    return (latencies.get_state(), sum(session.num_of_errors for session in sessions),
+            sum(session.num_of_games for session in sessions))
+
+
+def run_sessions_star(run_sessions_args):
+    """
+    Unpacks the arguments of run_sessions. Pool.map passes a single argument.
+
+    Args:
+        run_sessions_args (tuple): The arguments of run_sessions
+    Returns:
+        (dict, int, int): The result of run_sessions
+    """
+
+    return run_sessions(*run_sessions_args)
+
+
+def serve(address):
+    """
+    Runs a game server until the process is terminated
+
+    Args:
+        address (str): The server address
+    """
+
+    raise_open_file_limit()
+    GameServer(address).serve_forever()
+
+
+def raise_open_file_limit():
+    """Raises the soft limit of open files to the hard limit"""
+    _, hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard_limit, hard_limit))
+
+
+def wait_for_server(address, timeout=10):
+    """
+    Waits until the server accepts connections
+
+    Args:
+        address (str): The server address
+        timeout (float): How long (in seconds) to wait. Defaults to 10.
+    Raises:
+        socket.error: The server did not start in time
+    """
+
+    family, socket_address = protocol.parse_address(address)
+    deadline = time.time() + timeout
+    while True:
+        probe = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_address)
+            return
+        except socket.error:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.05)
+        finally:
+            probe.close()
+
+
+def main():
+    """Generates load on the server and prints the throughput and latency"""
+    args = parse_args()
+
+    temp_dir = None
+    server_process = None
+    address = args.address
+    if address is None:
+        temp_dir = tempfile.mkdtemp()
+        address = os.path.join(temp_dir, 'minesweeper.sock')
+        server_process = multiprocessing.Process(target=serve, args=(address,))
+        server_process.start()
+
+    try:
+        wait_for_server(address)
+        sessions_per_process = [args.sessions / args.client_processes + (i < args.sessions % args.client_processes)
+                                for i in xrange(args.client_processes)]
+        run_sessions_args = [(address, args, num_of_sessions, args.seed + i)
+                             for i, num_of_sessions in enumerate(sessions_per_process)]
+
+        start_time = default_timer()
+        if args.client_processes == 1:
+            results = [run_sessions_star(run_sessions_args[0])]
+        else:
+            pool = multiprocessing.Pool(args.client_processes)
+            try:
+                results = pool.map(run_sessions_star, run_sessions_args)
+            finally:
+                pool.close()
+                pool.join()
+        elapsed_time = default_timer() - start_time
+    finally:
+        if server_process is not None:
+            server_process.terminate()
+            server_process.join()
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir)
+
+    latencies = Histogram(LATENCY_BUCKETS)
+    for state, _, _ in results:
+        process_latencies = Histogram.from_state(LATENCY_BUCKETS, state)
+        latencies.counts = [count + process_count
+                            for count, process_count in zip(latencies.counts, process_latencies.counts)]
+        latencies.count += process_latencies.count
+        latencies.total += process_latencies.total
+        latencies.max = max(latencies.max, process_latencies.max)
+    num_of_errors = sum(errors for _, errors, _ in results)
+    num_of_games = sum(games for _, _, games in results)
+
+    summary = latencies.as_dict()
+    print '{} sessions on {} over {:.1f}s'.format(args.sessions, address, elapsed_time)
+    print '{} moves in {} games: {:.0f} moves/s, {} errors'.format(summary['count'], num_of_games,
+                                                                   summary['count'] / elapsed_time, num_of_errors)
+    print 'latency ms: mean {:.3f}, p50 {:.3f}, p99 {:.3f}, max {:.3f}'.format(summary['mean'], summary['p50'],
+                                                                              summary['p99'], summary['max'])
+
+
+if __name__ == '__main__':
+    main()
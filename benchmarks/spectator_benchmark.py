@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+
+"""
+Fan-out benchmark for the spectator broadcast.
+
+A headless game plays seeded random moves (flagging mines and revealing safe tiles) and publishes them through a
+SpectatorBroadcaster while viewers, run in child processes, watch it. Each viewer rebuilds the board from the snapshot
+and the deltas it receives. The benchmark reports the publish cost per move on the game side, which should not grow
+with the number of viewers, and checks that every viewer ends up with the final board:
+
+    python benchmarks/spectator_benchmark.py --viewers 1000 --moves 20000
+    python benchmarks/spectator_benchmark.py --viewers 200 --slow-viewers 20
+
+Slow viewers read with a delay, so they fall behind the ring of messages and have to skip ahead.
+"""
+
+import argparse
+import asynchat
+import asyncore
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import socket
+import sys
+import tempfile
+import time
+from timeit import default_timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'minesweeper'))
+
+from headless_game import HeadlessGame
+from server import protocol
+from server.spectator import SpectatorBroadcaster, HIDDEN, FLAGGED, MINE
+
+
+def parse_args():
+    """
+    Parses the command line arguments
+
+    returns:
+        (argparse.Namespace): An object containing all the arguments
+    """
+
+    parser = argparse.ArgumentParser(description='Benchmarks broadcasting a game to spectators')
+
+    parser.add_argument('--viewers', type=int, default=200, help='The number of viewers (default: %(default)s)')
+    parser.add_argument('--slow-viewers', type=int, default=0,
+                        help='How many of the viewers read slowly (default: %(default)s)')
+    parser.add_argument('--viewer-processes', type=int, default=2,
+                        help='The number of processes the viewers are spread over (default: %(default)s)')
+    parser.add_argument('--moves', type=int, default=5000, help='The number of moves to play (default: %(default)s)')
+    parser.add_argument('--rows', '-r', type=int, default=100)
+    parser.add_argument('--cols', '-c', type=int, default=100)
+    parser.add_argument('--mines', '-m', type=int, default=1500)
+    parser.add_argument('--seed', type=int, default=0, help='The random seed (default: %(default)s)')
+
+    return parser.parse_args()
+
+
+class WatchingViewer(asynchat.async_chat):
+    """
+    This class represents a single viewer which rebuilds the board from what it receives
+    """
+
+    def __init__(self, socket_address, family, is_slow, socket_map):
+        """
+        Args:
+            socket_address ((str, int)|str): The socket address of the broadcaster
+            family (int): The socket family
+            is_slow (bool): Should the viewer only read a little at a time?
+            socket_map (dict): The asyncore socket map of the process
+        """
+
+        asynchat.async_chat.__init__(self, map=socket_map)
+        self.set_terminator(protocol.TERMINATOR)
+        self.is_slow = is_slow
+        self.buffered_data = []
+        self.tiles = None
+        self.last_seq = 0
+        self.num_of_boards = 0
+        self.next_read_time = 0
+
+        self.create_socket(family, socket.SOCK_STREAM)
+        self.connect(socket_address)
+
+    def handle_connect(self):
+        pass
+
+    def readable(self):
+        """
+        Returns:
+            bool: Should the viewer read now? A slow viewer reads at most every 10 ms.
+        """
+
+        return not self.is_slow or time.time() >= self.next_read_time
+
+    def handle_read(self):
+        """Reads what was received. A slow viewer only reads a small chunk."""
+        if self.is_slow:
+            self.ac_in_buffer_size = 512
+            self.next_read_time = time.time() + 0.01
+        asynchat.async_chat.handle_read(self)
+
+    def collect_incoming_data(self, data):
+        """
+        Args:
+            data (str): Part of a message line
+        """
+
+        self.buffered_data.append(data)
+
+    def found_terminator(self):
+        """Applies a message to the board"""
+        message = json.loads(''.join(self.buffered_data))
+        self.buffered_data = []
+        self.last_seq = message['seq']
+
+        if 'board' in message:
+            self.tiles = bytearray(str(message['board']['tiles']))
+            self.num_of_boards += 1
+        shown = message.get('shown', ())
+        for i in xrange(0, len(shown), 2):
+            self.tiles[shown[i]] = str(shown[i + 1])
+        if 'flag' in message:
+            tile_index, is_flagged = message['flag']
+            self.tiles[tile_index] = FLAGGED if is_flagged else HIDDEN
+        for tile_index in message.get('mines', ()):
+            self.tiles[tile_index] = MINE
+
+    def handle_close(self):
+        self.close()
+
+
+def watch(address, num_of_viewers, num_of_slow_viewers, last_seq, ready, results):
+    """
+    Runs viewers until they all received the last message
+
+    Args:
+        address (str): The broadcaster address
+        num_of_viewers (int): The number of viewers
+        num_of_slow_viewers (int): How many of the viewers read slowly
+        last_seq (multiprocessing.Value): The seq of the last message, set once the game published it
+        ready (multiprocessing.Event): Set once all the viewers are connected
+        results (multiprocessing.Queue): Gets the final board (or None) and number of boards of every viewer
+    """
+
+    _, hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard_limit, hard_limit))
+
+    family, socket_address = protocol.parse_address(address)
+    socket_map = {}
+    viewers = [WatchingViewer(socket_address, family, i < num_of_slow_viewers, socket_map)
+               for i in xrange(num_of_viewers)]
+    while socket_map and any(viewer.tiles is None for viewer in viewers):
+        asyncore.loop(timeout=0.01, use_poll=True, map=socket_map, count=1)
+    ready.set()
+
+    while socket_map and (last_seq.value == 0 or any(viewer.last_seq < last_seq.value for viewer in viewers)):
+        asyncore.loop(timeout=0.01, use_poll=True, map=socket_map, count=1)
+
+    for viewer in viewers:
+        results.put((str(viewer.tiles) if viewer.last_seq == last_seq.value else None, viewer.num_of_boards))
+        viewer.close()
+
+
+def play(broadcaster, args):
+    """
+    Plays random moves and publishes them. A new game starts whenever a game is over.
+
+    Args:
+        broadcaster (SpectatorBroadcaster): The broadcaster
+        args (argparse.Namespace): The benchmark arguments
+    Returns:
+        float: The total time (in seconds) spent publishing
+    """
+
+    rng = random.Random(args.seed)
+    publish_time = 0
+    game = None
+    for _ in xrange(args.moves):
+        if game is None or game.is_game_over:
+            game = HeadlessGame(args.rows, args.cols, args.mines, rng.getrandbits(32))
+            start_time = default_timer()
+            broadcaster.publish_board(game.board, 0, args.mines)
+            publish_time += default_timer() - start_time
+
+        # The game side knows where the mines are, so the moves flag mines and reveal the other tiles to keep the game
+        # going. The game is only over once it is won.
+        tile_index = rng.randrange(args.rows * args.cols)
+        if not game.is_new_game and game.get_tile(tile_index).is_mine:
+            change_in_unflagged_mines = game.flag(tile_index)
+            start_time = default_timer()
+            if change_in_unflagged_mines:
+                broadcaster.publish_flag(game.get_tile(tile_index))
+        else:
+            tile_reveal_result = game.reveal(tile_index)
+            start_time = default_timer()
+            broadcaster.publish_shown(tile_reveal_result.revealed_tiles)
+            if game.is_game_over:
+                broadcaster.publish_end(game.board, game.is_game_lost)
+        publish_time += default_timer() - start_time
+
+    return publish_time
+
+
+def main():
+    """Broadcasts random moves to the viewers and prints the publish cost and whether the viewers kept up"""
+    args = parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    address = os.path.join(temp_dir, 'spectator.sock')
+    broadcaster = SpectatorBroadcaster(address)
+    broadcaster.publish_board(HeadlessGame(args.rows, args.cols, args.mines).board, 0, args.mines)
+
+    last_seq = multiprocessing.Value('l', 0)
+    results = multiprocessing.Queue()
+    processes = []
+    try:
+        for i in xrange(args.viewer_processes):
+            ready = multiprocessing.Event()
+            num_of_viewers = args.viewers / args.viewer_processes + (i < args.viewers % args.viewer_processes)
+            num_of_slow_viewers = args.slow_viewers / args.viewer_processes + \
+                (i < args.slow_viewers % args.viewer_processes)
+            process = multiprocessing.Process(target=watch, args=(address, num_of_viewers, num_of_slow_viewers,
+                                                                  last_seq, ready, results))
+            process.start()
+            processes.append((process, ready))
+        for _, ready in processes:
+            ready.wait()
+
+        start_time = default_timer()
+        publish_time = play(broadcaster, args)
+        last_seq.value = broadcaster.last_seq
+        viewer_results = [results.get() for _ in xrange(args.viewers)]
+        elapsed_time = default_timer() - start_time
+    finally:
+        for process, _ in processes:
+            process.join()
+        broadcaster.close()
+        shutil.rmtree(temp_dir)
+
+    with broadcaster.lock:
+        final_tiles = str(broadcaster.tiles)
+    num_of_correct_viewers = sum(1 for tiles, _ in viewer_results if tiles == final_tiles)
+    num_of_boards = sum(num_of_boards for _, num_of_boards in viewer_results)
+
+    print '{} moves ({} messages) to {} viewers ({} slow) in {:.2f}s'.format(
+        args.moves, broadcaster.last_seq, args.viewers, args.slow_viewers, elapsed_time)
+    print 'publish cost: {:.1f} us per move'.format(publish_time / args.moves * 10 ** 6)
+    print 'boards received: {} ({:.1f} per viewer)'.format(num_of_boards, num_of_boards / float(args.viewers))
+    print 'viewers with the final board: {}/{}'.format(num_of_correct_viewers, args.viewers)
+    sys.exit(0 if num_of_correct_viewers == args.viewers else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+
+"""
+Overhead benchmark for the telemetry pipeline.
+
+Records a stream of game-like events (reveals, flags and frames) as fast as possible and reports the cost per event
+on the recording side, then reads the telemetry files back and checks that every event was either written or counted
+as dropped:
+
+    python benchmarks/telemetry_benchmark.py --events 1000000
+    python benchmarks/telemetry_benchmark.py --events 200000 --rate 20000
+    python benchmarks/telemetry_benchmark.py --events 1000000 --stall 2
+
+Unpaced, the events arrive far faster than any game records them and the telemetry thread cannot keep up, so most of
+them are dropped. With --stall, every write of the telemetry thread first sleeps as if the disk had stalled, so the
+ring buffer fills up and events are dropped while the memory used stays bounded.
+"""
+
+import argparse
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from timeit import default_timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'minesweeper'))
+
+import telemetry
+from telemetry import Telemetry, read_events
+
+# The number of events recorded between two pauses when the events are paced
+PACING_EVENTS = 100
+
+
+def parse_args():
+    """
+    Parses the command line arguments
+
+    returns:
+        (argparse.Namespace): An object containing all the arguments
+    """
+
+    parser = argparse.ArgumentParser(description='Benchmarks recording telemetry events')
+
+    parser.add_argument('--events', type=int, default=200000,
+                        help='The number of events to record (default: %(default)s)')
+    parser.add_argument('--rate', type=int, default=0,
+                        help='Events recorded per second or 0 to record them as fast as possible '
+                             '(default: %(default)s)')
+    parser.add_argument('--stall', type=float, default=0,
+                        help='Seconds every telemetry write sleeps first, simulating a stalled disk '
+                             '(default: %(default)s)')
+    parser.add_argument('--ring-size', type=int, default=telemetry.RING_SIZE,
+                        help='The number of events the ring buffer holds (default: %(default)s)')
+
+    return parser.parse_args()
+
+
+def record_events(recorder, num_of_events, rate):
+    """
+    Records a stream of reveals, flags and frames
+
+    Args:
+        recorder (Telemetry): The telemetry to record into
+        num_of_events (int): The number of events to record
+        rate (int): The events recorded per second or 0 to record them as fast as possible
+    Returns:
+        float: The time (in seconds) spent recording, not counting the pauses
+    """
+
+    elapsed_time = 0
+    first_start_time = start_time = default_timer()
+    for i in xrange(num_of_events):
+        if rate and i % PACING_EVENTS == 0:
+            elapsed_time += default_timer() - start_time
+            time.sleep(max(0, first_start_time + float(i) / rate - default_timer()))
+            start_time = default_timer()
+        kind = i % 4
+        if kind == 0:
+            recorder.record('reveal', row=i % 100, col=i % 77, tiles=1 + i % 13)
+        elif kind == 1:
+            recorder.record('flag', row=i % 100, col=i % 77, flagged=True)
+        else:
+            recorder.record('frame', events=1, ms=0.25)
+    return elapsed_time + default_timer() - start_time
+
+
+def main():
+    """Records the events and prints the cost per event and how many were written and dropped"""
+    args = parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        recorder = Telemetry(temp_dir, ring_size=args.ring_size)
+        if args.stall:
+            write = recorder.write
+
+            def stalled_write(data):
+                time.sleep(args.stall)
+                write(data)
+            recorder.write = stalled_write
+
+        elapsed_time = record_events(recorder, args.events, args.rate)
+        close_start_time = default_timer()
+        recorder.close()
+        close_time = default_timer() - close_start_time
+
+        file_names = sorted(os.path.join(temp_dir, file_name) for file_name in os.listdir(temp_dir))
+        num_of_bytes = sum(os.path.getsize(file_name) for file_name in file_names)
+        num_of_written_events = 0
+        num_of_dropped_events = 0
+        for event in read_events(file_names):
+            if event['event'] == 'dropped':
+                num_of_dropped_events += event['events']
+            else:
+                num_of_written_events += 1
+    finally:
+        shutil.rmtree(temp_dir)
+
+    print 'Recorded {} events in {:.3f}s: {:.0f} ns per event'.format(args.events, elapsed_time,
+                                                                     elapsed_time / args.events * 1e9)
+    print 'Written: {} events to {} files ({} bytes, {:.1f} bytes per event)'.format(
+        num_of_written_events, len(file_names), num_of_bytes, float(num_of_bytes) / max(num_of_written_events, 1))
+    print 'Dropped: {} events'.format(num_of_dropped_events)
+    print 'Closing (final flush) took {:.3f}s'.format(close_time)
+    print 'Peak RSS: {} MB'.format(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+    if num_of_written_events + num_of_dropped_events != args.events:
+        print 'Lost {} events'.format(args.events - num_of_written_events - num_of_dropped_events)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
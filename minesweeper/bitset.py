@@ -0,0 +1,66 @@
+"""
+This module contains helpers which pack sets of tile indices into bitsets, one bit per tile.
+
+A bitset takes an eighth of a byte per tile, so the mine layout of even a giant board is small enough to save, send or
+share between processes. Tile i is bit i % 8 of byte i / 8.
+"""
+
+
+def get_num_of_bytes(size):
+    """
+    Args:
+        size (int): The number of bits
+    Returns:
+        int: The number of bytes needed to hold the bits
+    """
+
+    return (size + 7) / 8
+
+
+def pack(indices, size):
+    """
+    Packs a set of indices into a bitset
+
+    Args:
+        indices (iterable<int>): The indices of the set bits
+        size (int): The number of bits
+    Returns:
+        bytearray: The bitset
+    """
+
+    bits = bytearray(get_num_of_bytes(size))
+    for index in indices:
+        bits[index >> 3] |= 1 << (index & 7)
+    return bits
+
+
+def unpack(bits, size):
+    """
+    Unpacks a bitset into the indices of its set bits
+
+    Args:
+        bits (bytearray|str): The bitset
+        size (int): The number of bits
+    Returns:
+        list<int>: The indices of the set bits in increasing order
+    """
+
+    bits = bytearray(bits)
+    indices = []
+    for byte_index, byte in enumerate(bits):
+        if byte:
+            base = byte_index << 3
+            indices.extend(base + bit for bit in xrange(8) if byte >> bit & 1)
+    return [index for index in indices if index < size]
+
+
+def is_set(bits, index):
+    """
+    Args:
+        bits (bytearray): The bitset
+        index (int): The index of the bit
+    Returns:
+        bool: Is the bit set?
+    """
+
+    return bool(bits[index >> 3] >> (index & 7) & 1)
@@ -1,13 +1,16 @@
 """
 This module contains the Board class which represents a 2 dimensional array of Tile objects.
+
+pygame is only imported when the board is actually drawn so that headless boards (screen=None) do not need it.
 """
 
 import random
-import pygame
 from tile import Tile
 from tile_reveal_result import TileRevealResult
 import display_params
 import colors
+import frame_scheduler
+import topology as topologies
 
 
 class Board(object):
@@ -15,21 +18,29 @@ class Board(object):
     This class represents the game board - a 2 dimensional array of Tile objects
     """
 
-    def __init__(self, rows, cols, num_of_mines, screen):
+    def __init__(self, rows, cols, num_of_mines, screen, seed=None, topology=topologies.RECTANGULAR):
         """
         Args:
             rows (int): The total number of rows on the board
             cols (int): The total number of columns on the board
             num_of_mines (int): The total number of mines on the board
-            screen (pygame.display): The screen object
+            screen (pygame.display|None): The screen object or None for a headless board
+            seed (int|None): The seed of the mine layout or None for a random layout. Given the same seed and first
+                click, the mines are always laid out the same way. Defaults to None.
+            topology (str): Which tiles are neighbors (see topology). Defaults to topology.RECTANGULAR.
+        Raises:
+            ValueError: There is no such topology
         """
 
         self.rows = rows
         self.cols = cols
         self.num_of_mines = num_of_mines
         self.screen = screen
+        self.seed = seed
+        self.topology = topology
+        self.random = random.Random(seed)
 
-        self.hovered_tiles = []
+        self.hovered_tiles = set()
 
         self.location = self.get_location()
 
@@ -44,12 +55,18 @@ class Board(object):
         Gets the location of the board
 
         Returns:
-            pygame.Rect: The location of the board
+            pygame.Rect|None: The location of the board or None for a headless board
         """
 
+        if self.screen is None:
+            return None
+
+        import pygame
         screen_width, screen_height = self.screen.get_size()
 
         width = self.cols * display_params.RECT_SIZE
+        if self.topology == topologies.HEXAGONAL:
+            width += display_params.RECT_SIZE / 2
         height = screen_height - (display_params.MARGIN_TOP + display_params.MARGIN_BOTTOM)
         left = (screen_width - width) / 2.0
 
@@ -63,10 +80,22 @@ class Board(object):
             list<list<Tile>>: A 2-dimensional array of Tile objects
         """
 
-        return [[Tile(row, col, self.screen, self.location.left)
+        offset = display_params.MARGIN_SIDE if self.location is None else self.location.left
+        return [[Tile(row, col, self.screen, self.get_row_offset(offset, row))
                  for col in xrange(self.cols)]
                 for row in xrange(self.rows)]
 
+    def get_row_offset(self, offset, row):
+        """
+        Args:
+            offset (int): The left most part of the board
+            row (int): A row of the board
+        Returns:
+            int: The left most part of the row, which is shifted half a tile to the right on some topologies
+        """
+
+        return offset + display_params.RECT_SIZE / 2 if topologies.is_row_shifted(self.topology, row) else offset
+
     def get_flattened_board(self):
         """
         Return a list of all the Tiles as a 1-dimensional array. This makes it easier to loop over the Tile objects.
@@ -78,20 +107,27 @@ class Board(object):
         return [tile for row in self.tile_grid for tile in row]
 
     def set_neighbors(self):
-        """Set the the neighbor tiles of each tile on the board"""
-
-        # The eight directions to check for plausible neighbors
-        directions = ((-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0))
-
-        for tile in self.flattened_board:
-            for direction in directions:
-                neighbor_x = tile.row + direction[0]
-                neighbor_y = tile.col + direction[1]
-                if 0 <= neighbor_x < self.rows and 0 <= neighbor_y < self.cols:
-                    tile.neighbors.append(self.tile_grid[neighbor_x][neighbor_y])
+        """Set the the neighbor tiles of each tile on the board from the adjacency table of its topology"""
+        offsets, neighbors = topologies.get_adjacency_table(self.topology, self.rows, self.cols)
+        tiles = self.flattened_board
+        for index, tile in enumerate(tiles):
+            tile.neighbors = [tiles[neighbor] for neighbor in neighbors[offsets[index]:offsets[index + 1]]]
 
     def draw(self):
-        """Draws the board and all its tiles on the screen"""
+        """Draws the board and all its tiles on the screen. Does nothing for a headless board."""
+        if self.screen is None:
+            return
+
+        import pygame
+        frame_scheduler.mark_screen_dirty()
+        if self.topology == topologies.HEXAGONAL:
+            # The shifted rows do not line up with a grid, so the lines are the background showing between the tiles
+            self.screen.fill(colors.AQUA, (self.location.left, self.location.top, self.location.width + 1,
+                                           self.location.height + 1))
+            for tile in self.flattened_board:
+                tile.draw(colors.GRAY)
+            return
+
         for tile in self.flattened_board:
             tile.draw(colors.GRAY)
 
@@ -131,10 +167,53 @@ class Board(object):
         legal_mine_locations = [tile for tile in self.flattened_board if tile not in cluster_one]
 
         # Randomly select tiles to be mines from the remaining legal locations
-        tiles_with_mines = random.sample(legal_mine_locations, self.num_of_mines)
+        tiles_with_mines = self.random.sample(legal_mine_locations, self.num_of_mines)
         for tile in tiles_with_mines:
             tile.set_mine()
 
+    def set_mine_layout(self, mine_tiles):
+        """
+        Lays out the mines on the given tiles rather than randomly. This is used to restore a saved or recorded game.
+
+        Args:
+            mine_tiles (iterable<Tile>): The tiles containing a mine
+        """
+
+        for tile in mine_tiles:
+            tile.set_mine()
+        self.set_tile_colors()
+
+    def get_3bv(self):
+        """
+        Gets the 3BV of the board: the minimum number of left clicks needed to reveal every non mine tile without
+        flagging. Each opening (a cluster of connected zero tiles) counts once and every numbered tile not next to an
+        opening counts once. This must be called after setting all the mines.
+
+        Returns:
+            int: The 3BV of the board
+        """
+
+        bbbv = 0
+        covered_tiles = set()
+
+        for tile in self.flattened_board:
+            if tile.is_mine or tile.value > 0 or tile in covered_tiles:
+                continue
+
+            # A single click on any zero tile of the opening reveals all of it and its border
+            bbbv += 1
+            covered_tiles.add(tile)
+            tiles_to_visit = [tile]
+            while tiles_to_visit:
+                for neighbor in tiles_to_visit.pop().neighbors:
+                    if neighbor not in covered_tiles:
+                        covered_tiles.add(neighbor)
+                        if neighbor.value == 0:
+                            tiles_to_visit.append(neighbor)
+
+        bbbv += sum(1 for tile in self.flattened_board if not tile.is_mine and tile not in covered_tiles)
+        return bbbv
+
     def set_tile_colors(self):
         """Sets the color of each tile on the board"""
         for tile in self.flattened_board:
@@ -155,9 +234,11 @@ class Board(object):
 
         # Determine the row and column number the mouse is in (if any)
         row_num = self.get_event_grid_loc(y_pos, self.location.top)
-        col_num = self.get_event_grid_loc(x_pos, self.location.left)
+        if row_num is None:
+            return None
+        col_num = self.get_event_grid_loc(x_pos, self.get_row_offset(self.location.left, row_num))
 
-        if row_num is None or col_num is None:
+        if col_num is None:
             return None
         if 0 <= row_num < self.rows and 0 <= col_num < self.cols:
             return self.tile_grid[row_num][col_num]
@@ -203,7 +284,11 @@ class Board(object):
 
         while len(tile_reveal_result.additional_tiles_to_reveal) > 0:
             tile = tile_reveal_result.additional_tiles_to_reveal.popleft()
-            tile_reveal_result += tile.left_click_up(is_shortcut_click)
+
+            # Clicking a shown tile does nothing unless it is a shortcut click. A cascade queues most tiles several
+            # times (once by each opened neighbor), so those repeats are skipped without building a result.
+            if is_shortcut_click or not tile.is_shown:
+                tile_reveal_result += tile.left_click_up(is_shortcut_click)
 
             # Even if the original click was a shortcut click, all reveals afterwards are not shortcut clicks
             is_shortcut_click = False
@@ -221,19 +306,26 @@ class Board(object):
         """
 
         is_both_mouse_down = is_left_mouse_down and is_right_mouse_down
-        self.clear_hovered_tiles_list()
 
-        if tile is not None:
-            tile_to_hover = self.get_tiles_to_react(tile, include_neighbors=is_both_mouse_down)
-            self.hovered_tiles.extend(tile_to_hover)
-            for tile in tile_to_hover:
-                tile.hover(is_left_mouse_down)
+        if tile is None:
+            tiles_to_hover = set()
+        else:
+            tiles_to_hover = set(self.get_tiles_to_react(tile, include_neighbors=is_both_mouse_down))
+
+        # Only the tiles that left the hovered set need to be unhovered. The tiles that remain hovered are only
+        # redrawn by Tile.hover if their look changes (e.g. the left mouse was pressed while hovering them).
+        for stale_tile in self.hovered_tiles - tiles_to_hover:
+            stale_tile.unhover()
+        for tile_to_hover in tiles_to_hover:
+            tile_to_hover.hover(is_left_mouse_down)
+
+        self.hovered_tiles = tiles_to_hover
 
     def clear_hovered_tiles_list(self):
-        """Remove reaction from tiles no longer hovered"""
+        """Remove reaction from all hovered tiles"""
         for tile in self.hovered_tiles:
             tile.unhover()
-            self.hovered_tiles.remove(tile)
+        self.hovered_tiles = set()
 
     @staticmethod
     def get_tiles_to_react(tile, include_neighbors):
@@ -259,3 +351,9 @@ class Board(object):
 
         for tile in self.flattened_board:
             tile.reveal(tile in losing_tiles)
+
+    def unreveal_all_tiles(self):
+        """Hides the mines and wrong flags shown by reveal_all_tiles again. This is used to undo a losing move."""
+        for tile in self.flattened_board:
+            if tile.is_mine or tile.is_flagged:
+                tile.draw_hidden()
@@ -1,8 +1,5 @@
 """Contains the parameters used for the display."""
 
-import pygame
-
-
 MARGIN_SIDE = 20
 MARGIN_TOP = 40
 MARGIN_BOTTOM = 65
@@ -12,7 +9,6 @@ MIN_SCREEN_WIDTH = 350
 
 FRAME_RATE = 50
 
-# Fonts
-pygame.font.init()
-BASIC_FONT = pygame.font.SysFont(None, 24)
-COUNTER_FONT = pygame.font.SysFont(None, 48)
+# Font sizes. The fonts themselves are created lazily by the fonts module.
+BASIC_FONT_SIZE = 24
+COUNTER_FONT_SIZE = 48
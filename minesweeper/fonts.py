@@ -0,0 +1,47 @@
+"""
+This module provides the fonts used in the Minesweeper game.
+
+Fonts are created lazily, the first time they are requested, and cached afterwards. The pygame default font is used
+directly rather than through pygame.font.SysFont, which scans all the system fonts before falling back to it.
+"""
+
+import display_params
+
+# The fonts created so far keyed by font size
+LOADED_FONTS = {}
+
+
+def get_font(size):
+    """
+    Gets the default font in the given size. The font is created the first time it is requested.
+
+    Args:
+        size (int): The font size
+    Returns:
+        pygame.font.Font: The font
+    """
+
+    if size not in LOADED_FONTS:
+        import pygame
+        pygame.font.init()
+        LOADED_FONTS[size] = pygame.font.Font(None, size)
+
+    return LOADED_FONTS[size]
+
+
+def get_basic_font():
+    """
+    Returns:
+        pygame.font.Font: The font used for tile values and the high score
+    """
+
+    return get_font(display_params.BASIC_FONT_SIZE)
+
+
+def get_counter_font():
+    """
+    Returns:
+        pygame.font.Font: The font used for the mine counter and the timer
+    """
+
+    return get_font(display_params.COUNTER_FONT_SIZE)
@@ -0,0 +1,90 @@
+"""
+This module schedules the frames of the game: the display is only updated when something was drawn, only where it was
+drawn and at most display_params.FRAME_RATE times per second.
+
+Everything that draws on the screen reports the rect it drew with add_dirty_rect (or mark_screen_dirty for a full
+redraw). The game loop calls get_milliseconds_until_next_frame and render_frame after handling each batch of events.
+The frame rate limit only holds frames back; it has nothing to do with measuring the play time (see game_clock).
+
+pygame is only imported when a frame is rendered so that headless boards do not need it.
+"""
+
+from game_clock import get_monotonic_time
+import display_params
+
+# Beyond this many dirty rects, e.g. after a big cascade, the whole display is updated at once
+MAX_DIRTY_RECTS = 500
+
+# The shortest time (in seconds) between two frames
+MIN_FRAME_INTERVAL = 1.0 / display_params.FRAME_RATE
+
+# The rects drawn since the last frame
+dirty_rects = []
+
+# Was the whole screen drawn (or too many rects) since the last frame?
+is_screen_dirty = False
+
+# The monotonic time of the last frame or None if there was none yet
+last_frame_time = None
+
+
+def add_dirty_rect(rect):
+    """
+    Records that a part of the screen was drawn
+
+    Args:
+        rect (pygame.Rect): The part of the screen that was drawn
+    """
+
+    global is_screen_dirty
+
+    if is_screen_dirty:
+        return
+    dirty_rects.append(rect)
+    if len(dirty_rects) > MAX_DIRTY_RECTS:
+        mark_screen_dirty()
+
+
+def mark_screen_dirty():
+    """Records that the whole screen was drawn"""
+    global is_screen_dirty
+
+    is_screen_dirty = True
+    del dirty_rects[:]
+
+
+def has_changes():
+    """
+    Returns:
+        bool: Was anything drawn since the last frame?
+    """
+
+    return is_screen_dirty or bool(dirty_rects)
+
+
+def get_milliseconds_until_next_frame():
+    """
+    Returns:
+        int: How long (in milliseconds) the next frame must be held back to keep to the frame rate. 0 if it is due.
+    """
+
+    if last_frame_time is None:
+        return 0
+    return max(0, int((last_frame_time + MIN_FRAME_INTERVAL - get_monotonic_time()) * 1000 + 0.5))
+
+
+def render_frame():
+    """Updates the parts of the display that were drawn since the last frame. Does nothing if nothing was drawn."""
+    global is_screen_dirty, last_frame_time
+
+    if not has_changes():
+        return
+
+    import pygame
+    if is_screen_dirty:
+        pygame.display.update()
+    else:
+        pygame.display.update(dirty_rects)
+    is_screen_dirty = False
+    del dirty_rects[:]
+    last_frame_time = get_monotonic_time()
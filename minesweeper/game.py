@@ -1,37 +1,110 @@
 """This module contains the Game class which represents a single Minesweeper game."""
 
+import getpass
+import random
 import sys
 import pygame
-from pygame.locals import QUIT, MOUSEMOTION, MOUSEBUTTONUP, MOUSEBUTTONDOWN
+from pygame.locals import QUIT, MOUSEMOTION, MOUSEBUTTONUP, MOUSEBUTTONDOWN, KEYDOWN, K_F3, K_y, K_z, \
+    KMOD_CTRL, KMOD_SHIFT, USEREVENT
 from board import Board
-from timer import Timer
+from timer import Timer, TIMER_EVENT
 from mine_counter import MineCounter
 from reset_button import ResetButton
 from highscore.high_score import HighScore
+from highscore.file_manager import FileManager
+from highscore.leaderboard import Leaderboard
+from highscore.game_stats import GameStats
+from replay.replay_recorder import ReplayRecorder, NO_REPLAY_RECORDER
+from game_save import GameSaver
+from history import History, NO_HISTORY, FLAG
+from replay import replay_format
+from highscore.background_writer import BackgroundWriter
+from server.spectator import SpectatorBroadcaster, NO_BROADCASTER
+from instrumentation import Instrumentation
+from telemetry import Telemetry, NO_TELEMETRY
+from game_clock import get_monotonic_time
+from profiler import Profiler, BOARD_PHASE, FIRST_CLICK_PHASE, CASCADE_PHASE, RENDER_PHASE
+import bitset
+import topology as topologies
 import display_params
 import colors
+import frame_scheduler
 from constants import LEFT_CLICK, RIGHT_CLICK
 
+# The event posted when a frame that was held back by the frame rate limit is due. It only wakes the game loop up.
+FRAME_EVENT = USEREVENT + 1
+
 
 class Game(object):
     """
     This class represents a single Minesweeper game
     """
 
-    def __init__(self, rows, cols, num_of_mines):
+    def __init__(self, rows, cols, num_of_mines, instrument=False, instrument_file=None, profiler=None,
+                 high_score_file=None, seed=None, player_name=None, leaderboard_file=None,
+                 stats_file=None, replay_dir=None, save_file=None, practice=False, broadcast_address=None,
+                 telemetry_dir=None, topology=topologies.RECTANGULAR):
         """
         Args:
             rows (int): The total number of rows on the board
             cols (int): The total number of columns on the board
             num_of_mines (int): The total number of mines on the board
+            instrument (bool): Should frame times and input latency be measured from the start? They can also be
+                toggled with F3. Defaults to False.
+            instrument_file (str|None): The json file to dump the measurements to on exit or None to not dump them.
+                Defaults to None.
+            profiler (Profiler|None): The profiler used to profile the phases of the game or None to not profile
+                them. Defaults to None.
+            high_score_file (str|None): The high score filename or None to use the default file. Defaults to None.
+            seed (int|None): The seed of every board or None to pick a new random seed for each board.
+                Defaults to None.
+            player_name (str|None): The name wins are entered into the leaderboard with or None to use the login
+                name. Defaults to None.
+            leaderboard_file (str|None): The leaderboard filename or None to use the default file. Defaults to None.
+            stats_file (str|None): The game history filename or None to use the default file. Defaults to None.
+            replay_dir (str|None): The directory to save the replays in or None to use the default directory.
+                Defaults to None.
+            save_file (str|None): The file to save the game in progress to or None to use the default file.
+                Defaults to None.
+            practice (bool): Play in practice mode, where moves can be undone and redone? Practice games are not
+                entered into the high scores, leaderboard or statistics and are neither recorded nor saved.
+                Defaults to False.
+            broadcast_address (str|None): HOST:PORT or the Unix socket path to broadcast the game to spectators on or
+                None to not broadcast it. Defaults to None.
+            telemetry_dir (str|None): The directory to write telemetry (clicks, reveal sizes, frame times and game
+                outcomes) to or None to not record telemetry. Defaults to None.
+            topology (str): Which tiles are neighbors (see topology). Games on other topologies than
+                topology.RECTANGULAR are, like practice games, not entered into the high scores, leaderboard or
+                statistics and are neither recorded nor saved. Defaults to topology.RECTANGULAR.
         """
 
         self.rows = rows
         self.cols = cols
         self.num_of_mines = num_of_mines
+        self.writer = BackgroundWriter()
+        self.file_manager = FileManager(high_score_file, self.writer)
+        self.leaderboard = Leaderboard(leaderboard_file, self.writer)
+        self.game_stats = GameStats(stats_file, self.writer)
+        self.fixed_seed = seed
+        self.seed = None
+        self.player_name = player_name if player_name is not None else getpass.getuser()
+        self.replay_dir = replay_dir
+        self.replay_recorder = NO_REPLAY_RECORDER
+        self.saver = GameSaver(save_file, self.writer)
+        self.is_practice = practice
+        self.topology = topology
+        # The high scores, leaderboard, statistics, replays and saves only hold rectangular games that can't be undone
+        self.is_recorded = not practice and topology == topologies.RECTANGULAR
+        self.history = History() if practice else NO_HISTORY
+        self.broadcaster = SpectatorBroadcaster(broadcast_address) if broadcast_address is not None else \
+            NO_BROADCASTER
+        self.telemetry = Telemetry(telemetry_dir) if telemetry_dir is not None else NO_TELEMETRY
 
         self.screen = None
+        self.timer = None
+        self.profiler = profiler if profiler is not None else Profiler(phases=[])
         self.initialize_screen()
+        self.instrumentation = Instrumentation(self.screen, instrument, instrument_file)
         self.start_new_game()
 
     def initialize_screen(self):
@@ -42,27 +115,40 @@ class Game(object):
         pygame.init()
         pygame.display.set_caption('Minesweeper')
 
-        screen_width = max(display_params.RECT_SIZE * self.cols + 2 * display_params.MARGIN_SIDE,
-                           display_params.MIN_SCREEN_WIDTH)
+        board_width = display_params.RECT_SIZE * self.cols
+        if self.topology == topologies.HEXAGONAL:
+            board_width += display_params.RECT_SIZE / 2
+        screen_width = max(board_width + 2 * display_params.MARGIN_SIDE, display_params.MIN_SCREEN_WIDTH)
         screen_height = display_params.RECT_SIZE * self.rows + display_params.MARGIN_TOP + \
             display_params.MARGIN_BOTTOM
         self.screen = pygame.display.set_mode((screen_width, screen_height))
         self.screen.fill(colors.NAVYBLUE)
 
-        pygame.display.update()
+        frame_scheduler.mark_screen_dirty()
 
     def start_new_game(self):
         """
-        Starts a fresh Minesweeper game
+        Starts a fresh Minesweeper game. This only sets up the game, play_game runs the main game loop.
         """
 
+        # A game that was set up before is abandoned
+        if self.timer is not None:
+            self.finish_replay(replay_format.ABANDONED)
+            self.record_abandoned_game()
+            self.saver.delete()
+            self.timer.stop_clock()
+        self.history.clear()
         self.initialize_game_params()
         self.timer = Timer(self.screen)
         self.mine_counter = MineCounter(self.num_of_mines, self.screen)
         self.reset_button = ResetButton(self.screen)
-        self.high_score = HighScore(self.rows, self.cols, self.num_of_mines, self.screen)
-        self.board = Board(self.rows, self.cols, self.num_of_mines, self.screen)
-        self.play_game()
+        self.high_score = HighScore(self.rows, self.cols, self.num_of_mines, self.screen, self.file_manager)
+
+        # Every board gets a seed so that a leaderboard entry can be replayed on the same mine layout
+        self.seed = self.fixed_seed if self.fixed_seed is not None else random.getrandbits(32)
+        with self.profiler.phase(BOARD_PHASE):
+            self.board = Board(self.rows, self.cols, self.num_of_mines, self.screen, self.seed, self.topology)
+        self.broadcaster.publish_board(self.board, 0, self.num_of_mines)
 
     def initialize_game_params(self):
         """
@@ -74,41 +160,131 @@ class Game(object):
         self.is_game_lost = False
         self.is_left_mouse_down = False
         self.is_right_mouse_down = False
+        self.num_of_clicks = 0
         self.num_of_hidden_non_mines_tiles = self.rows * self.cols - self.num_of_mines
 
     def play_game(self):
         """
-        Main game loop. Updates timer, delays by framerate, and calls event handler.
+        Main game loop. Blocks until there are events to handle, handles them and updates the display.
+
+        While the clock is running, the timer posts a TIMER_EVENT when the shown seconds change so the loop wakes up to
+        update it. Otherwise, the loop sleeps until the player does something.
         """
         while True:
-            if self.is_new_game or self.is_game_over:
-                pygame.time.wait(1000 / display_params.FRAME_RATE)
+            events = self.wait_for_events()
+            frame_start_time = get_monotonic_time()
+            self.instrumentation.start_frame()
+            self.event_handler(events)
+            self.render_frame()
+            self.instrumentation.end_frame()
+            self.telemetry.record('frame', events=len(events),
+                                  ms=round((get_monotonic_time() - frame_start_time) * 1000, 3))
+
+    def render_frame(self):
+        """
+        Updates the parts of the display that were drawn, at most display_params.FRAME_RATE times per second. A frame
+        that is due too soon is held back and a FRAME_EVENT wakes the game loop up to render it.
+        """
+
+        if not frame_scheduler.has_changes():
+            return
+
+        delay = frame_scheduler.get_milliseconds_until_next_frame()
+        if delay > 0:
+            pygame.time.set_timer(FRAME_EVENT, delay)
+            return
+
+        pygame.time.set_timer(FRAME_EVENT, 0)
+        with self.instrumentation.measure('display_update'), self.profiler.phase(RENDER_PHASE):
+            frame_scheduler.render_frame()
+
+    @staticmethod
+    def wait_for_events():
+        """
+        Blocks until at least one event is available and then returns all the pending events.
+
+        Returns:
+            list<pygame.event>: The pending events in the order they were posted
+        """
+
+        return [pygame.event.wait()] + pygame.event.get()
+
+    @staticmethod
+    def coalesce_motion_events(events):
+        """
+        Collapses each run of consecutive mouse motion events into the last event of the run.
+        Only the latest mouse position matters for hover state, so handling the intermediate positions is wasted work.
+
+        Args:
+            events (list<pygame.event>): The events in the order they were posted
+        Returns:
+            list<pygame.event>: The events with each run of motion events replaced by its last event
+        """
+
+        coalesced_events = []
+        for event in events:
+            if event.type == MOUSEMOTION and coalesced_events and coalesced_events[-1].type == MOUSEMOTION:
+                coalesced_events[-1] = event
             else:
-                self.timer.update()
-            self.event_handler()
-            pygame.display.update()
+                coalesced_events.append(event)
+        return coalesced_events
 
-    def event_handler(self):
+    def event_handler(self, events):
         """
-        Handle any pygame event such as a mouse click or scroll.
+        Handle pygame events such as a mouse click or scroll.
+
+        Args:
+            events (list<pygame.event>): The events to handle in the order they were posted
         """
-        for event in pygame.event.get():
+        for event in self.coalesce_motion_events(events):
             if event.type == QUIT:
+                self.finish_replay(replay_format.ABANDONED)
+                self.record_abandoned_game()
+                self.saver.save(self.timer.milliseconds)
+                self.writer.close()
+                self.broadcaster.close()
+                self.telemetry.close()
+                self.instrumentation.dump()
                 pygame.quit()
                 sys.exit()
+            elif event.type == KEYDOWN and event.key == K_F3:
+                self.instrumentation.toggle()
+            elif event.type == KEYDOWN and event.key == K_z and event.mod & KMOD_CTRL:
+                if event.mod & KMOD_SHIFT:
+                    self.redo_move()
+                else:
+                    self.undo_move()
+            elif event.type == KEYDOWN and event.key == K_y and event.mod & KMOD_CTRL:
+                self.redo_move()
+            elif event.type == TIMER_EVENT:
+                self.timer_handler()
             elif event.type == MOUSEBUTTONDOWN and event.button == LEFT_CLICK:
                 self.left_mouse_down_handler(event)
             elif event.type == MOUSEBUTTONUP and event.button == LEFT_CLICK:
-                self.left_mouse_up_handler(event)
+                with self.instrumentation.measure('left_up'):
+                    self.left_mouse_up_handler(event)
             elif event.type == MOUSEBUTTONDOWN and event.button == RIGHT_CLICK:
                 self.right_mouse_down_handler(event)
             elif event.type == MOUSEBUTTONUP and event.button == RIGHT_CLICK:
                 self.right_mouse_up_handler(event)
             elif event.type == MOUSEMOTION:
-                self.mouse_motion_handler(event)
+                with self.instrumentation.measure('motion'):
+                    self.mouse_motion_handler(event)
             elif event.type == MOUSEBUTTONUP and event.button in [2, 4, 5]:
                 self.shortcut_click(event)
 
+    def timer_handler(self):
+        """
+        Handles the periodic timer event. Timer events still in the queue after the game ended are ignored.
+        """
+
+        if not self.is_new_game and not self.is_game_over:
+            seconds = self.timer.seconds
+            self.timer.update()
+            if self.timer.seconds != seconds:
+                self.broadcaster.publish_time(self.timer.seconds)
+            self.saver.autosave(self.timer.milliseconds)
+
     def left_mouse_down_handler(self, event):
         """
         Handles a left-click-down event.
@@ -142,10 +318,15 @@ class Game(object):
         else:
             tile = self.board.get_event_tile(event.pos)
             if tile is not None and not self.is_game_over:
+                self.num_of_clicks += 1
                 self.update_reset_button()
                 if self.is_new_game:
                     self.first_move(tile)
-                tile_reveal_result = self.board.left_click_up(tile)
+                self.replay_recorder.record_reveal(tile)
+                with self.instrumentation.measure('reveal'), self.profiler.phase(CASCADE_PHASE):
+                    tile_reveal_result = self.board.left_click_up(tile)
+                self.telemetry.record('reveal', row=tile.row, col=tile.col,
+                                      tiles=tile_reveal_result.non_mines_uncovered)
                 self.process_tile_reveal(tile_reveal_result)
                 if not self.is_game_over:
                     self.board.update_tile_hover(tile, self.is_left_mouse_down, self.is_right_mouse_down)
@@ -159,6 +340,10 @@ class Game(object):
                 This can potentially refer to multiple tiles revealed in a cluster or shortcut click.
         """
 
+        self.instrumentation.record_reveal(tile_reveal_result.non_mines_uncovered)
+        self.saver.record_shown(tile_reveal_result.revealed_tiles)
+        self.broadcaster.publish_shown(tile_reveal_result.revealed_tiles)
+        self.history.record_reveal(tile_reveal_result.revealed_tiles, tile_reveal_result.mine_tiles)
         self.num_of_hidden_non_mines_tiles -= tile_reveal_result.non_mines_uncovered
         if tile_reveal_result.hit_mine:
             self.lose_game(tile_reveal_result.mine_tiles)
@@ -174,8 +359,21 @@ class Game(object):
         """
 
         self.is_new_game = False
-        self.board.first_click(first_click_tile)
+        with self.profiler.phase(FIRST_CLICK_PHASE):
+            self.board.first_click(first_click_tile)
         self.timer.init_clock()
+        self.telemetry.record('start', rows=self.rows, cols=self.cols, mines=self.num_of_mines, seed=self.seed,
+                              practice=self.is_practice, topology=self.topology)
+        if not self.is_recorded:
+            return
+
+        # Games are only recorded once they start, so resetting an untouched board leaves no replay behind
+        self.replay_recorder = ReplayRecorder(self.rows, self.cols, self.num_of_mines, self.seed, self.player_name,
+                                              self.replay_dir, self.writer)
+        self.replay_recorder.record_mines(bitset.pack((tile.row * self.cols + tile.col
+                                                       for tile in self.board.flattened_board if tile.is_mine),
+                                                      self.rows * self.cols))
+        self.saver.start(self.board, self.seed, 0)
 
     def right_mouse_down_handler(self, event):
         """
@@ -190,7 +388,14 @@ class Game(object):
         tile = self.board.get_event_tile(event.pos)
         if not self.is_new_game and not self.is_game_over and tile is not None:
             if not self.is_left_mouse_down:
+                self.num_of_clicks += 1
+                self.replay_recorder.record_flag(tile)
                 change_in_unflagged_mines = tile.toggle_flag()
+                self.telemetry.record('flag', row=tile.row, col=tile.col, flagged=tile.is_flagged)
+                if change_in_unflagged_mines:
+                    self.saver.record_flag(tile)
+                    self.broadcaster.publish_flag(tile)
+                    self.history.record_flag(tile)
                 self.mine_counter.update(change_in_unflagged_mines)
             self.board.update_tile_hover(tile, self.is_left_mouse_down, self.is_right_mouse_down)
 
@@ -234,12 +439,17 @@ class Game(object):
             event (pygame.event): The pygame.event object
         """
 
-        tile = self.board.get_event_tile(event.pos)
+        with self.instrumentation.measure('chord'):
+            tile = self.board.get_event_tile(event.pos)
 
-        if not self.is_new_game and not self.is_game_over and tile is not None:
-            self.update_reset_button()
-            tile_reveal_result = self.board.left_click_up(tile, is_shortcut_click=True)
-            self.process_tile_reveal(tile_reveal_result)
+            if not self.is_new_game and not self.is_game_over and tile is not None:
+                self.num_of_clicks += 1
+                self.replay_recorder.record_chord(tile)
+                self.update_reset_button()
+                with self.profiler.phase(CASCADE_PHASE):
+                    tile_reveal_result = self.board.left_click_up(tile, is_shortcut_click=True)
+                self.telemetry.record('chord', row=tile.row, col=tile.col, tiles=tile_reveal_result.non_mines_uncovered)
+                self.process_tile_reveal(tile_reveal_result)
 
     def lose_game(self, losing_tiles):
         """
@@ -251,15 +461,139 @@ class Game(object):
 
         self.is_game_over = True
         self.is_game_lost = True
+        self.timer.stop_clock()
         self.reset_button.lost_game()
         self.board.reveal_all_tiles(losing_tiles)
+        self.broadcaster.publish_end(self.board, True)
+        self.record_game()
 
     def win_game(self):
         """The player clicked all non mine tiles. The game ends."""
         self.board.clear_hovered_tiles_list()
         self.is_game_over = True
+        self.timer.stop_clock()
         self.reset_button.won_game()
-        self.high_score.update(self.timer.seconds)
+        self.broadcaster.publish_end(self.board, False)
+        self.record_game()
+
+    def record_game(self):
+        """
+        Records the finished game in the telemetry. Enters a won game into the high scores and leaderboard, records the
+        finished game in the game statistics, finishes its replay and deletes its save. Practice games (whose moves
+        could be undone) and games on other topologies are only recorded in the telemetry.
+        """
+
+        self.telemetry.record('end', outcome='loss' if self.is_game_lost else 'win', ms=self.timer.milliseconds,
+                              clicks=self.num_of_clicks)
+        if self.is_recorded:
+            if not self.is_game_lost:
+                self.high_score.update(self.timer.seconds)
+                self.leaderboard.add_entry(self.rows, self.cols, self.num_of_mines, self.player_name,
+                                           self.timer.milliseconds, self.seed)
+            self.game_stats.record_game(self.rows, self.cols, self.num_of_mines, not self.is_game_lost,
+                                        self.timer.milliseconds, self.num_of_clicks, self.board.get_3bv(), self.seed)
+        self.finish_replay(replay_format.LOSS if self.is_game_lost else replay_format.WIN)
+        self.saver.delete()
+
+    def record_abandoned_game(self):
+        """Records the end of a game that is being abandoned in the telemetry. Does nothing if it never started."""
+        if not self.is_new_game and not self.is_game_over:
+            self.telemetry.record('end', outcome='abandoned', ms=self.timer.milliseconds, clicks=self.num_of_clicks)
+
+    def finish_replay(self, outcome):
+        """
+        Finishes the replay of the current game. Does nothing if the game is not being recorded.
+
+        Args:
+            outcome (int): replay_format.WIN, LOSS or ABANDONED
+        """
+
+        self.replay_recorder.finish(outcome, self.timer.milliseconds)
+        self.replay_recorder = NO_REPLAY_RECORDER
+
+    def resume_game(self, saved_game):
+        """
+        Restores a saved game in progress in place of the new game. The game must have the same rows/cols/mines.
+        The resumed game is not recorded as a replay since its earlier clicks are unknown.
+
+        Args:
+            saved_game (SavedGame): The saved game
+        """
+
+        self.seed = saved_game.seed
+        size = self.rows * self.cols
+        self.board.set_mine_layout(self.board.flattened_board[index]
+                                   for index in bitset.unpack(saved_game.mine_bits, size))
+
+        shown_indices = bitset.unpack(saved_game.shown_bits, size)
+        for index in shown_indices:
+            self.board.flattened_board[index].show_value()
+        self.num_of_hidden_non_mines_tiles -= len(shown_indices)
+
+        for index in bitset.unpack(saved_game.flagged_bits, size):
+            self.mine_counter.update(self.board.flattened_board[index].toggle_flag())
+
+        self.is_new_game = False
+        self.timer.resume_clock(saved_game.milliseconds)
+        self.broadcaster.publish_board(self.board, self.timer.seconds, self.mine_counter.num_of_unflagged_mines)
+        # A practice game leaves the save alone, since its undone moves could not be saved
+        if not self.is_practice:
+            self.saver.resume(saved_game)
+
+    def undo_move(self):
+        """
+        Undoes the latest move of a practice game. Undoing the move that ended the game reopens the game.
+        Does nothing outside of practice mode or if there is no move to undo.
+        """
+
+        entry = self.history.undo()
+        if entry is None:
+            return
+
+        if self.is_game_over:
+            self.reopen_game()
+        if entry.kind == FLAG:
+            self.mine_counter.update(entry.tiles[0].toggle_flag())
+        else:
+            for tile in entry.tiles:
+                tile.hide()
+            self.num_of_hidden_non_mines_tiles += len(entry.tiles)
+
+        # The deltas can neither hide tiles nor reopen a game, so the spectators get the whole board again
+        self.broadcaster.publish_board(self.board, self.timer.seconds, self.mine_counter.num_of_unflagged_mines)
+
+    def redo_move(self):
+        """
+        Redoes the latest undone move of a practice game, which may end the game again.
+        Does nothing outside of practice mode or if there is no move to redo.
+        """
+
+        entry = self.history.redo()
+        if entry is None:
+            return
+
+        if entry.kind == FLAG:
+            self.mine_counter.update(entry.tiles[0].toggle_flag())
+            self.broadcaster.publish_flag(entry.tiles[0])
+            return
+
+        for tile in entry.tiles:
+            tile.show_value()
+        self.num_of_hidden_non_mines_tiles -= len(entry.tiles)
+        self.broadcaster.publish_shown(entry.tiles)
+        if entry.mine_tiles:
+            self.lose_game(entry.mine_tiles)
+        elif self.num_of_hidden_non_mines_tiles == 0:
+            self.win_game()
+
+    def reopen_game(self):
+        """The move that ended the game is being undone. Hides the revealed mines and restarts the clock."""
+        if self.is_game_lost:
+            self.board.unreveal_all_tiles()
+        self.is_game_over = False
+        self.is_game_lost = False
+        self.reset_button.reopened_game()
+        self.timer.resume_clock(self.timer.milliseconds)
 
     def update_reset_button(self):
         """Update the status of the reset button"""
@@ -0,0 +1,117 @@
+"""
+This module contains the GameClock class which measures the play time of a game.
+
+The clock reads a monotonic, high resolution system clock whenever it is asked for the time, so the play time is
+exact to well below a millisecond no matter how often (or rarely) the screen is redrawn, and wall clock changes do not
+affect it.
+"""
+
+import ctypes
+import ctypes.util
+import sys
+import time
+from timeit import default_timer
+
+# The id of CLOCK_MONOTONIC for clock_gettime on Linux
+CLOCK_MONOTONIC = 1
+
+
+class Timespec(ctypes.Structure):
+    """The struct timespec filled in by clock_gettime"""
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+
+def get_monotonic_time_function():
+    """
+    Picks the best monotonic clock available. Python 2 has no time.monotonic, so on Linux clock_gettime is called
+    directly. Other platforms fall back to timeit.default_timer.
+
+    Returns:
+        callable: A function taking no arguments which returns the time in seconds as a float
+    """
+
+    if hasattr(time, 'monotonic'):
+        return time.monotonic
+
+    # CLOCK_MONOTONIC has another id (or none) on other platforms
+    if not sys.platform.startswith('linux'):
+        return default_timer
+    library_name = ctypes.util.find_library('rt') or ctypes.util.find_library('c')
+    if library_name is None:
+        return default_timer
+    try:
+        clock_gettime = ctypes.CDLL(library_name, use_errno=True).clock_gettime
+    except (OSError, AttributeError):
+        return default_timer
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(Timespec)]
+
+    timespec = Timespec()
+
+    def get_monotonic_time():
+        """
+        Returns:
+            float: The monotonic time in seconds
+        """
+
+        if clock_gettime(CLOCK_MONOTONIC, ctypes.byref(timespec)) != 0:
+            return default_timer()
+        return timespec.tv_sec + timespec.tv_nsec * 1e-9
+
+    return get_monotonic_time
+
+
+# The time (in seconds) of a clock which never goes backwards. Only the difference between two readings is meaningful.
+get_monotonic_time = get_monotonic_time_function()
+
+
+class GameClock(object):
+    """
+    This class measures the play time of a game. It can be stopped and resumed.
+    """
+
+    def __init__(self):
+        self.elapsed_seconds = 0.0
+        self.start_time = None
+
+    def start(self, milliseconds=0):
+        """
+        Starts the clock
+
+        Args:
+            milliseconds (int|float): The play time to start from, e.g. of a resumed game. Defaults to 0.
+        """
+
+        self.elapsed_seconds = milliseconds / 1000.0
+        self.start_time = get_monotonic_time()
+
+    def stop(self):
+        """Stops the clock. The play time stays where it stopped until the clock is started again."""
+        if self.start_time is not None:
+            self.elapsed_seconds += get_monotonic_time() - self.start_time
+            self.start_time = None
+
+    def is_running(self):
+        """
+        Returns:
+            bool: Is the clock running?
+        """
+
+        return self.start_time is not None
+
+    def get_seconds(self):
+        """
+        Returns:
+            float: The play time in seconds
+        """
+
+        if self.start_time is None:
+            return self.elapsed_seconds
+        return self.elapsed_seconds + get_monotonic_time() - self.start_time
+
+    def get_milliseconds(self):
+        """
+        Returns:
+            int: The play time in whole milliseconds
+        """
+
+        return int(self.get_seconds() * 1000)
@@ -0,0 +1,485 @@
+"""
+This module saves the game in progress so that it can be resumed later, e.g. after quitting in the middle of a long game
+on a giant board.
+
+A save consists of two files:
+    The checkpoint holds the full game state: the board size, seed, game time and the mine, shown and flagged tiles
+        as bitsets (see bitset), compressed with zlib.
+    The journal holds the changes since the checkpoint. Every autosave appends a single batch with the game time, the
+        newly shown tiles and the tiles whose flag was toggled, so it only costs the changed tiles no matter how big
+        the board is.
+Once the journal outgrows the checkpoint, the writer folds it into a new checkpoint and starts an empty journal.
+
+Checkpoint: CHECKPOINT_MAGIC, VERSION (1 byte), then zlib compressed: rows, cols, mines, checkpoint id, game time
+    (varints), the seed flag (1 byte), the seed (varint, only if the flag is set), the mine, shown and flagged bitsets
+Journal: JOURNAL_MAGIC, VERSION (1 byte), the checkpoint id (varint) followed by batches. Every batch is its length
+    (varint) followed by the game time and the shown and toggled tiles as index lists.
+An index list is its length followed by the sorted tile indices, each stored as the gap from the previous index
+(varints). A batch cut short by a crash is ignored.
+"""
+
+import logging
+import os
+import random
+import threading
+import zlib
+from collections import namedtuple
+from highscore.append_log import get_local_file_name
+import bitset
+import varint
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_MAGIC = 'MSSV'
+JOURNAL_MAGIC = 'MSJN'
+VERSION = 1
+
+# How often (in game milliseconds) the changes are saved while playing
+AUTOSAVE_INTERVAL = 5000
+
+# The journal is folded into a new checkpoint once it is larger than the checkpoint and at least this many bytes
+MIN_JOURNAL_SIZE_TO_COMPACT = 64 * 1024
+
+# The operations the writer applies to the save files in order
+WRITE_CHECKPOINT = 'checkpoint'
+APPEND_BATCH = 'batch'
+DELETE_SAVE = 'delete'
+
+# The state of a saved game. The tiles are bytearray bitsets of the tile indices (row * cols + col).
+SavedGame = namedtuple('SavedGame', 'rows cols mines seed milliseconds mine_bits shown_bits flagged_bits')
+
+
+class SaveFormatError(ValueError):
+    """Raised when a save file is not valid"""
+    pass
+
+
+def get_save_file_name():
+    """
+    Returns:
+        str: The full default checkpoint filename (with the path)
+    """
+
+    return get_local_file_name('saved_game.msav')
+
+
+def get_journal_file_name(save_file):
+    """
+    Args:
+        save_file (str): The checkpoint filename
+    Returns:
+        str: The journal filename of the checkpoint
+    """
+
+    return save_file + '.journal'
+
+
+def encode_index_list(indices, output):
+    """
+    Appends a list of tile indices to a bytearray. Each index is stored as the gap from the previous one.
+
+    Args:
+        indices (iterable<int>): The tile indices
+        output (bytearray): The bytearray to append to
+    """
+
+    indices = sorted(indices)
+    varint.encode(len(indices), output)
+    previous_index = 0
+    for index in indices:
+        varint.encode(index - previous_index, output)
+        previous_index = index
+
+
+def decode_index_list(data, offset):
+    """
+    Decodes a list of tile indices
+
+    Args:
+        data (bytearray): The data to decode from
+        offset (int): The offset of the list in the data
+    Returns:
+        (list<int>, int): The sorted tile indices and the offset right after the list
+    Raises:
+        varint.TruncatedError: The data ends in the middle of the list
+    """
+
+    length, offset = varint.decode(data, offset)
+    indices = []
+    index = 0
+    for _ in xrange(length):
+        gap, offset = varint.decode(data, offset)
+        index += gap
+        indices.append(index)
+    return indices, offset
+
+
+def encode_checkpoint(saved_game, checkpoint_id):
+    """
+    Args:
+        saved_game (SavedGame): The game state
+        checkpoint_id (int): The id that ties the journal to the checkpoint
+    Returns:
+        str: The encoded checkpoint
+    """
+
+    body = bytearray()
+    for value in (saved_game.rows, saved_game.cols, saved_game.mines, checkpoint_id, saved_game.milliseconds):
+        varint.encode(value, body)
+    body.append(saved_game.seed is not None)
+    if saved_game.seed is not None:
+        varint.encode(saved_game.seed, body)
+    body.extend(saved_game.mine_bits)
+    body.extend(saved_game.shown_bits)
+    body.extend(saved_game.flagged_bits)
+
+    return CHECKPOINT_MAGIC + chr(VERSION) + zlib.compress(str(body))
+
+
+def decode_checkpoint(data):
+    """
+    Args:
+        data (str): The encoded checkpoint
+    Returns:
+        (SavedGame, int): The game state and the checkpoint id
+    Raises:
+        SaveFormatError: The data is not a valid checkpoint
+    """
+
+    if data[:len(CHECKPOINT_MAGIC) + 1] != CHECKPOINT_MAGIC + chr(VERSION):
+        raise SaveFormatError('not a checkpoint of a supported version')
+    try:
+        body = bytearray(zlib.decompress(data[len(CHECKPOINT_MAGIC) + 1:]))
+
+        values = []
+        offset = 0
+        for _ in xrange(5):
+            value, offset = varint.decode(body, offset)
+            values.append(value)
+        rows, cols, mines, checkpoint_id, milliseconds = values
+
+        has_seed = body[offset]
+        offset += 1
+        seed = None
+        if has_seed:
+            seed, offset = varint.decode(body, offset)
+    except (zlib.error, IndexError, varint.TruncatedError) as e:
+        raise SaveFormatError('corrupt checkpoint: {}'.format(e))
+
+    num_of_bytes = bitset.get_num_of_bytes(rows * cols)
+    if len(body) != offset + 3 * num_of_bytes:
+        raise SaveFormatError('corrupt checkpoint: wrong bitset size')
+    mine_bits = body[offset:offset + num_of_bytes]
+    shown_bits = body[offset + num_of_bytes:offset + 2 * num_of_bytes]
+    flagged_bits = body[offset + 2 * num_of_bytes:]
+
+    return SavedGame(rows, cols, mines, seed, milliseconds, mine_bits, shown_bits, flagged_bits), checkpoint_id
+
+
+def encode_batch(milliseconds, shown_indices, toggled_indices):
+    """
+    Args:
+        milliseconds (int): The game time
+        shown_indices (iterable<int>): The tile indices shown since the previous batch
+        toggled_indices (iterable<int>): The tile indices whose flag was toggled since the previous batch
+    Returns:
+        bytearray: The encoded batch, including its length
+    """
+
+    payload = bytearray()
+    varint.encode(milliseconds, payload)
+    encode_index_list(shown_indices, payload)
+    encode_index_list(toggled_indices, payload)
+
+    batch = bytearray()
+    varint.encode(len(payload), batch)
+    batch.extend(payload)
+    return batch
+
+
+def apply_journal(saved_game, checkpoint_id, data):
+    """
+    Applies the batches of a journal to a checkpoint
+
+    Args:
+        saved_game (SavedGame): The game state of the checkpoint. Its bitsets are updated in place.
+        checkpoint_id (int): The checkpoint id
+        data (bytearray): The journal
+    Returns:
+        SavedGame: The game state after the journal
+    """
+
+    if data[:len(JOURNAL_MAGIC) + 1] != bytearray(JOURNAL_MAGIC + chr(VERSION)):
+        return saved_game
+    try:
+        journal_checkpoint_id, offset = varint.decode(data, len(JOURNAL_MAGIC) + 1)
+    except varint.TruncatedError:
+        return saved_game
+    if journal_checkpoint_id != checkpoint_id:
+        # The journal of an older checkpoint. Its changes are already part of the checkpoint.
+        return saved_game
+
+    milliseconds = saved_game.milliseconds
+    size = saved_game.rows * saved_game.cols
+    while offset < len(data):
+        try:
+            length, offset = varint.decode(data, offset)
+            if offset + length > len(data):
+                break
+            batch_milliseconds, batch_offset = varint.decode(data, offset)
+            shown_indices, batch_offset = decode_index_list(data, batch_offset)
+            toggled_indices, batch_offset = decode_index_list(data, batch_offset)
+        except varint.TruncatedError:
+            break
+        offset += length
+
+        milliseconds = batch_milliseconds
+        for index in shown_indices:
+            if index < size:
+                saved_game.shown_bits[index >> 3] |= 1 << (index & 7)
+        for index in toggled_indices:
+            if index < size:
+                saved_game.flagged_bits[index >> 3] ^= 1 << (index & 7)
+
+    return saved_game._replace(milliseconds=milliseconds)
+
+
+def load_saved_game(save_file=None):
+    """
+    Loads the saved game: the checkpoint with the changes of its journal applied
+
+    Args:
+        save_file (str|None): The checkpoint filename or None to use the default file. Defaults to None.
+    Returns:
+        SavedGame|None: The saved game or None if there is no valid saved game
+    """
+
+    save_file = get_save_file_name() if save_file is None else save_file
+    try:
+        with open(save_file, 'rb') as f:
+            saved_game, checkpoint_id = decode_checkpoint(f.read())
+    except IOError:
+        return None
+    except SaveFormatError as e:
+        logger.warning('Ignoring the saved game %s: %s', save_file, e)
+        return None
+
+    try:
+        with open(get_journal_file_name(save_file), 'rb') as f:
+            journal = bytearray(f.read())
+    except IOError:
+        return saved_game
+
+    return apply_journal(saved_game, checkpoint_id, journal)
+
+
+def replace_file(filename, data):
+    """
+    Atomically replaces a file with the given data
+
+    Args:
+        filename (str): The filename
+        data (str): The new content of the file
+    """
+
+    temp_file = '{}.{}.tmp'.format(filename, os.getpid())
+    with open(temp_file, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.rename(temp_file, filename)
+
+
+class GameSaver(object):
+    """
+    This class saves the game in progress. The game reports the tiles it shows and flags, and the changes are
+    encoded and written by the background writer, so saving never stalls the game loop.
+    """
+
+    def __init__(self, save_file=None, writer=None):
+        """
+        Args:
+            save_file (str|None): The checkpoint filename or None to use the default file in the 'local' directory.
+                Defaults to None.
+            writer (BackgroundWriter|None): The writer used to write the save files in the background or None to
+                write them right away. Defaults to None.
+        """
+
+        self.save_file = get_save_file_name() if save_file is None else save_file
+        self.journal_file = get_journal_file_name(self.save_file)
+        self.writer = writer
+
+        # Is a game being saved?
+        self.is_active = False
+        self.cols = None
+        self.last_save_milliseconds = 0
+
+        # The changes since the last autosave
+        self.shown_indices = []
+        self.toggled_indices = set()
+
+        # The operations for the writer, in order
+        self.pending_operations = []
+        self.operations_lock = threading.Lock()
+
+        # Only used by the writer
+        self.checkpoint_id = None
+        self.checkpoint_size = 0
+
+    def start(self, board, seed, milliseconds):
+        """
+        Starts saving a game. This should be called right after the first click laid out the mines.
+
+        Args:
+            board (Board): The board
+            seed (int|None): The seed of the board
+            milliseconds (int): The game time
+        """
+
+        size = board.rows * board.cols
+        mine_bits = bitset.pack((tile.row * board.cols + tile.col for tile in board.flattened_board if tile.is_mine),
+                                size)
+        empty_bits = bytearray(bitset.get_num_of_bytes(size))
+        self.resume(SavedGame(board.rows, board.cols, board.num_of_mines, seed, milliseconds, mine_bits, empty_bits,
+                              bytearray(empty_bits)))
+
+    def resume(self, saved_game):
+        """
+        Continues saving a restored game. A fresh checkpoint is written so that the journal starts out empty.
+
+        Args:
+            saved_game (SavedGame): The restored game state
+        """
+
+        self.is_active = True
+        self.cols = saved_game.cols
+        self.last_save_milliseconds = saved_game.milliseconds
+        self.shown_indices = []
+        self.toggled_indices = set()
+        self.schedule(WRITE_CHECKPOINT, saved_game)
+
+    def record_shown(self, tiles):
+        """
+        Args:
+            tiles (list<Tile>): The tiles that were shown
+        """
+
+        if self.is_active:
+            self.shown_indices.extend(tile.row * self.cols + tile.col for tile in tiles)
+
+    def record_flag(self, tile):
+        """
+        Args:
+            tile (Tile): The tile whose flag was toggled
+        """
+
+        if self.is_active:
+            # Toggling a flag twice cancels out
+            self.toggled_indices ^= {tile.row * self.cols + tile.col}
+
+    def autosave(self, milliseconds):
+        """
+        Saves the changes if AUTOSAVE_INTERVAL passed since the last save
+
+        Args:
+            milliseconds (int): The game time
+        """
+
+        if self.is_active and milliseconds - self.last_save_milliseconds >= AUTOSAVE_INTERVAL:
+            self.save(milliseconds)
+
+    def save(self, milliseconds):
+        """
+        Saves the changes since the last save
+
+        Args:
+            milliseconds (int): The game time
+        """
+
+        if not self.is_active:
+            return
+
+        self.last_save_milliseconds = milliseconds
+        batch = (milliseconds, self.shown_indices, self.toggled_indices)
+        self.shown_indices = []
+        self.toggled_indices = set()
+        self.schedule(APPEND_BATCH, batch)
+
+    def delete(self):
+        """Stops saving the game and deletes the save. This should be called when the game ends."""
+        if self.is_active:
+            self.is_active = False
+            self.schedule(DELETE_SAVE, None)
+
+    def schedule(self, operation, argument):
+        """
+        Queues an operation on the save files for the writer
+
+        Args:
+            operation (str): WRITE_CHECKPOINT, APPEND_BATCH or DELETE_SAVE
+            argument (SavedGame|tuple|None): The game state to checkpoint, the batch to append or None
+        """
+
+        with self.operations_lock:
+            self.pending_operations.append((operation, argument))
+
+        if self.writer is None:
+            self.write_pending_operations()
+        else:
+            self.writer.schedule(self.write_pending_operations)
+
+    def write_pending_operations(self):
+        """Applies the pending operations to the save files in order"""
+        with self.operations_lock:
+            pending_operations, self.pending_operations = self.pending_operations, []
+
+        for operation, argument in pending_operations:
+            if operation == WRITE_CHECKPOINT:
+                self.write_checkpoint(argument)
+            elif operation == APPEND_BATCH:
+                self.append_batch(*argument)
+            elif self.checkpoint_id is not None:
+                self.checkpoint_id = None
+                for filename in (self.save_file, self.journal_file):
+                    if os.path.exists(filename):
+                        os.remove(filename)
+
+    def write_checkpoint(self, saved_game):
+        """
+        Writes a new checkpoint and an empty journal for it
+
+        Args:
+            saved_game (SavedGame): The game state
+        """
+
+        self.checkpoint_id = random.getrandbits(32)
+        data = encode_checkpoint(saved_game, self.checkpoint_id)
+        replace_file(self.save_file, data)
+        self.checkpoint_size = len(data)
+
+        journal_header = bytearray(JOURNAL_MAGIC + chr(VERSION))
+        varint.encode(self.checkpoint_id, journal_header)
+        replace_file(self.journal_file, str(journal_header))
+
+    def append_batch(self, milliseconds, shown_indices, toggled_indices):
+        """
+        Appends a batch of changes to the journal. Folds the journal into a new checkpoint once it is too big.
+
+        Args:
+            milliseconds (int): The game time
+            shown_indices (list<int>): The tile indices shown since the previous batch
+            toggled_indices (set<int>): The tile indices whose flag was toggled since the previous batch
+        """
+
+        if self.checkpoint_id is None:
+            return
+
+        with open(self.journal_file, 'ab') as f:
+            f.write(str(encode_batch(milliseconds, shown_indices, toggled_indices)))
+            f.flush()
+            os.fsync(f.fileno())
+            journal_size = f.tell()
+
+        if journal_size > max(self.checkpoint_size, MIN_JOURNAL_SIZE_TO_COMPACT):
+            saved_game = load_saved_game(self.save_file)
+            if saved_game is not None:
+                self.write_checkpoint(saved_game)
@@ -0,0 +1,158 @@
+"""
+This module contains the HeadlessGame class which plays a Minesweeper game without a screen.
+
+It applies the same rules as the Game class, but is driven by tile indices (row * cols + col) rather than pygame
+events, so it runs as fast as the board engine allows. It is used to replay and verify recorded games.
+"""
+
+from board import Board
+from tile_reveal_result import TileRevealResult
+import topology as topologies
+
+
+class HeadlessGame(object):
+    """
+    This class represents a single Minesweeper game played without a screen
+    """
+
+    def __init__(self, rows, cols, num_of_mines, seed=None, topology=topologies.RECTANGULAR):
+        """
+        Args:
+            rows (int): The total number of rows on the board
+            cols (int): The total number of columns on the board
+            num_of_mines (int): The total number of mines on the board
+            seed (int|None): The seed of the mine layout or None for a random layout. Defaults to None.
+            topology (str): Which tiles are neighbors (see topology). Defaults to topology.RECTANGULAR.
+        Raises:
+            ValueError: There is no such topology
+        """
+
+        self.rows = rows
+        self.cols = cols
+        self.num_of_mines = num_of_mines
+        self.board = Board(rows, cols, num_of_mines, None, seed, topology)
+
+        self.is_new_game = True
+        self.is_game_over = False
+        self.is_game_lost = False
+        self.is_mine_layout_set = False
+        self.num_of_clicks = 0
+        self.num_of_unflagged_mines = num_of_mines
+        self.num_of_hidden_non_mines_tiles = rows * cols - num_of_mines
+
+    def get_tile(self, tile_index):
+        """
+        Args:
+            tile_index (int): The tile index (row * cols + col)
+        Returns:
+            Tile: The tile
+        Raises:
+            IndexError: The tile index is not on the board
+        """
+
+        if not 0 <= tile_index < self.rows * self.cols:
+            raise IndexError('tile index {} is not on the board'.format(tile_index))
+        return self.board.flattened_board[tile_index]
+
+    def get_tile_index(self, tile):
+        """
+        Args:
+            tile (Tile): A tile on the board
+        Returns:
+            int: The tile index (row * cols + col)
+        """
+
+        return tile.row * self.cols + tile.col
+
+    def set_mine_layout(self, mine_indices):
+        """
+        Lays out the mines on the given tiles rather than on the first click. Must be called before the first click.
+
+        Args:
+            mine_indices (list<int>): The tile indices of the mines
+        Raises:
+            ValueError: The number of mines does not match the board or the game already started
+        """
+
+        if not self.is_new_game or self.is_mine_layout_set:
+            raise ValueError('the mines can only be laid out before the first click')
+        if len(set(mine_indices)) != self.num_of_mines:
+            raise ValueError('expected {} mines, got {}'.format(self.num_of_mines, len(set(mine_indices))))
+
+        self.board.set_mine_layout([self.get_tile(tile_index) for tile_index in set(mine_indices)])
+        self.is_mine_layout_set = True
+
+    def reveal(self, tile_index):
+        """
+        Left clicks a tile. The first click lays out the mines unless they were already laid out.
+
+        Args:
+            tile_index (int): The tile index (row * cols + col)
+        Returns:
+            TileRevealResult: The result of the click. It is empty if the game is already over.
+        """
+
+        if self.is_game_over:
+            return TileRevealResult()
+
+        tile = self.get_tile(tile_index)
+        self.num_of_clicks += 1
+        if self.is_new_game:
+            self.is_new_game = False
+            if not self.is_mine_layout_set:
+                self.board.first_click(tile)
+                self.is_mine_layout_set = True
+        tile_reveal_result = self.board.left_click_up(tile)
+        self.process_tile_reveal(tile_reveal_result)
+        return tile_reveal_result
+
+    def flag(self, tile_index):
+        """
+        Right clicks a tile, which toggles its flag. Flags can only be placed once the game started.
+
+        Args:
+            tile_index (int): The tile index (row * cols + col)
+        Returns:
+            int: The change in the number of mines remaining (0 if the flag could not be toggled)
+        """
+
+        if self.is_new_game or self.is_game_over:
+            return 0
+
+        self.num_of_clicks += 1
+        change_in_unflagged_mines = self.get_tile(tile_index).toggle_flag()
+        self.num_of_unflagged_mines += change_in_unflagged_mines
+        return change_in_unflagged_mines
+
+    def chord(self, tile_index):
+        """
+        Shortcut clicks a tile, which reveals its neighbors if it is fully flagged
+
+        Args:
+            tile_index (int): The tile index (row * cols + col)
+        Returns:
+            TileRevealResult: The result of the click. It is empty if the game has not started or is already over.
+        """
+
+        if self.is_new_game or self.is_game_over:
+            return TileRevealResult()
+
+        self.num_of_clicks += 1
+        tile_reveal_result = self.board.left_click_up(self.get_tile(tile_index), is_shortcut_click=True)
+        self.process_tile_reveal(tile_reveal_result)
+        return tile_reveal_result
+
+    def process_tile_reveal(self, tile_reveal_result):
+        """
+        Processes the result of clicking tile(s)
+
+        Args:
+            tile_reveal_result (TileRevealResult): The result of the tile reveal
+        """
+
+        self.num_of_hidden_non_mines_tiles -= tile_reveal_result.non_mines_uncovered
+        if tile_reveal_result.hit_mine:
+            self.is_game_over = True
+            self.is_game_lost = True
+        elif self.num_of_hidden_non_mines_tiles == 0:
+            self.is_game_over = True
@@ -0,0 +1,157 @@
+"""
+This module contains the AppendLog class which manages a text file of records shared by several processes.
+
+Records are only ever appended, one per line, under an exclusive lock on a separate lock file. Every process keeps
+track of how far it has read the file, so picking up the records appended by other processes only costs reading
+those records. To bound its size, the file can be compacted by atomically replacing it with a new file.
+"""
+
+import errno
+import os
+from file_lock import FileLock
+
+
+def get_local_file_name(filename):
+    """
+    Gets the full name of a file in the 'local' directory. Creates the 'local' directory if needed.
+
+    Args:
+        filename (str): The filename without the path
+    Returns:
+        str: The full filename (with the path)
+    """
+
+    # Get the path in which the local files sit: ../../../local/
+    project_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    local_dir = os.path.join(project_path, 'local')
+
+    if not os.path.exists(local_dir):
+        print 'Creating local directory'
+        try:
+            os.makedirs(local_dir)
+        except OSError as e:
+            # Another process may have created it in the meantime
+            if e.errno != errno.EEXIST:
+                raise
+
+    return os.path.join(local_dir, filename)
+
+
+class AppendLog(object):
+    """
+    This class manages a text file which starts with a header line followed by one record per line
+    """
+
+    def __init__(self, filename, header):
+        """
+        Creates the file with its header if it does not yet exist
+
+        Args:
+            filename (str): The full filename
+            header (str): The header line, including the line break
+        """
+
+        self.filename = filename
+        self.header = header
+        self.lock_file = filename + '.lock'
+
+        # How far the file has been read. The file is identified by (device, inode) since compaction replaces it.
+        self.file_id = None
+        self.file_offset = 0
+        self.num_of_lines = 0
+
+        if not os.path.exists(self.filename):
+            with self.lock():
+                if not os.path.exists(self.filename):
+                    with open(self.filename, 'w') as f:
+                        f.write(self.header)
+
+    def lock(self, is_exclusive=True):
+        """
+        Args:
+            is_exclusive (bool): Take an exclusive (write) lock rather than a shared (read) lock? Defaults to True.
+        Returns:
+            FileLock: A context manager holding the lock on the file
+        """
+
+        return FileLock(self.lock_file, is_exclusive)
+
+    def read_new_lines(self):
+        """
+        Reads the complete lines added to the file since it was last read. A line cut short by a crash is only
+        returned once it was terminated. If the file was replaced since it was last read, it is read from the start,
+        so the header is returned as well. The caller must hold a lock.
+
+        Returns:
+            list<str>: The new lines without line breaks
+        """
+
+        stat = os.stat(self.filename)
+        file_id = (stat.st_dev, stat.st_ino)
+        if file_id != self.file_id or stat.st_size < self.file_offset:
+            self.file_id = file_id
+            self.file_offset = 0
+            self.num_of_lines = 0
+
+        with open(self.filename, 'rb') as f:
+            f.seek(self.file_offset)
+            data = f.read()
+
+        complete_data = data[:data.rfind('\n') + 1]
+        self.file_offset += len(complete_data)
+
+        lines = complete_data.splitlines()
+        self.num_of_lines += len(lines)
+        return lines
+
+    def append_lines(self, lines):
+        """
+        Appends lines with a single write and syncs them to disk. The appended lines are not returned by the next
+        read_new_lines, so the caller should read the new lines first. The caller must hold an exclusive lock.
+
+        Args:
+            lines (list<str>): The lines to append without line breaks
+        """
+
+        data = ''.join(line + '\n' for line in lines)
+
+        fd = os.open(self.filename, os.O_RDWR | os.O_APPEND)
+        try:
+            # Terminate a line cut short by a crash so it does not swallow the first appended line
+            size = os.fstat(fd).st_size
+            if size > 0:
+                os.lseek(fd, size - 1, os.SEEK_SET)
+                if os.read(fd, 1) != '\n':
+                    data = '\n' + data
+
+            os.write(fd, data)
+            os.fsync(fd)
+            self.file_offset = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+
+        self.num_of_lines += len(lines)
+
+    def replace_lines(self, lines):
+        """
+        Replaces the whole file with the header and the given lines.
+        The lines are written to a temporary file which then atomically replaces the file, so the file is never seen
+        half written. The caller must hold an exclusive lock.
+
+        Args:
+            lines (list<str>): The lines to write after the header without line breaks
+        """
+
+        temp_file = '{}.{}.tmp'.format(self.filename, os.getpid())
+        with open(temp_file, 'w') as f:
+            f.write(self.header)
+            f.write(''.join(line + '\n' for line in lines))
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.rename(temp_file, self.filename)
+
+        stat = os.stat(self.filename)
+        self.file_id = (stat.st_dev, stat.st_ino)
+        self.file_offset = stat.st_size
+        self.num_of_lines = len(lines) + 1
@@ -0,0 +1,76 @@
+"""This module contains the BackgroundWriter class which runs file writes off the game loop."""
+
+import atexit
+import logging
+import threading
+import Queue
+logger = logging.getLogger(__name__)
+
+# Scheduled to make the writer thread exit
+STOP = object()
+
+
+class BackgroundWriter(object):
+    """
+    This class runs write jobs on a background thread so that slow disks never stall the game loop.
+
+    Jobs scheduled while the thread is busy are batched: once the thread wakes up it takes every pending job and runs
+    each distinct job once. A job should therefore write everything that is pending at the time it runs.
+    """
+
+    def __init__(self):
+        """Starts the writer thread. Pending jobs are flushed when the interpreter exits."""
+        self.jobs = Queue.Queue()
+        self.is_closed = False
+
+        self.thread = threading.Thread(target=self.run, name='BackgroundWriter')
+        self.thread.daemon = True
+        self.thread.start()
+
+        atexit.register(self.close)
+
+    def schedule(self, job):
+        """
+        Schedules a job to run on the writer thread
+
+        Args:
+            job (callable): A function taking no arguments which does the writing
+        """
+
+        self.jobs.put(job)
+
+    def run(self):
+        """The writer thread. Runs batches of jobs until STOP is scheduled."""
+        while True:
+            batch = [self.jobs.get()]
+            while not self.jobs.empty():
+                batch.append(self.jobs.get_nowait())
+
+            distinct_jobs = []
+            for job in batch:
+                if job not in distinct_jobs:
+                    distinct_jobs.append(job)
+
+            for job in distinct_jobs:
+                if job is not STOP:
+                    try:
+                        job()
+                    except Exception:
+                        logger.exception('Background write failed')
+
+            for _ in batch:
+                self.jobs.task_done()
+
+            if STOP in distinct_jobs:
+                return
+
+    def flush(self):
+        """Blocks until every job scheduled so far has run"""
+        self.jobs.join()
+
+    def close(self):
+        """Runs every pending job and stops the writer thread. Closing more than once does nothing."""
+        if not self.is_closed:
+            self.is_closed = True
+            self.schedule(STOP)
+            self.thread.join()
@@ -1,8 +1,9 @@
 """This module contains the Display class which controls the high score display."""
 
 import pygame
-import display_params
 import colors
+import fonts
+import frame_scheduler
 
 
 class Display(object):
@@ -28,7 +29,7 @@ class Display(object):
             high_score (int): The high score value
         """
 
-        pygame.draw.rect(self.screen, colors.GRAY, self.rect)
+        frame_scheduler.add_dirty_rect(pygame.draw.rect(self.screen, colors.GRAY, self.rect))
         self.screen.blit(Display.get_high_score_text(high_score), self.rect)
 
     @staticmethod
@@ -37,8 +38,8 @@ class Display(object):
         Args:
             high_score (int): The high score value
         Returns:
-            pygame.font.SysFont: The formatted high score value to show on the screen
+            pygame.Surface: The formatted high score value to show on the screen
         """
 
-        return display_params.BASIC_FONT.render(' High Score: ' + str(high_score), True, colors.BLACK,
-                                                colors.GRAY)
+        return fonts.get_basic_font().render(' High Score: ' + str(high_score), True, colors.BLACK,
+                                             colors.GRAY)
@@ -0,0 +1,42 @@
+"""
+This module contains the FileLock class which locks a file across processes.
+
+Locking uses fcntl.flock, so it is only available on POSIX systems. Elsewhere the lock does nothing.
+"""
+
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class FileLock(object):
+    """
+    This class is a context manager which holds a shared or exclusive lock on a lock file.
+    The lock file is separate from the data file so that the data file can be atomically replaced while locked.
+    """
+
+    def __init__(self, lock_file, is_exclusive=True):
+        """
+        Args:
+            lock_file (str): The lock filename. It is created if it does not yet exist.
+            is_exclusive (bool): Take an exclusive (write) lock rather than a shared (read) lock? Defaults to True.
+        """
+
+        self.lock_file = lock_file
+        self.is_exclusive = is_exclusive
+        self.fd = None
+
+    def __enter__(self):
+        self.fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX if self.is_exclusive else fcntl.LOCK_SH)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+        self.fd = None
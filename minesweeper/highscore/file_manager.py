@@ -1,8 +1,23 @@
-"""This module contains the FileManager class which manages the high score file."""
+"""
+This module contains the FileManager class which manages the high score file.
+
+Several game (or bot) instances may share the same high score file (see AppendLog). Before appending its records,
+every instance reads whatever the other instances appended, and only the best record per setting is kept, so no
+update is lost.
+"""
 
-import os
 import csv
+import os
+import threading
 from record import Record
+from append_log import AppendLog, get_local_file_name
+
+HEADER = 'rows,cols,mines,highscore\n'
+
+# The high score file is compacted once it holds more than COMPACTION_FACTOR * (number of settings) + COMPACTION_SLACK
+# records. This bounds the file size while keeping the cost of saving a high score constant on average.
+COMPACTION_FACTOR = 2
+COMPACTION_SLACK = 100
 
 
 class FileManager(object):
@@ -10,14 +25,39 @@ class FileManager(object):
     This class manages the high score file
     """
 
-    def __init__(self):
-        """Gets the high score filename and create the file if it does not yet exist"""
+    def __init__(self, high_score_file=None, writer=None):
+        """
+        Gets the high score filename, create the file if it does not yet exist and load it into memory
+
+        Args:
+            high_score_file (str|None): The high score filename or None to use the default file in the 'local'
+                directory. Defaults to None.
+            writer (BackgroundWriter|None): The writer used to save high scores in the background or None to save
+                them right away. Defaults to None.
+        """
 
         # Get the high score filename
-        self.high_score_file = FileManager.get_high_score_file_name()
+        self.high_score_file = FileManager.get_high_score_file_name() if high_score_file is None else high_score_file
 
         # Create the high score file if it does not already exist
-        self.create_high_score_file()
+        if not os.path.exists(self.high_score_file):
+            print 'Creating high_score.txt'
+        self.log = AppendLog(self.high_score_file, HEADER)
+
+        # The best record per setting known to this instance. Guarded by records_lock since the background writer
+        # merges in the records of other instances.
+        self.high_scores = {}
+        self.pending_records = []
+        self.records_lock = threading.Lock()
+
+        # Serializes the file access of the game and the background writer
+        self.io_lock = threading.Lock()
+
+        # Load all the records once. Lookups are served from memory afterwards.
+        with self.io_lock, self.log.lock(is_exclusive=False):
+            self.read_new_records()
+
+        self.writer = writer
 
     @staticmethod
     def get_high_score_file_name():
@@ -28,70 +68,59 @@ class FileManager(object):
             str: The full high score filename (with the path)
         """
 
-        # Get the path in which the high score file sits: ../../../local/
-        project_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        local_dir = os.path.join(project_path, 'local')
-
-        FileManager.create_local_dir(local_dir)
-
-        return os.path.join(local_dir, 'high_score.csv')
+        return get_local_file_name('high_score.csv')
 
     @staticmethod
-    def create_local_dir(local_dir):
+    def parse_high_score_line(line):
         """
-        Creates the 'local' directory in which the high score file sits if needed
+        Parses a single line of the high score file. This is not intended to work for the header.
 
         Args:
-            local_dir (str): The directory to create if it does not yet exist
+            line (list<str>): A single line of the high score file as a list of the comma separated strings
+        Returns:
+            Record: A Record object
+        Raises:
+            ValueError: The line is not a high score record
         """
 
-        if not os.path.exists(local_dir):
-            print 'Creating local directory'
-            os.makedirs(local_dir)
-
-    def create_high_score_file(self):
-        """Creates the high score file if it does not yet exist"""
-        if not os.path.exists(self.high_score_file):
-            print 'Creating high_score.txt'
-            self.write_header()
-
-    def write_header(self):
-        """Writes the header to the high score file"""
-        with open(self.high_score_file, 'w') as f:
-            f.write('rows,cols,mines,highscore\n')
+        rows, cols, mines, high_score = [int(num) for num in line]
+        return Record(rows, cols, mines, high_score)
 
-    def parse_high_score_file(self):
+    def read_new_records(self):
         """
-        Parses the high score file
-
-        Returns:
-            list<Record>: A list of Record objects. Each Record object contains a single high score record.
+        Reads the records added to the high score file since it was last read and merges them into memory.
+        Lines which are not records (the header or a line cut short by a crash) are skipped.
+        The caller must hold io_lock and a lock on the log.
         """
 
-        # Read the entire high score file
-        with open(self.high_score_file, 'r') as f:
-            lines = csv.reader(f)
+        records = []
+        for line in csv.reader(self.log.read_new_lines()):
+            try:
+                records.append(FileManager.parse_high_score_line(line))
+            except ValueError:
+                pass
 
-            # Return each line (except the header) parsed into a Record object
-            return [FileManager.parse_high_score_line(line) for line in list(lines)[1:]]
+        with self.records_lock:
+            for record in records:
+                self.merge_record(record)
 
-    @staticmethod
-    def parse_high_score_line(line):
+    def merge_record(self, record):
         """
-        Parses a single line of the high score file. This is not intended to work for the header.
+        Keeps the record if it is better than the known record for the same rows/cols/mines.
+        The caller must hold records_lock.
 
         Args:
-            line (list<str>): A single line of the high score file as a list of the comma separated strings
-        Returns:
-            Record: A Record object
+            record (Record): The record to merge
         """
 
-        rows, cols, mines, high_score = [int(num) for num in line]
-        return Record(rows, cols, mines, high_score)
+        known_record = self.high_scores.get(record.get_key())
+        if known_record is None or record.high_score < known_record.high_score:
+            self.high_scores[record.get_key()] = record
 
     def get_high_score(self, rows, cols, mines):
         """
         Gets the high score for the given rows/cols/mines. Returns 999 if no such high score exists.
+        The high score is served from memory, the file is only read when the FileManager is created or saves.
 
         Args:
             rows (int): The total number of rows on the board
@@ -101,19 +130,15 @@ class FileManager(object):
             int: The high score if it exists in the record file or 999 otherwise
         """
 
-        record_to_find = Record(rows, cols, mines)
-
-        # Return the high score if it exists in the high score file
-        for record in self.parse_high_score_file():
-            if record == record_to_find:
-                return record.high_score
-
-        # Otherwise, return 999
-        return 999
+        record = self.high_scores.get((rows, cols, mines))
+        return 999 if record is None else record.high_score
 
     def save_high_score(self, rows, cols, mines, high_score):
         """
-        Saves the high score for the given rows/cols/mines to the high score file
+        Saves the high score for the given rows/cols/mines to the high score file. A high score that is not better
+        than the one already saved (possibly by another instance) is dropped.
+        The high score is available from memory right away. If there is a writer, the file is written in the
+        background.
 
         Args:
             rows (int): The total number of rows on the board
@@ -124,26 +149,40 @@ class FileManager(object):
 
         new_record = Record(rows, cols, mines, high_score)
 
-        # Get the list of all records
-        all_high_scores = self.parse_high_score_file()
-
-        # If the record already exists for the given rows/cols/mines, replace the record
-        found = False
-        for i, record in enumerate(all_high_scores):
-            if record == new_record:
-                all_high_scores[i] = new_record
-                found = True
-                break
-
-        # Otherwise, add a new record
-        if not found:
-            all_high_scores.append(new_record)
-
-        all_high_scores.sort()
-
-        # Write the sorted records (and header) to the high score file
-        self.write_header()
-        with open(self.high_score_file, 'a') as f:
-            output_writer = csv.writer(f)
-            for record in all_high_scores:
-                output_writer.writerow(record.as_tuple())
+        with self.records_lock:
+            self.merge_record(new_record)
+            self.pending_records.append(new_record)
+
+        if self.writer is None:
+            self.write_pending_records()
+        else:
+            self.writer.schedule(self.write_pending_records)
+
+    def write_pending_records(self):
+        """
+        Writes all the pending records to the high score file.
+        Under an exclusive lock, the records saved by other instances are read first and only the pending records
+        which are still the best for their setting are appended. Once the file holds too many outdated records,
+        it is compacted instead.
+        """
+
+        with self.records_lock:
+            pending_records, self.pending_records = self.pending_records, []
+        if not pending_records:
+            return
+
+        with self.io_lock, self.log.lock():
+            self.read_new_records()
+
+            with self.records_lock:
+                records = [record for record in pending_records if self.high_scores.get(record.get_key()) is record]
+                num_of_settings = len(self.high_scores)
+            if not records:
+                return
+
+            if self.log.num_of_lines + len(records) > COMPACTION_FACTOR * num_of_settings + COMPACTION_SLACK:
+                with self.records_lock:
+                    all_records = sorted(self.high_scores.values())
+                self.log.replace_lines([str(record) for record in all_records])
+            else:
+                self.log.append_lines([str(record) for record in records])
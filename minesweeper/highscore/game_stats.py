@@ -0,0 +1,369 @@
+"""
+This module contains the GameStats class which records every finished game and keeps running statistics of them.
+
+Every game is appended to a history log (see AppendLog) which is never rewritten. The statistics of each row/col/mine
+setting are rolled up as the games come in, so recording a game costs the same no matter how long the history is.
+The rollups are saved to a snapshot along with how far they cover the history log. On startup the snapshot is loaded
+and only the games appended after it are read, so the statistics are available right away after years of play.
+
+The rollups only ever cover the games already in the log, so that a snapshot never counts a game whose line comes after
+it. A game recorded but not yet written is kept aside and rolled in once its line was appended. The snapshot holds the
+rollups of every setting, so saving it costs O(number of settings); it is only saved every SNAPSHOT_INTERVAL games,
+and at most that many games are read again on startup.
+"""
+
+import csv
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from cStringIO import StringIO
+from append_log import AppendLog, get_local_file_name
+from histogram import Histogram
+
+HEADER = 'rows,cols,mines,timestamp,outcome,milliseconds,clicks,3bv,seed\n'
+
+WIN = 'win'
+LOSS = 'loss'
+
+# The bucket upper bounds (in milliseconds) of the win time histograms. Consecutive buckets are 10% apart, which bounds
+# the error of the time percentiles.
+TIME_BUCKETS = tuple(int(1000 * 1.1 ** i) for i in xrange(100))
+
+# The number of games appended to the history log between snapshots
+SNAPSHOT_INTERVAL = 100
+
+# A single finished game. bbbv is the 3BV of the board or None if it is unknown.
+GameRecord = namedtuple('GameRecord', 'timestamp outcome milliseconds clicks bbbv seed')
+
+
+class SettingStats(object):
+    """
+    This class holds the running statistics of a single row/col/mine setting. Adding a game costs O(1).
+    """
+
+    def __init__(self):
+        self.num_of_games = 0
+        self.num_of_wins = 0
+        self.current_win_streak = 0
+        self.current_loss_streak = 0
+        self.best_win_streak = 0
+        self.worst_loss_streak = 0
+        self.total_clicks = 0
+
+        # The win times and the 3BV of the won games with a known 3BV
+        self.win_times = Histogram(TIME_BUCKETS)
+        self.best_time = None
+        self.total_win_3bv = 0
+        self.total_win_3bv_milliseconds = 0
+
+    def add_game(self, game_record):
+        """
+        Rolls a finished game into the statistics
+
+        Args:
+            game_record (GameRecord): The finished game
+        """
+
+        self.num_of_games += 1
+        self.total_clicks += game_record.clicks
+
+        if game_record.outcome == WIN:
+            self.num_of_wins += 1
+            self.current_win_streak += 1
+            self.current_loss_streak = 0
+            self.best_win_streak = max(self.best_win_streak, self.current_win_streak)
+            self.win_times.add(game_record.milliseconds)
+            if self.best_time is None or game_record.milliseconds < self.best_time:
+                self.best_time = game_record.milliseconds
+            if game_record.bbbv is not None:
+                self.total_win_3bv += game_record.bbbv
+                self.total_win_3bv_milliseconds += game_record.milliseconds
+        else:
+            self.current_loss_streak += 1
+            self.current_win_streak = 0
+            self.worst_loss_streak = max(self.worst_loss_streak, self.current_loss_streak)
+
+    def get_win_rate(self):
+        """
+        Returns:
+            float: The fraction of games won
+        """
+
+        return self.num_of_wins / float(self.num_of_games) if self.num_of_games else 0.0
+
+    def get_summary(self):
+        """
+        Returns:
+            dict: The statistics summary, ready to be printed or dumped as json
+        """
+
+        return {
+            'games': self.num_of_games,
+            'wins': self.num_of_wins,
+            'win_rate': self.get_win_rate(),
+            'current_win_streak': self.current_win_streak,
+            'current_loss_streak': self.current_loss_streak,
+            'best_win_streak': self.best_win_streak,
+            'worst_loss_streak': self.worst_loss_streak,
+            'mean_clicks': self.total_clicks / float(self.num_of_games) if self.num_of_games else 0,
+            'best_time': self.best_time,
+            'mean_time': self.win_times.total / float(self.win_times.count) if self.win_times.count else 0,
+            'median_time': self.win_times.percentile(50),
+            'p90_time': self.win_times.percentile(90),
+            '3bv_per_second': (1000.0 * self.total_win_3bv / self.total_win_3bv_milliseconds
+                               if self.total_win_3bv_milliseconds else 0),
+        }
+
+    def get_state(self):
+        """
+        Returns:
+            dict: Everything needed to restore the statistics with from_state, ready to be dumped as json
+        """
+
+        state = dict(self.__dict__)
+        state['win_times'] = self.win_times.get_state()
+        return state
+
+    @staticmethod
+    def from_state(state):
+        """
+        Restores statistics saved with get_state
+
+        Args:
+            state (dict): The saved state
+        Returns:
+            SettingStats: The restored statistics
+        """
+
+        setting_stats = SettingStats()
+        for name, value in state.items():
+            if name == 'win_times':
+                value = Histogram.from_state(TIME_BUCKETS, value)
+            setattr(setting_stats, name, value)
+        return setting_stats
+
+
+class GameStats(object):
+    """
+    This class records every finished game and keeps the running statistics of every row/col/mine setting
+    """
+
+    def __init__(self, history_file=None, writer=None):
+        """
+        Loads the statistics snapshot and rolls in the games recorded after it
+
+        Args:
+            history_file (str|None): The game history filename or None to use the default file in the 'local'
+                directory. The snapshot sits next to it. Defaults to None.
+            writer (BackgroundWriter|None): The writer used to save games in the background or None to save them
+                right away. Defaults to None.
+        """
+
+        if history_file is None:
+            history_file = get_local_file_name('game_history.csv')
+        self.log = AppendLog(history_file, HEADER)
+        self.snapshot_file = os.path.splitext(history_file)[0] + '_stats.json'
+        self.writer = writer
+
+        # The statistics of each setting over the games in the history log up to log.file_offset, keyed by
+        # (rows, cols, mines)
+        self.stats = {}
+
+        # The (setting, GameRecord) of the games recorded but not yet rolled into the statistics, oldest first. They
+        # are rolled in once they were appended to the history log.
+        self.pending_games = []
+
+        # The number of lines of the history log covered by the latest snapshot
+        self.snapshot_num_of_lines = 0
+        self.stats_lock = threading.Lock()
+        self.io_lock = threading.Lock()
+
+        with self.io_lock, self.log.lock(is_exclusive=False):
+            self.load_snapshot()
+            self.read_new_games()
+
+    @staticmethod
+    def parse_line(line):
+        """
+        Parses a single line of the history log. This is not intended to work for the header.
+
+        Args:
+            line (list<str>): A single line of the log as a list of the comma separated strings
+        Returns:
+            ((int, int, int), GameRecord): The setting and the game
+        Raises:
+            ValueError: The line is not a game
+        """
+
+        rows, cols, mines, timestamp, outcome, milliseconds, clicks, bbbv, seed = line
+        if outcome not in (WIN, LOSS):
+            raise ValueError('unknown outcome {}'.format(outcome))
+        return (int(rows), int(cols), int(mines)), GameRecord(int(timestamp), outcome, int(milliseconds), int(clicks),
+                                                              int(bbbv) if bbbv else None, int(seed) if seed else None)
+
+    @staticmethod
+    def format_line(setting, game_record):
+        """
+        Formats a game as a line of the history log
+
+        Args:
+            setting ((int, int, int)): The rows, cols and mines of the game
+            game_record (GameRecord): The game
+        Returns:
+            str: The line without the line break
+        """
+
+        output = StringIO()
+        csv.writer(output, lineterminator='').writerow(
+            setting + tuple('' if value is None else value for value in game_record))
+        return output.getvalue()
+
+    def load_snapshot(self):
+        """
+        Loads the statistics snapshot if it covers the current history log. Otherwise the statistics are rebuilt from
+        the whole history log by the next read. The caller must hold io_lock and a lock on the log.
+        """
+
+        try:
+            with open(self.snapshot_file) as f:
+                snapshot = json.load(f)
+        except (IOError, ValueError):
+            return
+
+        stat = os.stat(self.log.filename)
+        if tuple(snapshot['file_id']) != (stat.st_dev, stat.st_ino) or snapshot['file_offset'] > stat.st_size:
+            return
+
+        self.log.file_id = (stat.st_dev, stat.st_ino)
+        self.log.file_offset = snapshot['file_offset']
+        self.log.num_of_lines = self.snapshot_num_of_lines = snapshot['num_of_lines']
+        with self.stats_lock:
+            self.stats = dict((tuple(setting), SettingStats.from_state(state))
+                              for setting, state in snapshot['stats'])
+
+    def save_snapshot(self):
+        """
+        Saves the statistics along with how far they cover the history log. The snapshot is written to a temporary
+        file which then atomically replaces it. The caller must hold io_lock and an exclusive lock on the log.
+        """
+
+        with self.stats_lock:
+            snapshot = {
+                'file_id': self.log.file_id,
+                'file_offset': self.log.file_offset,
+                'num_of_lines': self.log.num_of_lines,
+                'stats': [[setting, setting_stats.get_state()] for setting, setting_stats in self.stats.items()],
+            }
+
+        temp_file = '{}.{}.tmp'.format(self.snapshot_file, os.getpid())
+        with open(temp_file, 'w') as f:
+            json.dump(snapshot, f)
+        os.rename(temp_file, self.snapshot_file)
+        self.snapshot_num_of_lines = snapshot['num_of_lines']
+
+    def read_new_games(self):
+        """
+        Rolls the games added to the history log since it was last read (possibly by other instances) into the
+        statistics. Lines which are not games are skipped. The caller must hold io_lock and a lock on the log.
+        """
+
+        for line in csv.reader(self.log.read_new_lines()):
+            try:
+                setting, game_record = GameStats.parse_line(line)
+            except ValueError:
+                continue
+            with self.stats_lock:
+                self.add_game(setting, game_record)
+
+    def add_game(self, setting, game_record):
+        """
+        Rolls a game into the statistics of its setting. The caller must hold stats_lock.
+
+        Args:
+            setting ((int, int, int)): The rows, cols and mines of the game
+            game_record (GameRecord): The game
+        """
+
+        if setting not in self.stats:
+            self.stats[setting] = SettingStats()
+        self.stats[setting].add_game(game_record)
+
+    def record_game(self, rows, cols, mines, is_win, milliseconds, clicks, bbbv=None, seed=None):
+        """
+        Records a finished game. It is counted by get_stats right away. If there is a writer, the history log is
+        written in the background.
+
+        Args:
+            rows (int): The total number of rows on the board
+            cols (int): The total number of columns on the board
+            mines (int): The total number of mines on the board
+            is_win (bool): Was the game won?
+            milliseconds (int): The game time
+            clicks (int): The number of clicks in the game
+            bbbv (int|None): The 3BV of the board or None if it is unknown. Defaults to None.
+            seed (int|None): The seed of the board or None if it is unknown. Defaults to None.
+        """
+
+        setting = (rows, cols, mines)
+        game_record = GameRecord(int(time.time()), WIN if is_win else LOSS, milliseconds, clicks, bbbv, seed)
+
+        with self.stats_lock:
+            self.pending_games.append((setting, game_record))
+
+        if self.writer is None:
+            self.write_pending_games()
+        else:
+            self.writer.schedule(self.write_pending_games)
+
+    def get_stats(self, rows, cols, mines):
+        """
+        Args:
+            rows (int): The total number of rows on the board
+            cols (int): The total number of columns on the board
+            mines (int): The total number of mines on the board
+        Returns:
+            SettingStats|None: The statistics of the setting, including the games not yet written, or None if no game
+                was played with it
+        """
+
+        setting = (rows, cols, mines)
+        with self.stats_lock:
+            setting_stats = self.stats.get(setting)
+            pending_records = [game_record for game_setting, game_record in self.pending_games
+                               if game_setting == setting]
+            if not pending_records:
+                return setting_stats
+
+            # The pending games are rolled into a copy, since the statistics only cover the history log
+            setting_stats = SettingStats() if setting_stats is None else \
+                SettingStats.from_state(setting_stats.get_state())
+        for game_record in pending_records:
+            setting_stats.add_game(game_record)
+        return setting_stats
+
+    def write_pending_games(self):
+        """
+        Appends all the pending games to the history log, rolls them into the statistics and saves the statistics
+        snapshot every SNAPSHOT_INTERVAL games. Under an exclusive lock, the games recorded by other instances are
+        rolled in first so that the statistics cover every game up to the end of the log.
+        """
+
+        with self.io_lock:
+            with self.stats_lock:
+                pending_games = list(self.pending_games)
+            if not pending_games:
+                return
+
+            with self.log.lock():
+                self.read_new_games()
+                self.log.append_lines([GameStats.format_line(setting, game_record)
+                                       for setting, game_record in pending_games])
+                with self.stats_lock:
+                    for setting, game_record in pending_games:
+                        self.add_game(setting, game_record)
+                    # Games recorded meanwhile stay pending
+                    del self.pending_games[:len(pending_games)]
+                if self.log.num_of_lines - self.snapshot_num_of_lines >= SNAPSHOT_INTERVAL:
+                    self.save_snapshot()
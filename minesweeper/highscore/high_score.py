@@ -10,13 +10,16 @@ class HighScore(object):
     High scores are maintained individually for each row/col/mine setting.
     """
 
-    def __init__(self, rows, cols, mines, screen):
+    def __init__(self, rows, cols, mines, screen, file_manager=None):
         """
         Args:
             rows (int): The total number of rows on the board
             cols (int): The total number of columns on the board
             mines (int): The total number of mines on the board
             screen (pygame.display): The screen object
+            file_manager (FileManager|None): The FileManager holding the high scores or None to load them from the
+                default file. Pass the same FileManager to every new game to avoid reading the file again.
+                Defaults to None.
         """
 
         self.rows = rows
@@ -24,7 +27,7 @@ class HighScore(object):
         self.mines = mines
 
         # Setup the high score
-        self.file_manager = FileManager()
+        self.file_manager = FileManager() if file_manager is None else file_manager
         self.high_score = self.get_high_score()
 
         # Setup the high score display
@@ -0,0 +1,250 @@
+"""
+This module contains the Leaderboard class which keeps many named entries per row/col/mine setting.
+
+Entries are stored in an append-only log (see AppendLog), so adding an entry costs a single append no matter how
+many entries there are. In memory, the entries of each setting are kept sorted, which makes top-N queries a slice,
+and the best entry of each player is indexed by name. The log is compacted once it holds too many entries which
+are neither among the best of their setting nor the best of their player.
+"""
+
+import csv
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from cStringIO import StringIO
+from append_log import AppendLog, get_local_file_name
+
+HEADER = 'rows,cols,mines,name,milliseconds,timestamp,seed\n'
+
+# The number of best entries kept per setting. The best entry of every player is kept as well.
+MAX_ENTRIES_PER_SETTING = 10000
+
+# The log is compacted once it holds more than COMPACTION_FACTOR * (number of kept entries) + COMPACTION_SLACK lines
+COMPACTION_FACTOR = 2
+COMPACTION_SLACK = 1000
+
+# A single leaderboard entry. Entries sort by time, ties are broken by who got there first.
+Entry = namedtuple('Entry', 'milliseconds timestamp name seed')
+
+
+class Leaderboard(object):
+    """
+    This class keeps the leaderboard of every row/col/mine setting
+    """
+
+    def __init__(self, leaderboard_file=None, writer=None, max_entries_per_setting=MAX_ENTRIES_PER_SETTING):
+        """
+        Args:
+            leaderboard_file (str|None): The leaderboard filename or None to use the default file in the 'local'
+                directory. Defaults to None.
+            writer (BackgroundWriter|None): The writer used to save entries in the background or None to save them
+                right away. Defaults to None.
+            max_entries_per_setting (int): The number of best entries kept per setting.
+                Defaults to MAX_ENTRIES_PER_SETTING.
+        """
+
+        if leaderboard_file is None:
+            leaderboard_file = get_local_file_name('leaderboard.csv')
+        self.log = AppendLog(leaderboard_file, HEADER)
+        self.writer = writer
+        self.max_entries_per_setting = max_entries_per_setting
+
+        # The best entries of each setting sorted from best to worst, keyed by (rows, cols, mines)
+        self.entries = {}
+
+        # The best entry of each player, keyed by (rows, cols, mines) and then by name
+        self.player_bests = {}
+
+        # The number of entries that are among the best of their setting or the best of their player (or both)
+        self.num_of_kept_entries = 0
+
+        # The entries added in memory but not yet written to the log
+        self.pending_lines = []
+        self.entries_lock = threading.Lock()
+        self.io_lock = threading.Lock()
+
+        with self.io_lock, self.log.lock(is_exclusive=False):
+            self.read_new_entries()
+
+    @staticmethod
+    def parse_line(line):
+        """
+        Parses a single line of the leaderboard log. This is not intended to work for the header.
+
+        Args:
+            line (list<str>): A single line of the log as a list of the comma separated strings
+        Returns:
+            ((int, int, int), Entry): The setting and the entry
+        Raises:
+            ValueError: The line is not a leaderboard entry
+        """
+
+        rows, cols, mines, name, milliseconds, timestamp, seed = line
+        return (int(rows), int(cols), int(mines)), Entry(int(milliseconds), int(timestamp), name,
+                                                         int(seed) if seed else None)
+
+    @staticmethod
+    def format_line(setting, entry):
+        """
+        Formats an entry as a line of the leaderboard log
+
+        Args:
+            setting ((int, int, int)): The rows, cols and mines of the entry
+            entry (Entry): The entry
+        Returns:
+            str: The line without the line break
+        """
+
+        output = StringIO()
+        csv.writer(output, lineterminator='').writerow(setting + (entry.name, entry.milliseconds, entry.timestamp,
+                                                                  '' if entry.seed is None else entry.seed))
+        return output.getvalue()
+
+    def read_new_entries(self):
+        """
+        Reads the entries added to the log since it was last read (possibly by other instances) into memory.
+        The caller must hold io_lock and a lock on the log.
+        """
+
+        for line in csv.reader(self.log.read_new_lines()):
+            try:
+                setting, entry = Leaderboard.parse_line(line)
+            except ValueError:
+                continue
+            with self.entries_lock:
+                self.index_entry(setting, entry)
+
+    def index_entry(self, setting, entry):
+        """
+        Adds an entry to the in-memory index. Indexing an entry again does nothing, since the whole log is read again
+        once another instance compacted it. The caller must hold entries_lock.
+
+        Args:
+            setting ((int, int, int)): The rows, cols and mines of the entry
+            entry (Entry): The entry
+        """
+
+        entries = self.entries.setdefault(setting, [])
+        player_bests = self.player_bests.setdefault(setting, {})
+        index = bisect_left(entries, entry)
+        if index < len(entries) and entries[index] == entry:
+            return
+
+        is_among_entries = index < self.max_entries_per_setting
+        if is_among_entries:
+            entries.insert(index, entry)
+            self.num_of_kept_entries += 1
+            if len(entries) > self.max_entries_per_setting:
+                dropped_entry = entries.pop()
+                if player_bests.get(dropped_entry.name) != dropped_entry:
+                    self.num_of_kept_entries -= 1
+
+        previous_best = player_bests.get(entry.name)
+        if previous_best is None or entry < previous_best:
+            player_bests[entry.name] = entry
+            if not is_among_entries:
+                self.num_of_kept_entries += 1
+            if previous_best is not None and not Leaderboard.is_among(entries, previous_best):
+                self.num_of_kept_entries -= 1
+
+    @staticmethod
+    def is_among(entries, entry):
+        """
+        Args:
+            entries (list<Entry>): Entries sorted from best to worst
+            entry (Entry): An entry
+        Returns:
+            bool: Is the entry among the entries?
+        """
+
+        index = bisect_left(entries, entry)
+        return index < len(entries) and entries[index] == entry
+
+    def add_entry(self, rows, cols, mines, name, milliseconds, seed=None):
+        """
+        Adds an entry to the leaderboard. It is available from memory right away. If there is a writer, the log is
+        written in the background.
+
+        Args:
+            rows (int): The total number of rows on the board
+            cols (int): The total number of columns on the board
+            mines (int): The total number of mines on the board
+            name (str): The player name
+            milliseconds (int): The time it took to win
+            seed (int|None): The seed of the board or None if it is unknown. Defaults to None.
+        Returns:
+            int: The rank of the entry (1 is the best) or None if it is not among the kept entries
+        """
+
+        setting = (rows, cols, mines)
+        entry = Entry(milliseconds, int(time.time()), name, seed)
+
+        with self.entries_lock:
+            self.index_entry(setting, entry)
+            self.pending_lines.append(Leaderboard.format_line(setting, entry))
+            entries = self.entries[setting]
+            index = bisect_left(entries, entry)
+            rank = index + 1 if index < len(entries) and entries[index] == entry else None
+
+        if self.writer is None:
+            self.write_pending_entries()
+        else:
+            self.writer.schedule(self.write_pending_entries)
+
+        return rank
+
+    def get_top_entries(self, rows, cols, mines, n=10):
+        """
+        Args:
+            rows (int): The total number of rows on the board
+            cols (int): The total number of columns on the board
+            mines (int): The total number of mines on the board
+            n (int): The number of entries to get. Defaults to 10.
+        Returns:
+            list<Entry>: The n best entries, best first
+        """
+
+        return self.entries.get((rows, cols, mines), [])[:n]
+
+    def get_player_best(self, rows, cols, mines, name):
+        """
+        Args:
+            rows (int): The total number of rows on the board
+            cols (int): The total number of columns on the board
+            mines (int): The total number of mines on the board
+            name (str): The player name
+        Returns:
+            Entry|None: The best entry of the player or None if the player has no entry
+        """
+
+        return self.player_bests.get((rows, cols, mines), {}).get(name)
+
+    def write_pending_entries(self):
+        """
+        Writes all the pending entries to the log.
+        Under an exclusive lock, the entries added by other instances are read first so that they are not lost when
+        the log is compacted. Compaction keeps the best entries of every setting and the best entry of every player.
+        """
+
+        with self.entries_lock:
+            pending_lines, self.pending_lines = self.pending_lines, []
+        if not pending_lines:
+            return
+
+        with self.io_lock, self.log.lock():
+            self.read_new_entries()
+
+            # The kept entries are only collected when the log is compacted, so a write costs a single append
+            if self.log.num_of_lines + len(pending_lines) > \
+                    COMPACTION_FACTOR * self.num_of_kept_entries + COMPACTION_SLACK:
+                with self.entries_lock:
+                    kept_entries = set()
+                    for setting, entries in self.entries.items():
+                        kept_entries.update((setting, entry) for entry in entries)
+                    for setting, player_bests in self.player_bests.items():
+                        kept_entries.update((setting, entry) for entry in player_bests.values())
+                self.log.replace_lines([Leaderboard.format_line(setting, entry)
+                                        for setting, entry in sorted(kept_entries)])
+            else:
+                self.log.append_lines(pending_lines)
@@ -33,6 +33,16 @@ class Record(object):
 
         return self.rows, self.cols, self.mines, self.high_score
 
+    def get_key(self):
+        """
+        Gets the rows/cols/mines setting the record is for
+
+        Returns:
+            tuple<int, int, int>: The rows, cols and mines
+        """
+
+        return self.rows, self.cols, self.mines
+
     def __eq__(self, other):
         """
         Override the == operator. This is useful for sorting Record objects.
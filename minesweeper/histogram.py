@@ -0,0 +1,96 @@
+"""This module contains the Histogram class which summarizes a stream of values in constant memory."""
+
+from bisect import bisect_left
+
+
+class Histogram(object):
+    """
+    This class represents a histogram with fixed buckets. Adding a value costs a binary search over the buckets.
+    """
+
+    def __init__(self, buckets):
+        """
+        Args:
+            buckets (tuple<float>): The sorted upper bounds of the buckets. Larger values go to an overflow bucket.
+        """
+
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        """
+        Adds a value to the histogram
+
+        Args:
+            value (float): The value to add
+        """
+
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        """
+        Gets an upper bound of the given percentile
+
+        Args:
+            percent (float): The percentile to get (e.g. 99)
+        Returns:
+            float: The upper bound of the bucket containing the percentile, capped at the maximum value added
+        """
+
+        rank = self.count * percent / 100.0
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count > 0:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return 0
+
+    def as_dict(self):
+        """
+        Returns:
+            dict: The histogram summary and bucket counts, ready to be dumped as json
+        """
+
+        return {
+            'count': self.count,
+            'mean': self.total / float(self.count) if self.count else 0,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'buckets': [[bucket, count] for bucket, count in zip(self.buckets + ('inf',), self.counts) if count],
+        }
+
+    def get_state(self):
+        """
+        Returns:
+            dict: Everything needed to restore the histogram with from_state, ready to be dumped as json
+        """
+
+        return {'counts': self.counts, 'count': self.count, 'total': self.total, 'max': self.max}
+
+    @staticmethod
+    def from_state(buckets, state):
+        """
+        Restores a histogram saved with get_state
+
+        Args:
+            buckets (tuple<float>): The sorted upper bounds of the buckets. They must be the buckets of the saved
+                histogram.
+            state (dict): The saved state
+        Returns:
+            Histogram: The restored histogram
+        """
+
+        histogram = Histogram(buckets)
+        if len(state['counts']) == len(histogram.counts):
+            histogram.counts = list(state['counts'])
+            histogram.count = state['count']
+            histogram.total = state['total']
+            histogram.max = state['max']
+        return histogram
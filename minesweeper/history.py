@@ -0,0 +1,143 @@
+"""
+This module contains the History class which keeps the undo and redo history of a practice game.
+
+Every history entry only holds what a single move changed: the tiles it revealed or the tile whose flag it toggled.
+Undoing or redoing a move therefore costs as much as the move itself, no matter how big the board is. The memory
+used is bounded by evicting the oldest entries once the history holds too many entries or tiles.
+"""
+
+from collections import deque, namedtuple
+
+REVEAL = 'reveal'
+FLAG = 'flag'
+
+# The default bounds of the history. None means unbounded.
+MAX_ENTRIES = None
+MAX_TILES = 10 ** 6
+
+# A single move. tiles are the revealed tiles of a REVEAL or the toggled tile of a FLAG. mine_tiles are the mines a
+# losing REVEAL hit (empty otherwise).
+HistoryEntry = namedtuple('HistoryEntry', 'kind tiles mine_tiles')
+
+
+class History(object):
+    """
+    This class keeps the moves that can be undone and the undone moves that can be redone
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_tiles=MAX_TILES):
+        """
+        Args:
+            max_entries (int|None): The number of entries kept before the oldest ones are evicted or None to not limit
+                the number of entries. Defaults to MAX_ENTRIES.
+            max_tiles (int|None): The number of tiles kept in all the entries before the oldest entries are evicted or
+                None to not limit the number of tiles. Defaults to MAX_TILES.
+        """
+
+        self.max_entries = max_entries
+        self.max_tiles = max_tiles
+
+        self.undo_entries = deque()
+        self.redo_entries = []
+        self.num_of_tiles = 0
+        self.num_of_evicted_entries = 0
+
+    def record_reveal(self, revealed_tiles, mine_tiles):
+        """
+        Records a move which revealed tiles. Moves which changed nothing are not recorded.
+
+        Args:
+            revealed_tiles (list<Tile>): The non-mine tiles the move revealed
+            mine_tiles (list<Tile>): The mines the move hit
+        """
+
+        if revealed_tiles or mine_tiles:
+            self.record(HistoryEntry(REVEAL, revealed_tiles, mine_tiles))
+
+    def record_flag(self, tile):
+        """
+        Records a move which toggled the flag of a tile
+
+        Args:
+            tile (Tile): The tile
+        """
+
+        self.record(HistoryEntry(FLAG, [tile], []))
+
+    def record(self, entry):
+        """
+        Records a new move. The undone moves can no longer be redone.
+
+        Args:
+            entry (HistoryEntry): The move
+        """
+
+        for redo_entry in self.redo_entries:
+            self.num_of_tiles -= len(redo_entry.tiles)
+        self.redo_entries = []
+
+        self.undo_entries.append(entry)
+        self.num_of_tiles += len(entry.tiles)
+        self.evict()
+
+    def evict(self):
+        """Evicts the oldest entries until the history is within its bounds. The latest entry is always kept."""
+        while len(self.undo_entries) > 1 and \
+                (self.max_entries is not None and len(self.undo_entries) > self.max_entries or
+                 self.max_tiles is not None and self.num_of_tiles > self.max_tiles):
+            self.num_of_tiles -= len(self.undo_entries.popleft().tiles)
+            self.num_of_evicted_entries += 1
+
+    def undo(self):
+        """
+        Returns:
+            HistoryEntry|None: The latest move, which should now be undone, or None if there is nothing to undo
+        """
+
+        if not self.undo_entries:
+            return None
+        entry = self.undo_entries.pop()
+        self.redo_entries.append(entry)
+        return entry
+
+    def redo(self):
+        """
+        Returns:
+            HistoryEntry|None: The latest undone move, which should now be redone, or None if there is nothing to redo
+        """
+
+        if not self.redo_entries:
+            return None
+        entry = self.redo_entries.pop()
+        self.undo_entries.append(entry)
+        return entry
+
+    def clear(self):
+        """Forgets all the moves. This should be called when a new game starts."""
+        self.undo_entries.clear()
+        self.redo_entries = []
+        self.num_of_tiles = 0
+
+
+class NoHistory(object):
+    """
+    This class keeps no history. It is used outside of practice mode, where moves cannot be undone.
+    """
+
+    def record_reveal(self, revealed_tiles, mine_tiles):
+        pass
+
+    def record_flag(self, tile):
+        pass
+
+    def undo(self):
+        return None
+
+    def redo(self):
+        return None
+
+    def clear(self):
+        pass
+
+
+NO_HISTORY = NoHistory()
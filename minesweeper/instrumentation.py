@@ -0,0 +1,175 @@
+"""
+This module contains the Instrumentation class which measures frame times and input latency of the Minesweeper game.
+
+Instrumentation is opt-in. While it is disabled, measuring costs a single attribute check.
+"""
+
+import json
+import logging
+from collections import deque
+from timeit import default_timer
+import pygame
+import colors
+import fonts
+import frame_scheduler
+from histogram import Histogram
+logger = logging.getLogger(__name__)
+
+# The bucket upper bounds (in milliseconds) of the duration histograms
+DURATION_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+# The bucket upper bounds (in tiles) of the reveal size histogram
+REVEAL_SIZE_BUCKETS = tuple(2 ** i for i in xrange(21))
+
+# The number of recent frames the overlay summarizes
+RECENT_FRAMES = 50
+
+OVERLAY_FONT_SIZE = 16
+OVERLAY_WIDTH = 160
+OVERLAY_HEIGHT = 36
+
+
+class Measurement(object):
+    """
+    This class is a context manager which adds the duration of its block (in milliseconds) to a histogram
+    """
+
+    def __init__(self, histogram):
+        """
+        Args:
+            histogram (Histogram): The histogram to add the duration to
+        """
+
+        self.histogram = histogram
+        self.start_time = None
+
+    def __enter__(self):
+        self.start_time = default_timer()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.add((default_timer() - self.start_time) * 1000)
+
+
+class NoMeasurement(object):
+    """
+    This class is a context manager which measures nothing. It is used while instrumentation is disabled.
+    """
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+NO_MEASUREMENT = NoMeasurement()
+
+
+class Instrumentation(object):
+    """
+    This class records per-frame durations, per-handler latency histograms and reveal sizes.
+    It shows a summary in an overlay at the top right of the screen and can dump everything to a json file.
+    """
+
+    def __init__(self, screen, is_enabled=False, output_file=None):
+        """
+        Args:
+            screen (pygame.display): The screen object
+            is_enabled (bool): Should measuring start right away? Defaults to False.
+            output_file (str|None): The json file to dump the measurements to or None to not dump them.
+                Defaults to None.
+        """
+
+        self.screen = screen
+        self.is_enabled = is_enabled
+        self.output_file = output_file
+
+        self.frame_times = Histogram(DURATION_BUCKETS)
+        self.recent_frame_times = deque(maxlen=RECENT_FRAMES)
+        self.handler_times = {}
+        self.reveal_sizes = Histogram(REVEAL_SIZE_BUCKETS)
+        self.last_reveal_size = 0
+        self.frame_start_time = None
+
+        screen_width = self.screen.get_width()
+        self.rect = pygame.Rect(screen_width - OVERLAY_WIDTH, 0, OVERLAY_WIDTH, OVERLAY_HEIGHT)
+
+    def toggle(self):
+        """Enables or disables instrumentation. The overlay is erased when disabling."""
+        self.is_enabled = not self.is_enabled
+        self.frame_start_time = None
+        if not self.is_enabled:
+            frame_scheduler.add_dirty_rect(pygame.draw.rect(self.screen, colors.NAVYBLUE, self.rect))
+
+    def measure(self, name):
+        """
+        Measures the duration of a block of code
+
+        Args:
+            name (str): The name of the histogram to add the duration to (e.g. 'left_up')
+        Returns:
+            Measurement|NoMeasurement: A context manager that measures the duration of its block
+        """
+
+        if not self.is_enabled:
+            return NO_MEASUREMENT
+
+        if name not in self.handler_times:
+            self.handler_times[name] = Histogram(DURATION_BUCKETS)
+        return Measurement(self.handler_times[name])
+
+    def record_reveal(self, tiles_revealed):
+        """
+        Records the size of a reveal
+
+        Args:
+            tiles_revealed (int): The number of tiles revealed by a single click
+        """
+
+        if self.is_enabled and tiles_revealed > 0:
+            self.reveal_sizes.add(tiles_revealed)
+            self.last_reveal_size = tiles_revealed
+
+    def start_frame(self):
+        """Marks the start of a frame, i.e. the game loop woke up to handle events"""
+        if self.is_enabled:
+            self.frame_start_time = default_timer()
+
+    def end_frame(self):
+        """Marks the end of a frame. Records its duration and prints the overlay."""
+        if self.is_enabled and self.frame_start_time is not None:
+            frame_time = (default_timer() - self.frame_start_time) * 1000
+            self.frame_times.add(frame_time)
+            self.recent_frame_times.append(frame_time)
+            self.print_overlay()
+
+    def print_overlay(self):
+        """Prints a summary of the recent frames and the last reveal on the overlay rect"""
+        font = fonts.get_font(OVERLAY_FONT_SIZE)
+        recent_average = sum(self.recent_frame_times) / len(self.recent_frame_times)
+        lines = (' frame {:.1f}ms max {:.1f}ms'.format(recent_average, max(self.recent_frame_times)),
+                 ' last reveal {} tiles'.format(self.last_reveal_size))
+
+        frame_scheduler.add_dirty_rect(pygame.draw.rect(self.screen, colors.GRAY, self.rect))
+        for i, line in enumerate(lines):
+            self.screen.blit(font.render(line, True, colors.BLACK, colors.GRAY),
+                             (self.rect.left, self.rect.top + 2 + i * OVERLAY_HEIGHT / 2))
+
+    def as_dict(self):
+        """
+        Returns:
+            dict: All the measurements, ready to be dumped as json
+        """
+
+        return {
+            'frame_ms': self.frame_times.as_dict(),
+            'handler_ms': {name: histogram.as_dict() for name, histogram in self.handler_times.items()},
+            'reveal_sizes': self.reveal_sizes.as_dict(),
+        }
+
+    def dump(self):
+        """Dumps the measurements to the output file, if there is one"""
+        if self.output_file is not None:
+            with open(self.output_file, 'w') as f:
+                json.dump(self.as_dict(), f, indent=2, sort_keys=True)
+            logger.info('Wrote instrumentation to %s', self.output_file)
@@ -4,7 +4,29 @@
 
 import argparse
 import logging
+import os
+import sys
+import time
+
+# Recorded before the game modules (and pygame) are imported so that the startup time includes the imports
+START_TIME = time.time()
+
 from game import Game
+from profiler import Profiler, PHASES, DEFAULT_OUTPUT_FILE
+from highscore.leaderboard import Leaderboard
+from highscore.game_stats import GameStats
+from replay import replayer
+from replay.replay_recorder import get_replay_dir
+from game_save import load_saved_game
+from server.game_server import GameServer
+from tournament import tournament
+from telemetry import get_telemetry_dir
+import memory_report
+from mapped_board import MappedBoard
+import topology
+
+# The time (in milliseconds) main.py may take from starting up to showing the first board before a warning is logged
+STARTUP_TIME_BUDGET = 1000
 
 
 def parse_args():
@@ -20,6 +42,60 @@ def parse_args():
     parser.add_argument('--rows', '-r', type=int, default=16)
     parser.add_argument('--cols', '-c', type=int, default=30)
     parser.add_argument('--mines', '-m', type=int, default=99)
+    parser.add_argument('--name', help='The name to enter wins into the leaderboard with (default: the login name)')
+    parser.add_argument('--seed', type=int, help='Play every board with this seed instead of a random one')
+    parser.add_argument('--resume', action='store_true',
+                        help='Resume the game that was in progress when the game was last quit. Its rows/cols/mines '
+                             'replace the given ones.')
+    parser.add_argument('--topology', choices=sorted(topology.TOPOLOGIES), default=topology.RECTANGULAR,
+                        help='Which tiles are neighbors: the 8 around a tile (rect), the 8 around it wrapping around '
+                             'the edges (torus), the 6 around a hexagon (hex) or the 4 sharing an edge (four). Games '
+                             'on other topologies than rect are not entered into the high scores, leaderboard or '
+                             'statistics. (default: %(default)s)')
+    parser.add_argument('--practice', action='store_true',
+                        help='Play in practice mode: undo with Ctrl+Z and redo with Ctrl+Y. Practice games are not '
+                             'entered into the high scores, leaderboard or statistics.')
+    parser.add_argument('--broadcast', metavar='ADDRESS',
+                        help='Broadcast the game to spectators connecting to HOST:PORT or a Unix socket path')
+    parser.add_argument('--telemetry', nargs='?', const='', metavar='DIR',
+                        help='Record clicks, reveal sizes, frame times and game outcomes to rotating compressed JSONL '
+                             'files in DIR (default: local/telemetry)')
+    parser.add_argument('--leaderboard', type=int, metavar='N',
+                        help='Print the N best leaderboard entries for the rows/cols/mines and exit')
+    parser.add_argument('--stats', action='store_true',
+                        help='Print the game statistics for the rows/cols/mines and exit')
+    parser.add_argument('--verify-replays', nargs='*', metavar='PATH',
+                        help='Replay the given replay files and directories (default: all saved replays) headlessly, '
+                             'check that their claimed results and times match and exit')
+    parser.add_argument('--tournament', metavar='BOTS',
+                        help='Play the comma separated bots (built-in: {}, or module:Class) on the same seeded '
+                             'boards of the rows/cols/mines, print the results and exit'.format(
+                                 ','.join(sorted(tournament.BOTS))))
+    parser.add_argument('--boards', type=int, default=1000,
+                        help='The number of boards in a tournament (default: %(default)s)')
+    parser.add_argument('--processes', type=int,
+                        help='The number of processes verifying replays or playing a tournament (default: one per '
+                             'CPU)')
+    parser.add_argument('--serve', metavar='ADDRESS',
+                        help='Host headless games for remote players on HOST:PORT or a Unix socket path until '
+                             'interrupted')
+    parser.add_argument('--memory-report', action='store_true',
+                        help='Build a board of the rows/cols/mines without a window, play it, print the memory of each '
+                             'subsystem after construction and after play and exit')
+    parser.add_argument('--create-puzzle', metavar='FILE',
+                        help='Create a memory-mapped puzzle board of the rows/cols/mines (which may have billions of '
+                             'tiles) in FILE and exit')
+    parser.add_argument('--startup-budget', type=int, default=STARTUP_TIME_BUDGET,
+                        help='Startup time budget in milliseconds (default: %(default)s)')
+    parser.add_argument('--instrument', action='store_true',
+                        help='Show frame times and input latency from the start (toggle with F3)')
+    parser.add_argument('--instrument-out', help='Dump the frame time and input latency measurements to this json '
+                                                 'file on exit')
+    parser.add_argument('--profile', action='store_true', help='Profile the whole game with cProfile')
+    parser.add_argument('--profile-out', default=DEFAULT_OUTPUT_FILE,
+                        help='The .pstats file to write the profile to (default: %(default)s)')
+    parser.add_argument('--profile-phases', type=parse_phases,
+                        help='Only profile these comma separated phases of the game: ' + ','.join(PHASES))
 
     args = parser.parse_args()
 
@@ -30,6 +106,23 @@ def parse_args():
     return args
 
 
+def parse_phases(phases):
+    """
+    Parses the comma separated list of phases to profile
+
+    Args:
+        phases (str): The comma separated phases
+    Returns:
+        list<str>: The phases
+    """
+
+    phases = phases.split(',')
+    for phase in phases:
+        if phase not in PHASES:
+            raise argparse.ArgumentTypeError('unknown phase {}. Choose from {}'.format(phase, ','.join(PHASES)))
+    return phases
+
+
 def main():
     """Parses the command line arguments and starts a Minesweeper game."""
     # Configure the logger
@@ -39,8 +132,232 @@ def main():
     # Parse the command line arguments
     args = parse_args()
 
+    if args.leaderboard is not None:
+        print_leaderboard(args.rows, args.cols, args.mines, args.leaderboard)
+        return
+    if args.stats:
+        print_stats(args.rows, args.cols, args.mines)
+        return
+    if args.verify_replays is not None:
+        sys.exit(0 if verify_replays(args.verify_replays or [get_replay_dir()], args.processes) else 1)
+    if args.tournament is not None:
+        print_tournament(args.tournament.split(','), args.rows, args.cols, args.mines, args.boards, args.seed,
+                         args.processes)
+        return
+    if args.create_puzzle is not None:
+        create_puzzle(args.create_puzzle, args.rows, args.cols, args.mines, args.seed)
+        return
+    if args.memory_report:
+        print_memory_report(args.rows, args.cols, args.mines, args.seed)
+        return
+    if args.serve is not None:
+        try:
+            GameServer(args.serve).serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    # Setup the profiler. Selecting phases implies profiling.
+    profiler = None
+    if args.profile or args.profile_phases is not None:
+        profiler = Profiler(args.profile_phases, args.profile_out)
+        profiler.start()
+
+    # Load the saved game to resume
+    saved_game = None
+    if args.resume:
+        saved_game = load_saved_game()
+        if saved_game is None:
+            print 'There is no saved game to resume. Starting a new game.'
+        else:
+            # Only rectangular games are saved
+            args.rows, args.cols, args.mines = saved_game.rows, saved_game.cols, saved_game.mines
+            args.topology = topology.RECTANGULAR
+
     # Start a game of Minesweeper
-    Game(args.rows, args.cols, args.mines)
+    try:
+        game = Game(args.rows, args.cols, args.mines, instrument=args.instrument or args.instrument_out is not None,
+                    instrument_file=args.instrument_out, profiler=profiler, seed=args.seed, player_name=args.name,
+                    practice=args.practice, broadcast_address=args.broadcast,
+                    telemetry_dir=get_telemetry_dir() if args.telemetry == '' else args.telemetry,
+                    topology=args.topology)
+        if saved_game is not None:
+            game.resume_game(saved_game)
+        check_startup_time(args.startup_budget)
+        game.play_game()
+    finally:
+        if profiler is not None:
+            profiler.stop()
+
+
+def print_leaderboard(rows, cols, mines, n):
+    """
+    Prints the best leaderboard entries for the given rows/cols/mines
+
+    Args:
+        rows (int): The total number of rows on the board
+        cols (int): The total number of columns on the board
+        mines (int): The total number of mines on the board
+        n (int): The number of entries to print
+    """
+
+    print 'Leaderboard for {}x{} with {} mines'.format(rows, cols, mines)
+    for rank, entry in enumerate(Leaderboard().get_top_entries(rows, cols, mines, n), 1):
+        print '{:>4}. {:<20} {:>8.3f}s  {}  seed {}'.format(rank, entry.name, entry.milliseconds / 1000.0,
+                                                       time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.timestamp)),
+                                                       entry.seed)
+
+
+def print_stats(rows, cols, mines):
+    """
+    Prints the game statistics for the given rows/cols/mines
+
+    Args:
+        rows (int): The total number of rows on the board
+        cols (int): The total number of columns on the board
+        mines (int): The total number of mines on the board
+    """
+
+    print 'Statistics for {}x{} with {} mines'.format(rows, cols, mines)
+    setting_stats = GameStats().get_stats(rows, cols, mines)
+    if setting_stats is None:
+        print 'No games played yet'
+        return
+
+    summary = setting_stats.get_summary()
+    print 'Games played:   {games} ({wins} won, {win_rate:.1%})'.format(**summary)
+    print 'Win streak:     {current_win_streak} (best {best_win_streak})'.format(**summary)
+    print 'Loss streak:    {current_loss_streak} (worst {worst_loss_streak})'.format(**summary)
+    print 'Clicks:         {mean_clicks:.1f} per game'.format(**summary)
+    if summary['best_time'] is not None:
+        print 'Win time:       best {:.3f}s, mean {:.3f}s, median {:.3f}s, p90 {:.3f}s'.format(
+            summary['best_time'] / 1000.0, summary['mean_time'] / 1000.0, summary['median_time'] / 1000.0,
+            summary['p90_time'] / 1000.0)
+        print '3BV/s:          {3bv_per_second:.2f}'.format(**summary)
+
+
+def verify_replays(paths, processes):
+    """
+    Verifies replays in parallel and prints the invalid ones along with a summary
+
+    Args:
+        paths (list<str>): Replay filenames and directories
+        processes (int|None): The number of worker processes or None to use one per CPU
+    Returns:
+        bool: Are all the replays valid?
+    """
+
+    replay_files = replayer.find_replay_files(paths)
+    start_time = time.time()
+
+    num_of_invalid_replays = 0
+    for result in replayer.verify_replays(replay_files, processes):
+        if result.errors:
+            num_of_invalid_replays += 1
+            print '{}: {}'.format(result.replay_file, '; '.join(result.errors))
+
+    elapsed_time = time.time() - start_time
+    print 'Verified {} replays in {:.2f}s: {} valid, {} invalid'.format(
+        len(replay_files), elapsed_time, len(replay_files) - num_of_invalid_replays, num_of_invalid_replays)
+    return num_of_invalid_replays == 0
+
+
+def print_tournament(bot_names, rows, cols, mines, num_of_boards, seed, processes):
+    """
+    Plays a bot tournament and prints the results table
+
+    Args:
+        bot_names (list<str>): The bots
+        rows (int): The total number of rows on the board
+        cols (int): The total number of columns on the board
+        mines (int): The total number of mines on the board
+        num_of_boards (int): The number of boards every bot plays
+        seed (int|None): The seed the boards are drawn from or None for random boards
+        processes (int|None): The number of worker processes or None to use one per CPU
+    """
+
+    start_time = time.time()
+    boards = tournament.generate_boards(rows, cols, mines, num_of_boards, seed)
+    standings = tournament.run_tournament(bot_names, boards, processes)
+    elapsed_time = time.time() - start_time
+
+    print 'Tournament on {} boards of {}x{} with {} mines'.format(num_of_boards, rows, cols, mines)
+    print '{:<20} {:>6} {:>6} {:>8} {:>10} {:>8} {:>8}'.format('bot', 'games', 'wins', 'win rate', 'mean ms',
+                                                              'clicks', '3BV/s')
+    for standing in standings:
+        print '{bot:<20} {games:>6} {wins:>6} {win_rate:>8.1%} {mean_milliseconds:>10.2f} {mean_clicks:>8.1f} ' \
+              '{3bv_per_second:>8.1f}'.format(**standing.get_summary())
+    print 'Played {} games in {:.2f}s'.format(num_of_boards * len(bot_names), elapsed_time)
+
+
+def print_memory_report(rows, cols, mines, seed):
+    """
+    Prints the memory of each subsystem of a board after construction and after play, in total and per 1000 tiles
+
+    Args:
+        rows (int): The total number of rows on the board
+        cols (int): The total number of columns on the board
+        mines (int): The total number of mines on the board
+        seed (int|None): The seed of the mine layout or None for a random layout
+    """
+
+    report = memory_report.run_memory_report(rows, cols, mines, seed)
+    kilobytes_per_1000_tiles = 1000.0 / 1024 / (rows * cols)
+
+    print 'Memory report for {}x{} with {} mines'.format(rows, cols, mines)
+    print '{:<16}'.format('subsystem') + ''.join('{:>14} {:>14}'.format(snapshot.stage + ' MB', 'KB/1000 tiles')
+                                                 for snapshot in report.snapshots)
+    for subsystem in memory_report.SUBSYSTEMS + ('total',):
+        line = '{:<16}'.format(subsystem)
+        for snapshot in report.snapshots:
+            size = sum(snapshot.subsystems.values()) if subsystem == 'total' else snapshot.subsystems[subsystem]
+            line += '{:>14.2f} {:>14.2f}'.format(size / 1024.0 ** 2, size * kilobytes_per_1000_tiles)
+        print line
+    if all(snapshot.rss is not None for snapshot in report.snapshots):
+        print '{:<16}'.format('process RSS') + ''.join(
+            '{:>14.2f} {:>14.2f}'.format(snapshot.rss / 1024.0 ** 2, snapshot.rss * kilobytes_per_1000_tiles)
+            for snapshot in report.snapshots)
+    print 'Largest reveal result: {:.2f} MB ({:.2f} KB/1000 tiles)'.format(
+        report.peak_reveal_result / 1024.0 ** 2, report.peak_reveal_result * kilobytes_per_1000_tiles)
+    if report.peak_rss is not None:
+        print 'Peak process RSS: {:.2f} MB ({:.2f} KB/1000 tiles)'.format(report.peak_rss / 1024.0 ** 2,
+                                                                          report.peak_rss * kilobytes_per_1000_tiles)
+
+
+def create_puzzle(file_name, rows, cols, mines, seed):
+    """
+    Creates a memory-mapped puzzle board and prints where to start it
+
+    Args:
+        file_name (str): The board file
+        rows (int): The total number of rows on the board
+        cols (int): The total number of columns on the board
+        mines (int): The total number of mines on the board
+        seed (int|None): The seed of the mine layout or None for a random layout
+    """
+
+    start_time = time.time()
+    board = MappedBoard.create(file_name, rows, cols, mines, seed)
+    board.close()
+    print 'Created a {}x{} puzzle with {} mines in {} ({:.1f} MB) in {:.2f}s. Start on row {}, col {}.'.format(
+        rows, cols, mines, file_name, os.path.getsize(file_name) / 1024.0 ** 2, time.time() - start_time,
+        board.start_tile_index / cols, board.start_tile_index % cols)
+
+
+def check_startup_time(startup_budget):
+    """
+    Logs the time it took to start up and warns if it exceeded the startup time budget
+
+    Args:
+        startup_budget (int): The startup time budget in milliseconds
+    """
+
+    startup_time = (time.time() - START_TIME) * 1000
+    logger = logging.getLogger(__name__)
+    if startup_time > startup_budget:
+        logger.warning('Startup took %d ms which exceeds the budget of %d ms', startup_time, startup_budget)
+    else:
+        logger.info('Startup took %d ms (budget %d ms)', startup_time, startup_budget)
 
 
 if __name__ == '__main__':
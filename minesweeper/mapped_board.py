@@ -0,0 +1,401 @@
+"""
+This module contains the MappedBoard class which plays giant puzzle boards (10^8 and more tiles) straight from a
+memory-mapped file.
+
+A Board keeps a Tile object per tile, which takes about a kilobyte, so it cannot hold such boards. A MappedBoard keeps
+nothing per tile but three bits in the file: the mine, shown and flagged bitsets (see bitset). The operating system
+pages the bitsets in as they are touched, so opening a board is instant no matter its size and only the regions that
+are played take memory. Moves update the bitsets in place, so saving is a flush of the dirty pages rather than a pass
+over the board. The value of a tile is counted from the mine bits of its neighbors when needed.
+
+The mines are laid out when the board is created, around a start tile which is never a mine nor next to one, so a
+puzzle can be shared and every player starts from the same opening.
+
+File: the header (HEADER) followed by the mine, shown and flagged bitsets, each starting on a page boundary. The
+header holds MAGIC, VERSION, rows, cols, mines, the start tile index, the number of hidden non mine tiles, unflagged
+mines and clicks and the state of the game, little-endian.
+"""
+
+import ctypes
+import mmap
+import os
+import random
+import struct
+from collections import namedtuple
+import bitset
+
+MAGIC = 'MSMB'
+VERSION = 1
+
+# magic, version, rows, cols, mines, start tile index, hidden non mine tiles, unflagged mines, clicks, state
+HEADER = struct.Struct('<4sB3xIIQQQqQB7x')
+
+# The states of the game
+NEW = 0
+PLAYING = 1
+WON = 2
+LOST = 3
+
+# The result of a move. mine_indices are the mines revealed (by a chord there can be several).
+MappedRevealResult = namedtuple('MappedRevealResult', 'non_mines_uncovered hit_mine mine_indices')
+
+NO_REVEAL = MappedRevealResult(0, False, ())
+
+
+class MappedBoardError(ValueError):
+    """Raised when a mapped board file is not valid"""
+    pass
+
+
+def get_bitset_offsets(rows, cols):
+    """
+    Args:
+        rows (int): The total number of rows on the board
+        cols (int): The total number of columns on the board
+    Returns:
+        (int, int, int, int): The offsets of the mine, shown and flagged bitsets in the file and the file size
+    """
+
+    page_size = mmap.ALLOCATIONGRANULARITY
+    section_size = (bitset.get_num_of_bytes(rows * cols) + page_size - 1) / page_size * page_size
+    mine_offset = (HEADER.size + page_size - 1) / page_size * page_size
+    return mine_offset, mine_offset + section_size, mine_offset + 2 * section_size, mine_offset + 3 * section_size
+
+
+class MappedBoard(object):
+    """
+    This class represents a board whose mine, shown and flagged tiles live in a memory-mapped file. Tiles are
+    addressed by their index (row * cols + col), like in a HeadlessGame.
+    """
+
+    def __init__(self, file_name):
+        """
+        Opens a board created by MappedBoard.create. Nothing but the header is read.
+
+        Args:
+            file_name (str): The board file
+        Raises:
+            MappedBoardError: The file is not a mapped board
+        """
+
+        self.file_name = file_name
+        self.file = open(file_name, 'r+b')
+        try:
+            header = self.file.read(HEADER.size)
+            if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+                raise MappedBoardError('{} is not a mapped board'.format(file_name))
+            (_, version, self.rows, self.cols, self.num_of_mines, self.start_tile_index,
+             self.num_of_hidden_non_mines_tiles, self.num_of_unflagged_mines, self.num_of_clicks,
+             self.state) = HEADER.unpack(header)
+            if version != VERSION:
+                raise MappedBoardError('unsupported mapped board version {}'.format(version))
+
+            mine_offset, shown_offset, flagged_offset, file_size = get_bitset_offsets(self.rows, self.cols)
+            if os.fstat(self.file.fileno()).st_size != file_size:
+                raise MappedBoardError('{} is cut short'.format(file_name))
+            self.map = mmap.mmap(self.file.fileno(), file_size)
+        except Exception:
+            self.file.close()
+            raise
+
+        num_of_bytes = bitset.get_num_of_bytes(self.rows * self.cols)
+        self.mine_bits = (ctypes.c_ubyte * num_of_bytes).from_buffer(self.map, mine_offset)
+        self.shown_bits = (ctypes.c_ubyte * num_of_bytes).from_buffer(self.map, shown_offset)
+        self.flagged_bits = (ctypes.c_ubyte * num_of_bytes).from_buffer(self.map, flagged_offset)
+
+    @classmethod
+    def create(cls, file_name, rows, cols, mines, seed=None, start_tile_index=None):
+        """
+        Creates a board file with a random mine layout and opens it. The bitsets start out as a sparse file, so only
+        the pages holding mines are written.
+
+        Args:
+            file_name (str): The board file. An existing file is replaced.
+            rows (int): The total number of rows on the board
+            cols (int): The total number of columns on the board
+            mines (int): The total number of mines on the board
+            seed (int|None): The seed of the mine layout or None for a random layout. Defaults to None.
+            start_tile_index (int|None): The tile index to keep clear of mines along with its neighbors or None for
+                the center tile. Defaults to None.
+        Returns:
+            MappedBoard: The board
+        Raises:
+            ValueError: There is no room for the mines or the start tile is not on the board
+        """
+
+        if start_tile_index is None:
+            start_tile_index = rows / 2 * cols + cols / 2
+        if not 0 <= start_tile_index < rows * cols:
+            raise ValueError('start tile index {} is not on the board'.format(start_tile_index))
+        # Checked before the file is opened, which would truncate it. The start tile and its neighbors get no mines.
+        start_row, start_col = divmod(start_tile_index, cols)
+        start_cluster_size = (min(start_row + 2, rows) - max(start_row - 1, 0)) * \
+            (min(start_col + 2, cols) - max(start_col - 1, 0))
+        if not 0 <= mines <= rows * cols - start_cluster_size:
+            raise ValueError('{} mines do not fit on a {}x{} board'.format(mines, rows, cols))
+
+        with open(file_name, 'wb') as board_file:
+            board_file.write(HEADER.pack(MAGIC, VERSION, rows, cols, mines, start_tile_index, rows * cols - mines,
+                                         mines, 0, NEW))
+            board_file.truncate(get_bitset_offsets(rows, cols)[3])
+
+        board = cls(file_name)
+        try:
+            start_cluster = set(board.get_neighbors(start_tile_index))
+            start_cluster.add(start_tile_index)
+            board.lay_out_mines(random.Random(seed), start_cluster)
+            board.flush()
+        except Exception:
+            board.close()
+            os.remove(file_name)
+            raise
+        return board
+
+    def lay_out_mines(self, rng, start_cluster):
+        """
+        Sets the mine bits of randomly picked tiles outside the start cluster
+
+        Args:
+            rng (random.Random): The random number generator picking the tiles
+            start_cluster (set<int>): The tile indices to keep clear of mines
+        """
+
+        mine_bits = self.mine_bits
+        size = self.rows * self.cols
+        num_of_mines = 0
+        while num_of_mines < self.num_of_mines:
+            tile_index = rng.randrange(size)
+            if not mine_bits[tile_index >> 3] >> (tile_index & 7) & 1 and tile_index not in start_cluster:
+                mine_bits[tile_index >> 3] |= 1 << (tile_index & 7)
+                num_of_mines += 1
+
+    @property
+    def is_game_over(self):
+        """
+        Returns:
+            bool: Was the game won or lost?
+        """
+
+        return self.state in (WON, LOST)
+
+    @property
+    def is_game_lost(self):
+        """
+        Returns:
+            bool: Was the game lost?
+        """
+
+        return self.state == LOST
+
+    def get_neighbors(self, tile_index):
+        """
+        Args:
+            tile_index (int): The tile index (row * cols + col)
+        Returns:
+            list<int>: The tile indices of the neighbors of the tile
+        """
+
+        cols = self.cols
+        row, col = divmod(tile_index, cols)
+        first_col = col - 1 if col > 0 else col
+        last_col = col + 1 if col < cols - 1 else col
+        return [neighbor_row * cols + neighbor_col
+                for neighbor_row in xrange(max(row - 1, 0), min(row + 2, self.rows))
+                for neighbor_col in xrange(first_col, last_col + 1)
+                if neighbor_row != row or neighbor_col != col]
+
+    def is_mine(self, tile_index):
+        """
+        Args:
+            tile_index (int): The tile index (row * cols + col)
+        Returns:
+            bool: Is there a mine on the tile?
+        """
+
+        return bool(self.mine_bits[tile_index >> 3] >> (tile_index & 7) & 1)
+
+    def is_shown(self, tile_index):
+        """
+        Args:
+            tile_index (int): The tile index (row * cols + col)
+        Returns:
+            bool: Is the tile shown?
+        """
+
+        return bool(self.shown_bits[tile_index >> 3] >> (tile_index & 7) & 1)
+
+    def is_flagged(self, tile_index):
+        """
+        Args:
+            tile_index (int): The tile index (row * cols + col)
+        Returns:
+            bool: Is the tile flagged?
+        """
+
+        return bool(self.flagged_bits[tile_index >> 3] >> (tile_index & 7) & 1)
+
+    def get_value(self, tile_index):
+        """
+        Args:
+            tile_index (int): The tile index (row * cols + col)
+        Returns:
+            int: The number of mines next to the tile
+        """
+
+        mine_bits = self.mine_bits
+        return sum(mine_bits[neighbor >> 3] >> (neighbor & 7) & 1 for neighbor in self.get_neighbors(tile_index))
+
+    def check_tile_index(self, tile_index):
+        """
+        Args:
+            tile_index (int): The tile index (row * cols + col)
+        Raises:
+            IndexError: The tile index is not on the board
+        """
+
+        if not 0 <= tile_index < self.rows * self.cols:
+            raise IndexError('tile index {} is not on the board'.format(tile_index))
+
+    def reveal(self, tile_index):
+        """
+        Left clicks a tile. A zero tile opens its neighbors, and theirs, like in a Board.
+
+        Args:
+            tile_index (int): The tile index (row * cols + col)
+        Returns:
+            MappedRevealResult: The result of the click. It is empty if the game is already over.
+        Raises:
+            IndexError: The tile index is not on the board
+        """
+
+        self.check_tile_index(tile_index)
+        if self.is_game_over:
+            return NO_REVEAL
+
+        self.num_of_clicks += 1
+        self.state = PLAYING
+        return self.process_reveal(self.reveal_tiles([tile_index]))
+
+    def chord(self, tile_index):
+        """
+        Shortcut clicks a tile, which reveals its neighbors if it is shown and fully flagged
+
+        Args:
+            tile_index (int): The tile index (row * cols + col)
+        Returns:
+            MappedRevealResult: The result of the click. It is empty if the game has not started or is already over.
+        Raises:
+            IndexError: The tile index is not on the board
+        """
+
+        self.check_tile_index(tile_index)
+        if self.state != PLAYING:
+            return NO_REVEAL
+
+        self.num_of_clicks += 1
+        neighbors = self.get_neighbors(tile_index)
+        if not self.is_shown(tile_index) or self.is_flagged(tile_index) or \
+                self.get_value(tile_index) != sum(self.is_flagged(neighbor) for neighbor in neighbors):
+            self.save_header()
+            return NO_REVEAL
+        return self.process_reveal(self.reveal_tiles(neighbors))
+
+    def flag(self, tile_index):
+        """
+        Right clicks a tile, which toggles its flag. Flags can only be placed once the game started.
+
+        Args:
+            tile_index (int): The tile index (row * cols + col)
+        Returns:
+            int: The change in the number of mines remaining (0 if the flag could not be toggled)
+        Raises:
+            IndexError: The tile index is not on the board
+        """
+
+        self.check_tile_index(tile_index)
+        if self.state != PLAYING:
+            return 0
+
+        self.num_of_clicks += 1
+        change_in_unflagged_mines = 0
+        if not self.is_shown(tile_index):
+            self.flagged_bits[tile_index >> 3] ^= 1 << (tile_index & 7)
+            change_in_unflagged_mines = -1 if self.is_flagged(tile_index) else 1
+            self.num_of_unflagged_mines += change_in_unflagged_mines
+        self.save_header()
+        return change_in_unflagged_mines
+
+    def reveal_tiles(self, tile_indices):
+        """
+        Reveals tiles and opens the neighbors of the zero tiles among them, working directly on the bitsets
+
+        Args:
+            tile_indices (list<int>): The tile indices to reveal
+        Returns:
+            MappedRevealResult: The tiles revealed and the mines hit
+        """
+
+        mine_bits, shown_bits, flagged_bits = self.mine_bits, self.shown_bits, self.flagged_bits
+        get_neighbors = self.get_neighbors
+        non_mines_uncovered = 0
+        mine_indices = []
+
+        tiles_to_reveal = list(tile_indices)
+        while tiles_to_reveal:
+            tile_index = tiles_to_reveal.pop()
+            byte_index, bit = tile_index >> 3, 1 << (tile_index & 7)
+            if shown_bits[byte_index] & bit or flagged_bits[byte_index] & bit:
+                continue
+            if mine_bits[byte_index] & bit:
+                if tile_index not in mine_indices:
+                    mine_indices.append(tile_index)
+                continue
+
+            shown_bits[byte_index] |= bit
+            non_mines_uncovered += 1
+            neighbors = get_neighbors(tile_index)
+            if not any(mine_bits[neighbor >> 3] >> (neighbor & 7) & 1 for neighbor in neighbors):
+                # Only queueing the hidden neighbors keeps the stack small on huge openings
+                tiles_to_reveal.extend(neighbor for neighbor in neighbors
+                                       if not (shown_bits[neighbor >> 3] | flagged_bits[neighbor >> 3])
+                                       >> (neighbor & 7) & 1)
+
+        return MappedRevealResult(non_mines_uncovered, bool(mine_indices), tuple(mine_indices))
+
+    def process_reveal(self, reveal_result):
+        """
+        Updates the state of the game after tiles were revealed
+
+        Args:
+            reveal_result (MappedRevealResult): The tiles revealed and the mines hit
+        Returns:
+            MappedRevealResult: reveal_result
+        """
+
+        self.num_of_hidden_non_mines_tiles -= reveal_result.non_mines_uncovered
+        if reveal_result.hit_mine:
+            self.state = LOST
+        elif self.num_of_hidden_non_mines_tiles == 0:
+            self.state = WON
+        self.save_header()
+        return reveal_result
+
+    def save_header(self):
+        """Writes the counters and the state of the game into the mapped header"""
+        HEADER.pack_into(self.map, 0, MAGIC, VERSION, self.rows, self.cols, self.num_of_mines, self.start_tile_index,
+                         self.num_of_hidden_non_mines_tiles, self.num_of_unflagged_mines, self.num_of_clicks,
+                         self.state)
+
+    def flush(self):
+        """Saves the board: writes the pages changed since the last flush to the file"""
+        self.map.flush()
+
+    def close(self):
+        """Flushes and closes the board. It cannot be played after closing."""
+        if self.map is not None:
+            self.flush()
+            # The bitsets point into the map, so they must be gone before it is unmapped
+            self.mine_bits = self.shown_bits = self.flagged_bits = None
+            self.map.close()
+            self.map = None
+            self.file.close()
@@ -0,0 +1,243 @@
+"""
+This module breaks down the memory used by a board, subsystem by subsystem, to size machines for giant boards and to
+catch memory regressions.
+
+Python 2 has no tracemalloc, so the objects of each subsystem are walked and their sizes summed with sys.getsizeof.
+This counts exactly what each object takes in CPython, but not the allocator overhead or objects shared with the rest
+of the program (small ints, booleans, colors). The adjacency tables the neighbor lists are built from stay cached for
+the next board of the same size (see topology), so they are counted as well. The resident set size of the process is
+reported next to it, so the gap between the two shows the overhead. pygame.Surface pixel buffers are not Python
+objects; their size is computed from their dimensions.
+"""
+
+import os
+import sys
+from collections import namedtuple
+import display_params
+import pics
+import fonts
+import topology
+from board import Board
+from tile_reveal_result import TileRevealResult
+
+# The subsystems in the order they are reported
+TILES = 'tiles'
+NEIGHBOR_LISTS = 'neighbor lists'
+RECTS = 'rects'
+GRID = 'grid'
+ADJACENCY_TABLES = 'adjacency tables'
+SURFACES = 'surfaces'
+SUBSYSTEMS = (TILES, NEIGHBOR_LISTS, RECTS, GRID, ADJACENCY_TABLES, SURFACES)
+
+# The largest int CPython caches. Larger ints are separate objects.
+MAX_CACHED_INT = 256
+
+# The number of random reveals played after the first click
+DEFAULT_MOVES = 1000
+
+# The memory of a board at one stage of the report. subsystems maps each subsystem to its size in bytes and rss is the
+# resident set size of the process in bytes or None if it is not known.
+MemorySnapshot = namedtuple('MemorySnapshot', 'stage num_of_tiles subsystems rss')
+
+# The result of a memory report. peak_reveal_result is the size (in bytes) of the largest reveal result (with its
+# deque and lists) at any point of a cascade during play, which only lives while the reveal is handled, and peak_rss
+# the peak resident set size (in bytes) of the process or None if it is not known.
+MemoryReport = namedtuple('MemoryReport', 'rows cols mines snapshots peak_reveal_result peak_rss')
+
+
+def get_int_size(value):
+    """
+    Args:
+        value (int): An int
+    Returns:
+        int: The size (in bytes) of the int object or 0 if CPython shares it
+    """
+
+    return 0 if -5 <= value <= MAX_CACHED_INT else sys.getsizeof(value)
+
+
+def get_board_memory(board):
+    """
+    Sums up the memory of the tiles, their neighbor lists and rects and the grid of a board
+
+    Args:
+        board (Board): The board
+    Returns:
+        dict<str, int>: The size (in bytes) of each subsystem
+    """
+
+    getsizeof = sys.getsizeof
+    tiles = neighbor_lists = rects = 0
+    for tile in board.flattened_board:
+        # A tile's row is shared by its whole row (see below), but its col is an int of its own
+        tiles += getsizeof(tile) + getsizeof(tile.__dict__) + get_int_size(tile.col)
+        neighbor_lists += getsizeof(tile.neighbors)
+        if tile.location is not None:
+            rects += getsizeof(tile.location)
+
+    grid = getsizeof(board.tile_grid) + getsizeof(board.flattened_board)
+    for row in board.tile_grid:
+        grid += getsizeof(row)
+        if row:
+            tiles += get_int_size(row[0].row)
+    if board.location is not None:
+        rects += getsizeof(board.location)
+
+    return {TILES: tiles, NEIGHBOR_LISTS: neighbor_lists, RECTS: rects, GRID: grid}
+
+
+def get_reveal_result_memory(tile_reveal_result):
+    """
+    Args:
+        tile_reveal_result (TileRevealResult): The result of a reveal
+    Returns:
+        int: The size (in bytes) of the result and its lists and deque, not counting the tiles they refer to
+    """
+
+    getsizeof = sys.getsizeof
+    return getsizeof(tile_reveal_result) + getsizeof(tile_reveal_result.__dict__) + \
+        getsizeof(tile_reveal_result.mine_tiles) + getsizeof(tile_reveal_result.additional_tiles_to_reveal) + \
+        getsizeof(tile_reveal_result.revealed_tiles)
+
+
+def measure_left_click_up(clicked_tile):
+    """
+    Handles a left click up on a tile like Board.left_click_up, measuring the reveal result along the cascade. The
+    deque of tiles to reveal is drained by the time the click is handled, so its peak is only seen during the cascade.
+
+    Args:
+        clicked_tile (Tile): The tile that was clicked
+    Returns:
+        (TileRevealResult, int): The reveal result and its largest size (in bytes) during the cascade
+    """
+
+    tile_reveal_result = TileRevealResult(additional_tiles_to_reveal=[clicked_tile])
+    peak_reveal_result = get_reveal_result_memory(tile_reveal_result)
+
+    while len(tile_reveal_result.additional_tiles_to_reveal) > 0:
+        tile = tile_reveal_result.additional_tiles_to_reveal.popleft()
+        if not tile.is_shown:
+            tile_reveal_result += tile.left_click_up()
+            peak_reveal_result = max(peak_reveal_result, get_reveal_result_memory(tile_reveal_result))
+
+    return tile_reveal_result, peak_reveal_result
+
+
+def get_surface_memory(surfaces):
+    """
+    Args:
+        surfaces (iterable<pygame.Surface>): Surfaces
+    Returns:
+        int: The size (in bytes) of the pixel buffers of the surfaces
+    """
+
+    return sum(surface.get_width() * surface.get_height() * surface.get_bytesize() for surface in surfaces)
+
+
+def get_rss():
+    """
+    Returns:
+        int|None: The resident set size (in bytes) of the process or None if it is not known (it is read from /proc)
+    """
+
+    try:
+        with open('/proc/self/statm') as statm_file:
+            return int(statm_file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, IndexError):
+        return None
+
+
+def get_peak_rss():
+    """
+    Returns:
+        int|None: The peak resident set size (in bytes) of the process or None if it is not known
+    """
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+def create_screen(rows, cols):
+    """
+    Creates a screen the size the game uses for the board. The dummy video driver is used unless another one is set,
+    so no window is opened.
+
+    Args:
+        rows (int): The total number of rows on the board
+        cols (int): The total number of columns on the board
+    Returns:
+        pygame.Surface: The screen
+    """
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    pygame.init()
+    screen_width = max(display_params.RECT_SIZE * cols + 2 * display_params.MARGIN_SIDE,
+                       display_params.MIN_SCREEN_WIDTH)
+    screen_height = display_params.RECT_SIZE * rows + display_params.MARGIN_TOP + display_params.MARGIN_BOTTOM
+    return pygame.display.set_mode((screen_width, screen_height))
+
+
+def take_snapshot(stage, board, screen):
+    """
+    Args:
+        stage (str): The name of the stage (e.g. 'construction')
+        board (Board): The board
+        screen (pygame.Surface): The screen
+    Returns:
+        MemorySnapshot: The memory of the board at this stage
+    """
+
+    subsystems = get_board_memory(board)
+    subsystems[ADJACENCY_TABLES] = topology.get_cached_table_size()
+    subsystems[SURFACES] = get_surface_memory([screen] + pics.LOADED_PICS.values())
+    return MemorySnapshot(stage, board.rows * board.cols, subsystems, get_rss())
+
+
+def run_memory_report(rows, cols, mines, seed=None, moves=DEFAULT_MOVES):
+    """
+    Builds a board on a screen, plays it and breaks down its memory after construction and after playing. The play
+    is a first click in the center followed by reveals of random safe tiles, so the game is never lost.
+
+    Args:
+        rows (int): The total number of rows on the board
+        cols (int): The total number of columns on the board
+        mines (int): The total number of mines on the board
+        seed (int|None): The seed of the mine layout or None for a random layout. Defaults to None.
+        moves (int): The number of reveals after the first click. Defaults to DEFAULT_MOVES.
+    Returns:
+        MemoryReport: The report
+    """
+
+    screen = create_screen(rows, cols)
+    board = Board(rows, cols, mines, screen, seed)
+    # Load the font and pictures the tiles are drawn with as the game would, so that their surfaces are counted
+    fonts.get_basic_font()
+    for pic_name in pics.ALL_PICS:
+        pics.get_pic(pic_name)
+    snapshots = [take_snapshot('construction', board, screen)]
+
+    first_click_tile = board.tile_grid[rows / 2][cols / 2]
+    board.first_click(first_click_tile)
+    peak_reveal_result = measure_left_click_up(first_click_tile)[1]
+
+    safe_tiles = [tile for tile in board.flattened_board if not tile.is_mine]
+    board.random.shuffle(safe_tiles)
+    for tile in safe_tiles:
+        if moves == 0:
+            break
+        if not tile.is_shown:
+            moves -= 1
+            peak_reveal_result = max(peak_reveal_result, measure_left_click_up(tile)[1])
+    snapshots.append(take_snapshot('play', board, screen))
+
+    # The peak is sampled by the kernel, so it may lag the last reading of the current resident set size
+    peak_rss = get_peak_rss()
+    if peak_rss is not None:
+        peak_rss = max([peak_rss] + [snapshot.rss for snapshot in snapshots if snapshot.rss is not None])
+    return MemoryReport(rows, cols, mines, snapshots, peak_reveal_result, peak_rss)
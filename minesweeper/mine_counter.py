@@ -3,7 +3,9 @@
 import pygame
 import display_params
 import colors
+import fonts
 import pics
+import frame_scheduler
 
 
 class MineCounter(object):
@@ -33,25 +35,26 @@ class MineCounter(object):
              pygame.Rect: A pygame.Rect object which has the location on the the screen.
         """
 
-        return pygame.Rect(display_params.MARGIN_SIDE + pics.BLUE_MINE.get_width() + 4, self.screen.get_height() - 50,
-                           60, 40)
+        return pygame.Rect(display_params.MARGIN_SIDE + pics.get_pic(pics.BLUE_MINE).get_width() + 4,
+                           self.screen.get_height() - 50, 60, 40)
 
     def draw_mine_symbol(self):
         """Draw the mine symbol"""
-        self.screen.blit(pics.BLUE_MINE, (display_params.MARGIN_SIDE, self.screen.get_height() - 52))
+        frame_scheduler.add_dirty_rect(self.screen.blit(pics.get_pic(pics.BLUE_MINE),
+                                                        (display_params.MARGIN_SIDE, self.screen.get_height() - 52)))
 
     def print_mine_counter(self):
         """Prints the number of unflagged mines left on the counter rect"""
-        pygame.draw.rect(self.screen, colors.GRAY, self.rect)
+        frame_scheduler.add_dirty_rect(pygame.draw.rect(self.screen, colors.GRAY, self.rect))
         self.screen.blit(self.get_mine_counter_text(), self.rect)
 
     def get_mine_counter_text(self):
         """
         Returns:
-            pygame.font.SysFont: The formatted num_of_unflagged_mines value to show on the screen
+            pygame.Surface: The formatted num_of_unflagged_mines value to show on the screen
         """
 
-        return display_params.COUNTER_FONT.render(str(self.num_of_unflagged_mines), True, colors.BLACK, colors.GRAY)
+        return fonts.get_counter_font().render(str(self.num_of_unflagged_mines), True, colors.BLACK, colors.GRAY)
 
     def update(self, change_in_unflagged_mines):
         """
@@ -0,0 +1,172 @@
+"""
+This module contains the ObservationRenderer class which renders boards into NumPy images without a window.
+
+Every tile of a board is in one of a few states (a shown value, hidden, flagged or one of the mine pictures shown when
+the game is lost). A sprite of each state is drawn once with pygame, looking like the tile does in the game, and
+scaled to the tile size. Rendering then only indexes the sprite table with the array of tile states, so a whole batch
+of boards is rendered with a handful of NumPy operations instead of one blit per tile.
+
+numpy is only needed by this module and pygame only while the sprites are drawn, so neither needs a display.
+"""
+
+import numpy
+import display_params
+import colors
+import fonts
+import pics
+
+# The tile states. 0-8 are the values of shown tiles.
+HIDDEN = 9
+FLAGGED = 10
+MINE = 11
+RED_MINE = 12
+FLAG_MINE = 13
+FLAG_X = 14
+NUM_OF_STATES = 15
+
+# The pictures of the tile states which are drawn with a picture
+STATE_PICS = {
+    FLAGGED: pics.FLAG,
+    MINE: pics.MINE,
+    RED_MINE: pics.RED_MINE,
+    FLAG_MINE: pics.FLAG_MINE,
+    FLAG_X: pics.FLAG_X,
+}
+
+
+class ObservationRenderer(object):
+    """
+    This class renders tile states into (rows*k, cols*k, 3) uint8 RGB images, where k is the tile size
+    """
+
+    def __init__(self, tile_size=display_params.RECT_SIZE):
+        """
+        Draws the sprite table
+
+        Args:
+            tile_size (int): The size k (in pixels) of a tile including its grid line. Defaults to
+                display_params.RECT_SIZE, the size of a tile in the game.
+        """
+
+        self.tile_size = tile_size
+        self.sprites = self.create_sprites()
+
+    def create_sprites(self):
+        """
+        Draws a sprite of every tile state the way the Tile class draws it on the screen, with the grid line on its top
+        and left edges
+
+        Returns:
+            numpy.ndarray: The sprites as a (NUM_OF_STATES, k, k, 3) uint8 array
+        """
+
+        import pygame
+        sprites = numpy.empty((NUM_OF_STATES, self.tile_size, self.tile_size, 3), dtype=numpy.uint8)
+        spot = pygame.Rect(1, 1, display_params.SPOT_SIZE, display_params.SPOT_SIZE)
+
+        for state in xrange(NUM_OF_STATES):
+            surface = pygame.Surface((display_params.RECT_SIZE, display_params.RECT_SIZE))
+            surface.fill(colors.AQUA)
+            surface.set_clip(spot)
+            if state in STATE_PICS:
+                surface.blit(pics.get_pic(STATE_PICS[state]), spot)
+            elif state == HIDDEN:
+                surface.fill(colors.GRAY, spot)
+            else:
+                surface.fill(colors.SOFTWHITE, spot)
+                surface.blit(fonts.get_basic_font().render(' {} '.format(' ' if state == 0 else state), True,
+                                                           colors.COLORS[state], colors.SOFTWHITE), spot)
+            surface.set_clip(None)
+
+            if self.tile_size != display_params.RECT_SIZE:
+                surface = pygame.transform.smoothscale(surface, (self.tile_size, self.tile_size))
+            # surfarray indexes pixels as [x][y], images are [y][x]
+            sprites[state] = pygame.surfarray.array3d(surface).swapaxes(0, 1)
+
+        return sprites
+
+    def render(self, states, out=None):
+        """
+        Renders one board or a batch of boards
+
+        Args:
+            states (numpy.ndarray): The tile states as a (rows, cols) array or a (batch, rows, cols) array for a batch
+                of boards
+            out (numpy.ndarray|None): A C-contiguous uint8 array of the shape of the result to render into, e.g. to
+                reuse it across batches, or None to allocate a new one. Defaults to None.
+        Returns:
+            numpy.ndarray: The images as a (rows*k, cols*k, 3) or (batch, rows*k, cols*k, 3) uint8 array
+        Raises:
+            ValueError: out is not a C-contiguous uint8 array of the shape of the result
+        """
+
+        states = numpy.asarray(states, dtype=numpy.intp)
+        k = self.tile_size
+        rows, cols = states.shape[-2:]
+        shape = states.shape[:-2] + (rows * k, cols * k, 3)
+        if out is None:
+            out = numpy.empty(shape, dtype=numpy.uint8)
+        elif out.shape != shape or out.dtype != numpy.uint8 or not out.flags.c_contiguous:
+            # Reshaping a non-contiguous array would copy it, so the images would be rendered into the copy
+            raise ValueError('out must be a C-contiguous uint8 array of shape {}'.format(shape))
+
+        # Seen as (..., rows, k, cols, k, 3), the image is tile row, pixel row, tile col, pixel col. Filling it one
+        # pixel row of the sprites at a time keeps the temporary arrays k times smaller than the image.
+        tiles = out.reshape(states.shape[:-2] + (rows, k, cols, k, 3))
+        for pixel_row in xrange(k):
+            tiles[..., pixel_row, :, :, :] = self.sprites[:, pixel_row][states]
+        return out
+
+
+def get_tile_state(tile, is_game_lost, losing_tiles):
+    """
+    Args:
+        tile (Tile): A tile
+        is_game_lost (bool): Was the game lost? Then the mines and wrong flags are shown like Tile.reveal shows them.
+        losing_tiles (set<Tile>): The mines that were revealed to lose the game
+    Returns:
+        int: The state of the tile
+    """
+
+    if tile.is_shown:
+        return tile.value
+    if is_game_lost:
+        if tile.is_mine:
+            if tile.is_flagged:
+                return FLAG_MINE
+            return RED_MINE if tile in losing_tiles else MINE
+        if tile.is_flagged:
+            return FLAG_X
+    return FLAGGED if tile.is_flagged else HIDDEN
+
+
+def get_tile_states(board, is_game_lost=False, losing_tiles=()):
+    """
+    Gets the state of every tile of a board
+
+    Args:
+        board (Board): The board
+        is_game_lost (bool): Was the game lost? Defaults to False.
+        losing_tiles (iterable<Tile>): The mines that were revealed to lose the game. Defaults to none.
+    Returns:
+        numpy.ndarray: The tile states as a (rows, cols) uint8 array
+    """
+
+    losing_tiles = set(losing_tiles)
+    states = numpy.fromiter((get_tile_state(tile, is_game_lost, losing_tiles) for tile in board.flattened_board),
+                            dtype=numpy.uint8, count=board.rows * board.cols)
+    return states.reshape(board.rows, board.cols)
+
+
+def get_game_states(games):
+    """
+    Gets the tile states of a batch of headless games of the same size. The mines of a lost game are all shown
+    alike since a headless game does not keep the mine that lost it.
+
+    Args:
+        games (list<HeadlessGame>): The games
+    Returns:
+        numpy.ndarray: The tile states as a (batch, rows, cols) uint8 array
+    """
+
+    return numpy.stack([get_tile_states(game.board, game.is_game_lost) for game in games])
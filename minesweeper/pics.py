@@ -1,21 +1,101 @@
-"""This module defines several images used in the Minesweeper game"""
+"""
+This module defines several images used in the Minesweeper game.
+
+The images are decoded lazily, the first time they are requested through get_pic, and cached afterwards. If the
+pre-packed asset bundle exists (see build_bundle), all the images are read from that single file instead of
+decoding each JPEG separately. Run this module as a script to (re)build the bundle.
+"""
 
 import os
-import pygame
+import cPickle
 
 
 # The path where all the pics are located
 PICS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pics')
 
-BLUE_MINE = pygame.image.load(os.path.join(PICS_PATH, 'MinesweeperBlueMine.jpg'))
-CLOCK = pygame.image.load(os.path.join(PICS_PATH, 'MinesweeperClock.jpg'))
-SMILEY = pygame.image.load(os.path.join(PICS_PATH, 'MinesweeperSmiley.jpg'))
-UH_OH = pygame.image.load(os.path.join(PICS_PATH, 'MinesweeperUhOh.jpg'))
-SAD = pygame.image.load(os.path.join(PICS_PATH, 'MinesweeperSad.jpg'))
-SUNGLASSES = pygame.image.load(os.path.join(PICS_PATH, 'MinesweeperSunglass.jpg'))
-FLAG_SCROLL = pygame.image.load(os.path.join(PICS_PATH, 'MinesweeperFlagScroll.jpg'))
-FLAG = pygame.image.load(os.path.join(PICS_PATH, 'MinesweeperFlag.jpg'))
-MINE = pygame.image.load(os.path.join(PICS_PATH, 'Mine.jpg'))
-RED_MINE = pygame.image.load(os.path.join(PICS_PATH, 'RedMine.jpg'))
-FLAG_MINE = pygame.image.load(os.path.join(PICS_PATH, 'MineWithFlag.jpg'))
-FLAG_X = pygame.image.load(os.path.join(PICS_PATH, 'MinesweeperFlagX.jpg'))
+# A single file containing the raw pixels of every picture. See build_bundle.
+BUNDLE_FILE = os.path.join(PICS_PATH, 'pics.bundle')
+
+# The picture names. Pass them to get_pic to get the actual image.
+BLUE_MINE = 'MinesweeperBlueMine.jpg'
+CLOCK = 'MinesweeperClock.jpg'
+SMILEY = 'MinesweeperSmiley.jpg'
+UH_OH = 'MinesweeperUhOh.jpg'
+SAD = 'MinesweeperSad.jpg'
+SUNGLASSES = 'MinesweeperSunglass.jpg'
+FLAG_SCROLL = 'MinesweeperFlagScroll.jpg'
+FLAG = 'MinesweeperFlag.jpg'
+MINE = 'Mine.jpg'
+RED_MINE = 'RedMine.jpg'
+FLAG_MINE = 'MineWithFlag.jpg'
+FLAG_X = 'MinesweeperFlagX.jpg'
+
+ALL_PICS = (BLUE_MINE, CLOCK, SMILEY, UH_OH, SAD, SUNGLASSES, FLAG_SCROLL, FLAG, MINE, RED_MINE, FLAG_MINE, FLAG_X)
+
+# The pictures loaded so far keyed by picture name
+LOADED_PICS = {}
+
+
+def get_pic(pic_name):
+    """
+    Gets a picture. The picture is loaded the first time it is requested and cached afterwards.
+
+    Args:
+        pic_name (str): One of the picture names defined in this module (e.g. pics.SMILEY)
+    Returns:
+        pygame.Surface: The picture
+    """
+
+    if pic_name not in LOADED_PICS:
+        if not LOADED_PICS and os.path.exists(BUNDLE_FILE):
+            LOADED_PICS.update(load_bundle())
+        if pic_name not in LOADED_PICS:
+            LOADED_PICS[pic_name] = load_pic_file(pic_name)
+
+    return LOADED_PICS[pic_name]
+
+
+def load_pic_file(pic_name):
+    """
+    Decodes a single picture from its image file
+
+    Args:
+        pic_name (str): One of the picture names defined in this module
+    Returns:
+        pygame.Surface: The picture
+    """
+
+    import pygame
+    return pygame.image.load(os.path.join(PICS_PATH, pic_name))
+
+
+def load_bundle():
+    """
+    Loads all the pictures from the asset bundle
+
+    Returns:
+        dict<str, pygame.Surface>: The pictures keyed by picture name
+    """
+
+    import pygame
+    with open(BUNDLE_FILE, 'rb') as f:
+        raw_pics = cPickle.load(f)
+
+    return {pic_name: pygame.image.fromstring(pixels, size, 'RGB') for pic_name, (size, pixels) in raw_pics.items()}
+
+
+def build_bundle():
+    """Decodes every picture and writes the raw pixels of all of them to the asset bundle"""
+    import pygame
+    raw_pics = {}
+    for pic_name in ALL_PICS:
+        pic = load_pic_file(pic_name)
+        raw_pics[pic_name] = (pic.get_size(), pygame.image.tostring(pic, 'RGB'))
+
+    with open(BUNDLE_FILE, 'wb') as f:
+        cPickle.dump(raw_pics, f, cPickle.HIGHEST_PROTOCOL)
+
+
+if __name__ == '__main__':
+    build_bundle()
+    print 'Wrote {}'.format(BUNDLE_FILE)
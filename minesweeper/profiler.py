@@ -0,0 +1,115 @@
+"""
+This module contains the Profiler class which profiles the Minesweeper game with cProfile.
+
+The profiler either profiles everything between start and stop or, in sampling mode, only selected phases of the
+game. The result is written to a standard .pstats file and a short summary is printed when profiling stops.
+"""
+
+import cProfile
+import pstats
+
+# The phases of the game that can be profiled individually
+BOARD_PHASE = 'board'
+FIRST_CLICK_PHASE = 'first_click'
+CASCADE_PHASE = 'cascade'
+RENDER_PHASE = 'render'
+PHASES = (BOARD_PHASE, FIRST_CLICK_PHASE, CASCADE_PHASE, RENDER_PHASE)
+
+DEFAULT_OUTPUT_FILE = 'minesweeper.pstats'
+
+# The number of functions shown in the summary
+SUMMARY_LENGTH = 20
+
+
+class Profiler(object):
+    """
+    This class profiles the whole game or only selected phases of it
+    """
+
+    def __init__(self, phases=None, output_file=DEFAULT_OUTPUT_FILE):
+        """
+        Args:
+            phases (list<str>|None): The phases to profile (see PHASES) or None to profile everything between start
+                and stop. An empty list profiles nothing. Defaults to None.
+            output_file (str): The .pstats file to write the profile to. Defaults to DEFAULT_OUTPUT_FILE.
+        """
+
+        self.phases = phases
+        self.output_file = output_file
+        self.profile = cProfile.Profile()
+
+        # The number of phases currently being profiled. Phases can be nested (e.g. a cascade during rendering).
+        self.depth = 0
+
+    def start(self):
+        """Starts profiling if the whole game is profiled"""
+        if self.phases is None:
+            self.profile.enable()
+
+    def phase(self, name):
+        """
+        Profiles a phase of the game if it was selected
+
+        Args:
+            name (str): The phase name (see PHASES)
+        Returns:
+            PhaseProfile|NoPhaseProfile: A context manager that profiles its block if the phase was selected
+        """
+
+        if self.phases is None or name not in self.phases:
+            return NO_PHASE_PROFILE
+        return PhaseProfile(self)
+
+    def stop(self):
+        """Stops profiling, writes the profile to the output file and prints a summary"""
+        self.profile.disable()
+
+        # pstats can't load an empty profile, e.g. when the game was quit before any of the selected phases
+        self.profile.create_stats()
+        if not self.profile.stats:
+            print 'Nothing was profiled'
+            return
+
+        self.profile.dump_stats(self.output_file)
+
+        print 'Wrote profile to {}'.format(self.output_file)
+        pstats.Stats(self.profile).sort_stats('cumulative').print_stats(SUMMARY_LENGTH)
+
+
+class PhaseProfile(object):
+    """
+    This class is a context manager which profiles its block
+    """
+
+    def __init__(self, profiler):
+        """
+        Args:
+            profiler (Profiler): The profiler collecting the profile
+        """
+
+        self.profiler = profiler
+
+    def __enter__(self):
+        if self.profiler.depth == 0:
+            self.profiler.profile.enable()
+        self.profiler.depth += 1
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.depth -= 1
+        if self.profiler.depth == 0:
+            self.profiler.profile.disable()
+
+
+class NoPhaseProfile(object):
+    """
+    This class is a context manager which profiles nothing. It is used for phases that were not selected.
+    """
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+NO_PHASE_PROFILE = NoPhaseProfile()
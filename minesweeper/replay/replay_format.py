@@ -0,0 +1,187 @@
+"""
+This module describes the binary replay format and reads replay files.
+
+A replay file starts with a header:
+    MAGIC, VERSION (1 byte), rows, cols, mines, timestamp (varints), the seed flag (1 byte), the seed (varint, only if
+    the flag is set) and the player name (varint length followed by utf-8 bytes)
+
+It is followed by records. Every record starts with a varint holding (milliseconds since the previous record << 3) |
+record type. Then comes the payload of the record type:
+    REVEAL, FLAG, CHORD: the tile index (row * cols + col) as a varint
+    MINES: the mine layout as a bitset of rows * cols bits (see bitset). It comes right before the first REVEAL record,
+        which laid out the mines, so that the replay does not depend on how a seed turns into a mine layout.
+    END: the outcome (1 byte) and the game time in milliseconds (varint)
+
+Varints are described in the varint module. A typical click takes 2-4 bytes.
+"""
+
+from collections import namedtuple
+import bitset
+import varint
+
+MAGIC = 'MSRP'
+VERSION = 1
+FILE_EXTENSION = '.msr'
+
+# Record types
+REVEAL = 0
+FLAG = 1
+CHORD = 2
+MINES = 3
+END = 4
+RECORD_TYPE_BITS = 3
+
+# Outcomes of the END record
+LOSS = 0
+WIN = 1
+ABANDONED = 2
+
+ReplayHeader = namedtuple('ReplayHeader', 'rows cols mines timestamp seed player_name')
+
+# A single record. tile_index is None for MINES and END records, mines is only set for MINES records and
+# outcome/milliseconds only for END records.
+ReplayRecord = namedtuple('ReplayRecord', 'record_type delta_milliseconds tile_index mines outcome milliseconds')
+
+
+class ReplayFormatError(ValueError):
+    """Raised when a replay file is not valid"""
+    pass
+
+
+def encode_header(header):
+    """
+    Args:
+        header (ReplayHeader): The replay header
+    Returns:
+        bytearray: The encoded header
+    """
+
+    output = bytearray(MAGIC)
+    output.append(VERSION)
+    for value in (header.rows, header.cols, header.mines, header.timestamp):
+        varint.encode(value, output)
+    output.append(header.seed is not None)
+    if header.seed is not None:
+        varint.encode(header.seed, output)
+    player_name = header.player_name.encode('utf-8') if isinstance(header.player_name, unicode) else \
+        header.player_name
+    varint.encode(len(player_name), output)
+    output.extend(player_name)
+    return output
+
+
+def decode_header(data):
+    """
+    Args:
+        data (bytearray): The replay data
+    Returns:
+        (ReplayHeader, int): The replay header and the offset of the first record
+    Raises:
+        ReplayFormatError: The data does not start with a valid header
+        varint.TruncatedError: The data ends in the middle of the header
+    """
+
+    if data[:len(MAGIC)] != MAGIC:
+        raise ReplayFormatError('not a replay file')
+    offset = len(MAGIC)
+    if offset >= len(data) or data[offset] != VERSION:
+        raise ReplayFormatError('unsupported replay version')
+    offset += 1
+
+    values = []
+    for _ in xrange(4):
+        value, offset = varint.decode(data, offset)
+        values.append(value)
+    rows, cols, mines, timestamp = values
+
+    if offset >= len(data):
+        raise varint.TruncatedError('truncated header')
+    has_seed = data[offset]
+    offset += 1
+    seed = None
+    if has_seed:
+        seed, offset = varint.decode(data, offset)
+
+    name_length, offset = varint.decode(data, offset)
+    if offset + name_length > len(data):
+        raise varint.TruncatedError('truncated header')
+    player_name = str(data[offset:offset + name_length]).decode('utf-8')
+    offset += name_length
+
+    return ReplayHeader(rows, cols, mines, timestamp, seed, player_name), offset
+
+
+def encode_record(record_type, delta_milliseconds, output, tile_index=None, mines=None, outcome=None,
+                  milliseconds=None):
+    """
+    Appends a record to a bytearray
+
+    Args:
+        record_type (int): REVEAL, FLAG, CHORD, MINES or END
+        delta_milliseconds (int): The milliseconds since the previous record
+        output (bytearray): The bytearray to append to
+        tile_index (int|None): The tile index of REVEAL, FLAG and CHORD records. Defaults to None.
+        mines (bytearray|None): The mine bitset of MINES records. Defaults to None.
+        outcome (int|None): The outcome of END records. Defaults to None.
+        milliseconds (int|None): The game time of END records. Defaults to None.
+    """
+
+    varint.encode(delta_milliseconds << RECORD_TYPE_BITS | record_type, output)
+    if record_type == MINES:
+        output.extend(mines)
+    elif record_type == END:
+        output.append(outcome)
+        varint.encode(milliseconds, output)
+    else:
+        varint.encode(tile_index, output)
+
+
+def read_replay(replay_file):
+    """
+    Reads a replay file. A file cut short while it was being written (e.g. by a crash) is read up to its last
+    complete record.
+
+    Args:
+        replay_file (str): The replay filename
+    Returns:
+        (ReplayHeader, list<ReplayRecord>): The replay header and its records in order
+    Raises:
+        ReplayFormatError: The file is not a valid replay file
+        varint.TruncatedError: The file ends in the middle of the header
+    """
+
+    with open(replay_file, 'rb') as f:
+        data = bytearray(f.read())
+
+    header, offset = decode_header(data)
+    num_of_mine_bytes = bitset.get_num_of_bytes(header.rows * header.cols)
+
+    records = []
+    try:
+        while offset < len(data):
+            value, offset = varint.decode(data, offset)
+            record_type = value & ((1 << RECORD_TYPE_BITS) - 1)
+            delta_milliseconds = value >> RECORD_TYPE_BITS
+
+            if record_type == MINES:
+                if offset + num_of_mine_bytes > len(data):
+                    raise varint.TruncatedError('truncated mines')
+                mines = bitset.unpack(data[offset:offset + num_of_mine_bytes], header.rows * header.cols)
+                offset += num_of_mine_bytes
+                records.append(ReplayRecord(record_type, delta_milliseconds, None, mines, None, None))
+            elif record_type == END:
+                if offset >= len(data):
+                    raise varint.TruncatedError('truncated end')
+                outcome = data[offset]
+                milliseconds, offset = varint.decode(data, offset + 1)
+                records.append(ReplayRecord(record_type, delta_milliseconds, None, None, outcome, milliseconds))
+            elif record_type in (REVEAL, FLAG, CHORD):
+                tile_index, offset = varint.decode(data, offset)
+                records.append(ReplayRecord(record_type, delta_milliseconds, tile_index, None, None, None))
+            else:
+                raise ReplayFormatError('unknown record type {}'.format(record_type))
+    except varint.TruncatedError:
+        # The last record was cut short. The complete records before it are still valid.
+        pass
+
+    return header, records
@@ -0,0 +1,206 @@
+"""
+This module contains the ReplayRecorder class which streams the replay of a game to disk while it is played.
+
+Recording a click only encodes a few bytes into an in-memory chunk. Full chunks are handed to the background writer,
+so the game loop never waits for the disk and the memory used does not grow with the length of the game.
+"""
+
+import itertools
+import os
+import threading
+import time
+from game_clock import get_monotonic_time
+from highscore.append_log import get_local_file_name
+import replay_format
+
+# The size (in bytes) a chunk grows to before it is handed to the writer
+CHUNK_SIZE = 4096
+
+# Numbers the replays of this process so that games started within the same second get different files
+REPLAY_NUMBERS = itertools.count()
+
+
+def get_replay_dir():
+    """
+    Gets the default directory in which the replays are saved. Creates it if needed.
+
+    Returns:
+        str: The full replay directory name (with the path)
+    """
+
+    replay_dir = get_local_file_name('replays')
+    if not os.path.isdir(replay_dir):
+        try:
+            os.makedirs(replay_dir)
+        except OSError:
+            # Another process may have created it in the meantime
+            if not os.path.isdir(replay_dir):
+                raise
+    return replay_dir
+
+
+class ReplayRecorder(object):
+    """
+    This class records the replay of a single game
+    """
+
+    def __init__(self, rows, cols, mines, seed, player_name, replay_dir=None, writer=None):
+        """
+        Creates the replay file name and starts the first chunk with the replay header. Nothing is written to disk
+        until the first chunk is full or the recording is finished.
+
+        Args:
+            rows (int): The total number of rows on the board
+            cols (int): The total number of columns on the board
+            mines (int): The total number of mines on the board
+            seed (int|None): The seed of the board or None if it is unknown
+            player_name (str): The player name
+            replay_dir (str|None): The directory to save the replay in or None to use the default directory in the
+                'local' directory. Defaults to None.
+            writer (BackgroundWriter|None): The writer used to write the chunks in the background or None to write
+                them right away. Defaults to None.
+        """
+
+        self.cols = cols
+        self.writer = writer
+
+        timestamp = int(time.time())
+        replay_dir = get_replay_dir() if replay_dir is None else replay_dir
+        self.replay_file = os.path.join(replay_dir, '{}_{}x{}x{}_{}-{}{}'.format(
+            time.strftime('%Y%m%d-%H%M%S', time.localtime(timestamp)), rows, cols, mines, os.getpid(),
+            next(REPLAY_NUMBERS), replay_format.FILE_EXTENSION))
+
+        self.chunk = replay_format.encode_header(replay_format.ReplayHeader(rows, cols, mines, timestamp, seed,
+                                                                            player_name))
+        self.pending_chunks = []
+        self.chunks_lock = threading.Lock()
+        self.is_file_created = False
+
+        self.last_record_time = get_monotonic_time()
+        self.is_finished = False
+
+    def get_delta_milliseconds(self):
+        """
+        Returns:
+            int: The milliseconds since the previous record
+        """
+
+        now = get_monotonic_time()
+        delta_milliseconds = int((now - self.last_record_time) * 1000)
+        # Only advance by the whole milliseconds recorded so that rounding errors do not add up over the game
+        self.last_record_time += delta_milliseconds / 1000.0
+        return delta_milliseconds
+
+    def record_reveal(self, tile):
+        """
+        Args:
+            tile (Tile): The tile that was left clicked
+        """
+
+        self.record_tile(replay_format.REVEAL, tile)
+
+    def record_flag(self, tile):
+        """
+        Args:
+            tile (Tile): The tile that was flagged or unflagged
+        """
+
+        self.record_tile(replay_format.FLAG, tile)
+
+    def record_chord(self, tile):
+        """
+        Args:
+            tile (Tile): The tile that was shortcut clicked
+        """
+
+        self.record_tile(replay_format.CHORD, tile)
+
+    def record_tile(self, record_type, tile):
+        """
+        Records a click on a tile
+
+        Args:
+            record_type (int): REVEAL, FLAG or CHORD
+            tile (Tile): The clicked tile
+        """
+
+        replay_format.encode_record(record_type, self.get_delta_milliseconds(), self.chunk,
+                                    tile_index=tile.row * self.cols + tile.col)
+        if len(self.chunk) >= CHUNK_SIZE:
+            self.flush_chunk()
+
+    def record_mines(self, mines):
+        """
+        Records the mine layout. This should be called right after the first click laid out the mines.
+
+        Args:
+            mines (bytearray): The mine layout as a bitset of the tile indices (see bitset)
+        """
+
+        replay_format.encode_record(replay_format.MINES, self.get_delta_milliseconds(), self.chunk, mines=mines)
+        if len(self.chunk) >= CHUNK_SIZE:
+            self.flush_chunk()
+
+    def finish(self, outcome, milliseconds):
+        """
+        Records the end of the game and writes the rest of the replay. Finishing more than once does nothing.
+
+        Args:
+            outcome (int): replay_format.WIN, LOSS or ABANDONED
+            milliseconds (int): The game time
+        """
+
+        if self.is_finished:
+            return
+        self.is_finished = True
+
+        replay_format.encode_record(replay_format.END, self.get_delta_milliseconds(), self.chunk, outcome=outcome,
+                                    milliseconds=milliseconds)
+        self.flush_chunk()
+
+    def flush_chunk(self):
+        """Hands the current chunk to the writer and starts a new one"""
+        with self.chunks_lock:
+            self.pending_chunks.append(self.chunk)
+        self.chunk = bytearray()
+
+        if self.writer is None:
+            self.write_pending_chunks()
+        else:
+            self.writer.schedule(self.write_pending_chunks)
+
+    def write_pending_chunks(self):
+        """Appends all the pending chunks to the replay file with a single write"""
+        with self.chunks_lock:
+            pending_chunks, self.pending_chunks = self.pending_chunks, []
+        if not pending_chunks:
+            return
+
+        with open(self.replay_file, 'ab' if self.is_file_created else 'wb') as f:
+            f.write(''.join(str(chunk) for chunk in pending_chunks))
+        self.is_file_created = True
+
+
+class NoReplayRecorder(object):
+    """
+    This class records nothing. It is used while no game is being recorded, e.g. before the first click or for a
+    resumed game whose earlier clicks are unknown.
+    """
+
+    def record_reveal(self, tile):
+        pass
+
+    def record_flag(self, tile):
+        pass
+
+    def record_chord(self, tile):
+        pass
+
+    def record_mines(self, mines):
+        pass
+
+    def finish(self, outcome, milliseconds):
+        pass
+
+
+NO_REPLAY_RECORDER = NoReplayRecorder()
@@ -0,0 +1,165 @@
+"""
+This module replays recorded games on a headless board and verifies that they match what they claim.
+
+Replaying ignores the recorded delays, so a game replays as fast as the board engine allows. Verification checks that
+the mine layout follows from the seed, that the clicks lead to the claimed outcome and that the claimed time matches
+the recorded delays. Many replays are verified in parallel by a pool of worker processes.
+"""
+
+import glob
+import multiprocessing
+import os
+from collections import namedtuple
+from headless_game import HeadlessGame
+import replay_format
+
+# How far (in milliseconds) the claimed game time may be from the time of the recorded clicks. The clicks are timed
+# when their events are handled, a little after the game clock saw them happen.
+TIME_TOLERANCE_MILLISECONDS = 250
+
+# The number of replays each worker process takes at once
+CHUNK_SIZE = 16
+
+OUTCOME_NAMES = {
+    replay_format.LOSS: 'loss',
+    replay_format.WIN: 'win',
+    replay_format.ABANDONED: 'abandoned',
+}
+
+# The result of verifying a single replay. header is None if the file could not be read. errors lists why the replay
+# is not valid (empty if it is valid).
+ReplayResult = namedtuple('ReplayResult', 'replay_file header claimed_outcome claimed_milliseconds outcome '
+                                          'milliseconds num_of_clicks errors')
+
+
+def replay_game(header, records, use_seed=False):
+    """
+    Replays the records of a game on a headless board
+
+    Args:
+        header (ReplayHeader): The replay header
+        records (list<ReplayRecord>): The replay records
+        use_seed (bool): Lay out the mines from the seed on the first click rather than from the recorded layout?
+            Defaults to False.
+    Returns:
+        (HeadlessGame, int): The game after the last record and the time (in milliseconds) from the first click to the
+            end of the game
+    Raises:
+        ValueError: A record does not apply to the board
+        IndexError: A record refers to a tile which is not on the board
+    """
+
+    game = HeadlessGame(header.rows, header.cols, header.mines, header.seed)
+    milliseconds = 0
+
+    for record in records:
+        if not game.is_new_game:
+            milliseconds += record.delta_milliseconds
+
+        if record.record_type == replay_format.MINES:
+            if not use_seed:
+                game.set_mine_layout(record.mines)
+        elif record.record_type == replay_format.REVEAL:
+            game.reveal(record.tile_index)
+        elif record.record_type == replay_format.FLAG:
+            game.flag(record.tile_index)
+        elif record.record_type == replay_format.CHORD:
+            game.chord(record.tile_index)
+        elif record.record_type == replay_format.END:
+            break
+
+    return game, milliseconds
+
+
+def verify_replay(replay_file):
+    """
+    Replays a recorded game and checks it against its claims
+
+    Args:
+        replay_file (str): The replay filename
+    Returns:
+        ReplayResult: The result of the verification
+    """
+
+    try:
+        header, records = replay_format.read_replay(replay_file)
+    except (IOError, ValueError) as e:
+        return ReplayResult(replay_file, None, None, None, None, None, 0, ['unreadable: {}'.format(e)])
+
+    errors = []
+    end_records = [record for record in records if record.record_type == replay_format.END]
+    if end_records:
+        claimed_outcome, claimed_milliseconds = end_records[0].outcome, end_records[0].milliseconds
+    else:
+        claimed_outcome, claimed_milliseconds = None, None
+        errors.append('the replay has no end')
+
+    # A seeded game is replayed on the layout of its seed, otherwise any layout could be claimed for the seed
+    use_seed = header.seed is not None
+    try:
+        game, milliseconds = replay_game(header, records, use_seed)
+    except (IndexError, ValueError) as e:
+        errors.append('invalid record: {}'.format(e))
+        return ReplayResult(replay_file, header, claimed_outcome, claimed_milliseconds, None, None, 0, errors)
+
+    mine_records = [record for record in records if record.record_type == replay_format.MINES]
+    if use_seed and mine_records and not game.is_new_game:
+        mine_indices = [game.get_tile_index(tile) for tile in game.board.flattened_board if tile.is_mine]
+        if mine_indices != mine_records[0].mines:
+            errors.append('the mine layout does not match the seed')
+
+    if not game.is_game_over:
+        outcome = replay_format.ABANDONED
+    elif game.is_game_lost:
+        outcome = replay_format.LOSS
+    else:
+        outcome = replay_format.WIN
+
+    if claimed_outcome is not None and claimed_outcome != outcome:
+        errors.append('claims the outcome {} but replays to {}'.format(
+            OUTCOME_NAMES.get(claimed_outcome, claimed_outcome), OUTCOME_NAMES[outcome]))
+    if claimed_milliseconds is not None and abs(claimed_milliseconds - milliseconds) > TIME_TOLERANCE_MILLISECONDS:
+        errors.append('claims {} ms but the clicks took {} ms'.format(claimed_milliseconds, milliseconds))
+
+    return ReplayResult(replay_file, header, claimed_outcome, claimed_milliseconds, outcome, milliseconds,
+                        game.num_of_clicks, errors)
+
+
+def find_replay_files(paths):
+    """
+    Expands directories into the replay files they contain
+
+    Args:
+        paths (list<str>): Replay filenames and directories
+    Returns:
+        list<str>: The replay filenames
+    """
+
+    replay_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            replay_files.extend(sorted(glob.glob(os.path.join(path, '*' + replay_format.FILE_EXTENSION))))
+        else:
+            replay_files.append(path)
+    return replay_files
+
+
+def verify_replays(replay_files, processes=None):
+    """
+    Verifies many replays in parallel
+
+    Args:
+        replay_files (list<str>): The replay filenames
+        processes (int|None): The number of worker processes or None to use one per CPU. With 1 process, the replays
+            are verified in this process. Defaults to None.
+    Returns:
+        iterator<ReplayResult>: The results in no particular order, as they are ready
+    """
+
+    if processes == 1 or len(replay_files) <= 1:
+        return (verify_replay(replay_file) for replay_file in replay_files)
+
+    pool = multiprocessing.Pool(processes)
+    results = pool.imap_unordered(verify_replay, replay_files, CHUNK_SIZE)
+    pool.close()
+    return results
@@ -2,6 +2,7 @@
 
 import pygame
 import pics
+import frame_scheduler
 
 
 class ResetButton(object):
@@ -34,18 +35,19 @@ class ResetButton(object):
             pygame.Rect: The pygame.Rect object used for showing the reset button.
         """
 
-        return pygame.Rect(self.screen.get_width() / 2 - pics.SMILEY.get_width() / 2, 5, pics.SMILEY.get_width(),
-                           pics.SMILEY.get_height())
+        smiley = pics.get_pic(pics.SMILEY)
+        return pygame.Rect(self.screen.get_width() / 2 - smiley.get_width() / 2, 5, smiley.get_width(),
+                           smiley.get_height())
 
-    def draw(self, pic):
+    def draw(self, pic_name):
         """
         Prints the picture in the reset button
 
         Args:
-            pic (pygame.image): The picture to draw
+            pic_name (str): The name of the picture to draw (e.g. pics.SMILEY)
         """
 
-        self.screen.blit(pic, self.rect)
+        frame_scheduler.add_dirty_rect(self.screen.blit(pics.get_pic(pic_name), self.rect))
 
     def draw_uhoh(self):
         """Prints the uhoh picture in the reset button"""
@@ -124,3 +126,9 @@ class ResetButton(object):
         """Won the game"""
         self.is_game_won = True
         self.draw_sunglasses()
+
+    def reopened_game(self):
+        """The game is no longer won or lost since the move that ended it was undone"""
+        self.is_game_lost = False
+        self.is_game_won = False
+        self.draw_smiley()
@@ -0,0 +1,311 @@
+"""
+This module contains the GameServer class which hosts many headless Minesweeper games in one process.
+
+The server runs a single asyncore event loop. Every connection is a GameSession playing a HeadlessGame, so the games
+follow the same rules as the Game class. Requests and responses follow the line based JSON protocol described in the
+protocol module, and every move is answered with only the tiles it changed.
+
+The loop polls with poll() rather than select(), which is limited to file descriptors below 1024, so thousands of
+sessions can be connected at once.
+"""
+
+import asynchat
+import asyncore
+import errno
+import logging
+import os
+import socket
+import stat
+from headless_game import HeadlessGame
+import protocol
+logger = logging.getLogger(__name__)
+
+# The number of connections waiting to be accepted
+LISTEN_BACKLOG = 1024
+
+# The largest board a session may ask for. It bounds the memory a single connection can make the server use.
+MAX_TILES = 1000 * 1000
+
+
+class GameSession(asynchat.async_chat):
+    """
+    This class represents a single client connection and the game it is playing
+    """
+
+    def __init__(self, sock, server):
+        """
+        Args:
+            sock (socket.socket): The connected socket
+            server (GameServer): The server which accepted the connection
+        """
+
+        asynchat.async_chat.__init__(self, sock, map=server.socket_map)
+        self.set_terminator(protocol.TERMINATOR)
+        self.server = server
+        self.buffered_data = []
+        self.buffered_length = 0
+        self.game = None
+
+    def collect_incoming_data(self, data):
+        """
+        Buffers part of a request line. The connection is closed if the line gets too long.
+
+        Args:
+            data (str): The received data
+        """
+
+        self.buffered_length += len(data)
+        if self.buffered_length > protocol.MAX_LINE_LENGTH:
+            logger.warning('Closing a session which sent a request longer than %d bytes', protocol.MAX_LINE_LENGTH)
+            self.close()
+            return
+        self.buffered_data.append(data)
+
+    def found_terminator(self):
+        """Handles a complete request line and sends the response"""
+        line = ''.join(self.buffered_data)
+        self.buffered_data = []
+        self.buffered_length = 0
+
+        try:
+            response = self.handle_request(protocol.decode(line))
+        except protocol.ProtocolError as e:
+            response = {'error': str(e)}
+        self.push(protocol.encode(response))
+
+    def handle_request(self, request):
+        """
+        Args:
+            request (dict): The request
+        Returns:
+            dict: The response
+        Raises:
+            ProtocolError: The request is not valid
+        """
+
+        command = request.get('cmd')
+        if command == protocol.NEW:
+            return self.new_game(request)
+        if command not in protocol.COMMANDS:
+            raise protocol.ProtocolError('unknown cmd {}'.format(command))
+        if self.game is None:
+            raise protocol.ProtocolError('no game started')
+
+        tile_index = protocol.get_int(request, 'tile')
+        if not 0 <= tile_index < self.game.rows * self.game.cols:
+            raise protocol.ProtocolError('tile {} is not on the board'.format(tile_index))
+
+        self.server.num_of_moves += 1
+        if command == protocol.FLAG:
+            return self.get_flag_delta(tile_index, self.game.flag(tile_index))
+        if command == protocol.REVEAL:
+            return self.get_reveal_delta(self.game.reveal(tile_index))
+        return self.get_reveal_delta(self.game.chord(tile_index))
+
+    def new_game(self, request):
+        """
+        Starts a new game, replacing the current one
+
+        Args:
+            request (dict): The new game request
+        Returns:
+            dict: The response
+        Raises:
+            ProtocolError: The board is not valid
+        """
+
+        rows = protocol.get_int(request, 'rows')
+        cols = protocol.get_int(request, 'cols')
+        mines = protocol.get_int(request, 'mines')
+        seed = protocol.get_int(request, 'seed') if request.get('seed') is not None else None
+
+        if rows < 1 or cols < 1 or mines < 0:
+            raise protocol.ProtocolError('rows and cols must be positive and mines must not be negative')
+        if rows * cols < mines + 9:
+            raise protocol.ProtocolError('rows*cols must be at least 9 greater than mines')
+        if rows * cols > self.server.max_tiles:
+            raise protocol.ProtocolError('boards are limited to {} tiles'.format(self.server.max_tiles))
+
+        self.game = HeadlessGame(rows, cols, mines, seed)
+        self.server.num_of_games += 1
+        return {'rows': rows, 'cols': cols, 'mines': mines, 'state': protocol.PLAYING, 'mines_left': mines}
+
+    def get_reveal_delta(self, tile_reveal_result):
+        """
+        Args:
+            tile_reveal_result (TileRevealResult): The result of a reveal or chord
+        Returns:
+            dict: The response holding the tiles the move revealed
+        """
+
+        response = self.get_state()
+        if tile_reveal_result.revealed_tiles:
+            response['shown'] = [[self.game.get_tile_index(tile), tile.value]
+                                 for tile in tile_reveal_result.revealed_tiles]
+        if tile_reveal_result.hit_mine:
+            response['mines'] = [self.game.get_tile_index(tile)
+                                 for tile in self.game.board.flattened_board if tile.is_mine]
+        return response
+
+    def get_flag_delta(self, tile_index, change_in_unflagged_mines):
+        """
+        Args:
+            tile_index (int): The tile index of the flag move
+            change_in_unflagged_mines (int): The change in the number of mines remaining
+        Returns:
+            dict: The response holding the toggled flag
+        """
+
+        response = self.get_state()
+        if change_in_unflagged_mines != 0:
+            response['flags'] = [[tile_index, change_in_unflagged_mines < 0]]
+        return response
+
+    def get_state(self):
+        """
+        Returns:
+            dict: The state of the game and the number of mines remaining
+        """
+
+        if not self.game.is_game_over:
+            state = protocol.PLAYING
+        elif self.game.is_game_lost:
+            state = protocol.LOST
+        else:
+            state = protocol.WON
+        return {'state': state, 'mines_left': self.game.num_of_unflagged_mines}
+
+    def handle_close(self):
+        """The client hung up"""
+        self.close()
+
+    def close(self):
+        """Closes the connection and forgets the session"""
+        if self in self.server.sessions:
+            self.server.sessions.remove(self)
+        asynchat.async_chat.close(self)
+
+
+class GameServer(asyncore.dispatcher):
+    """
+    This class accepts connections and starts a GameSession for each of them
+    """
+
+    def __init__(self, address, max_tiles=MAX_TILES, socket_map=None):
+        """
+        Args:
+            address (str): HOST:PORT to listen on TCP or the path of a Unix socket (see protocol.parse_address)
+            max_tiles (int): The largest board a session may ask for. Defaults to MAX_TILES.
+            socket_map (dict|None): The asyncore socket map to run in or None for a map of its own. Defaults to None.
+        """
+
+        self.socket_map = {} if socket_map is None else socket_map
+        asyncore.dispatcher.__init__(self, map=self.socket_map)
+
+        self.max_tiles = max_tiles
+        self.sessions = set()
+        self.num_of_games = 0
+        self.num_of_moves = 0
+
+        family, self.socket_address = protocol.parse_address(address)
+        self.create_socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_UNIX:
+            remove_stale_socket(self.socket_address)
+        else:
+            self.set_reuse_addr()
+        self.bind(self.socket_address)
+        self.listen(LISTEN_BACKLOG)
+        # The Unix socket file this listener created, which it removes when it is closed
+        self.socket_file_id = get_file_id(self.socket_address) if family == socket.AF_UNIX else None
+
+    def handle_accept(self):
+        """Starts a session for a new connection"""
+        pair = self.accept()
+        if pair is not None:
+            self.sessions.add(GameSession(pair[0], self))
+
+    def serve_forever(self):
+        """Runs the event loop until the server is closed"""
+        logger.info('Serving games on %s', self.socket_address)
+        try:
+            asyncore.loop(timeout=1, use_poll=True, map=self.socket_map)
+        finally:
+            self.close()
+
+    def close(self):
+        """Closes every session and stops listening"""
+        for session in list(self.sessions):
+            session.close()
+        asyncore.dispatcher.close(self)
+        if self.socket_file_id is not None:
+            remove_own_socket(self.socket_address, self.socket_file_id)
+
+
+def get_file_id(path):
+    """
+    Args:
+        path (str): The path of a file
+    Returns:
+        (int, int): The device and inode of the file
+    """
+
+    stat_result = os.stat(path)
+    return stat_result.st_dev, stat_result.st_ino
+
+
+def remove_own_socket(path, file_id):
+    """
+    Removes the Unix socket file a listener created. Other processes (e.g. forked children) may still hold the socket
+    open, so it is identified by its file id rather than by probing it. A file that replaced it is left alone.
+
+    Args:
+        path (str): The path of the Unix socket
+        file_id ((int, int)): The device and inode of the socket file when it was created (see get_file_id)
+    """
+
+    try:
+        if get_file_id(path) == file_id:
+            os.remove(path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+
+
+def remove_stale_socket(path):
+    """
+    Removes a Unix socket file left over by a server that is no longer running. Anything else at the path is left
+    alone, since a mistyped address must not delete a file or take the place of a running server.
+
+    Args:
+        path (str): The path of the Unix socket
+    Raises:
+        OSError: The path is not a Unix socket
+        socket.error: A server is still listening on the socket
+    """
+
+    try:
+        mode = os.stat(path).st_mode
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            return
+        raise
+    if not stat.S_ISSOCK(mode):
+        raise OSError(errno.EEXIST, 'Not a Unix socket, refusing to remove it', path)
+
+    # Only a socket nobody listens on refuses connections
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except socket.error as e:
+        if e.errno != errno.ECONNREFUSED:
+            raise
+    else:
+        raise socket.error(errno.EADDRINUSE, 'A server is already listening on {}'.format(path))
+    finally:
+        probe.close()
+
+    try:
+        os.remove(path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
@@ -0,0 +1,112 @@
+"""
+This module describes the line based protocol of the game server.
+
+Every request and every response is a single JSON object on its own line. A connection plays one game at a time.
+
+Requests:
+    {"cmd": "new", "rows": 16, "cols": 30, "mines": 99, "seed": 7}   (seed is optional)
+    {"cmd": "reveal", "tile": 17}
+    {"cmd": "flag", "tile": 17}
+    {"cmd": "chord", "tile": 17}
+
+Tiles are tile indices (row * cols + col). The response to a new game echoes its rows, cols and mines. The response to
+a move only holds what the move changed:
+    shown: the tiles the move revealed as [tile, value] pairs (omitted if empty)
+    flags: the tile whose flag was toggled as a [tile, is_flagged] pair (omitted if empty)
+    mines: every mine on the board, only sent when the move lost the game
+    state: PLAYING, WON or LOST
+    mines_left: the number of mines minus the number of flags
+
+A request which cannot be applied gets {"error": "<reason>"} and leaves the game as it was.
+"""
+
+import json
+import socket
+
+NEW = 'new'
+REVEAL = 'reveal'
+FLAG = 'flag'
+CHORD = 'chord'
+COMMANDS = (NEW, REVEAL, FLAG, CHORD)
+
+# Game states
+PLAYING = 'playing'
+WON = 'won'
+LOST = 'lost'
+
+TERMINATOR = '\n'
+
+# Longer request lines are not valid. This bounds the memory a single connection can make the server buffer.
+MAX_LINE_LENGTH = 1024
+
+
+class ProtocolError(ValueError):
+    """Raised when a request is not valid"""
+    pass
+
+
+def encode(message):
+    """
+    Args:
+        message (dict): The request or response
+    Returns:
+        str: The message as a line
+    """
+
+    return json.dumps(message, separators=(',', ':')) + TERMINATOR
+
+
+def decode(line):
+    """
+    Args:
+        line (str): A request or response line without its terminator
+    Returns:
+        dict: The message
+    Raises:
+        ProtocolError: The line is not a JSON object
+    """
+
+    try:
+        message = json.loads(line)
+    except ValueError as e:
+        raise ProtocolError('not json: {}'.format(e))
+    if not isinstance(message, dict):
+        raise ProtocolError('not a json object')
+    return message
+
+
+def get_int(message, key):
+    """
+    Args:
+        message (dict): The request
+        key (str): The key of the integer
+    Returns:
+        int: The integer
+    Raises:
+        ProtocolError: The value is missing or not an integer
+    """
+
+    if key not in message:
+        raise ProtocolError('missing {}'.format(key))
+    value = message[key]
+    if not isinstance(value, (int, long)) or isinstance(value, bool):
+        raise ProtocolError('{} must be an integer'.format(key))
+    return value
+
+
+def parse_address(address):
+    """
+    Parses a server address
+
+    Args:
+        address (str): HOST:PORT for a TCP socket or the path of a Unix socket
+    Returns:
+        (int, (str, int)|str): The socket family and the socket address
+    Raises:
+        ValueError: The port is not a number
+    """
+
+    if ':' in address and '/' not in address:
+        host, port = address.rsplit(':', 1)
+        return socket.AF_INET, (host or 'localhost', int(port))
+    return socket.AF_UNIX, address
@@ -0,0 +1,390 @@
+"""
+This module contains the SpectatorBroadcaster class which streams a live game to any number of viewers.
+
+The game publishes compact deltas of what each move changed. Viewers connect over TCP or a Unix socket (see
+protocol.parse_address) and receive JSON lines (see protocol.encode), each with the sequence number seq:
+    {"seq": n, "board": {"rows", "cols", "mines", "tiles", "seconds", "mines_left", "state"}}
+        The whole board. tiles holds one character per tile index (row * cols + col): the value '0'-'8' of a shown
+        tile, HIDDEN, FLAGGED or MINE. It is sent first to every new viewer, for a new or resumed game and whenever
+        the board changed in a way the other deltas do not describe (e.g. an undo).
+    {"seq": n, "shown": [tile, value, tile, value, ...]}   The tiles a move revealed
+    {"seq": n, "flag": [tile, is_flagged]}                 A toggled flag
+    {"seq": n, "seconds": s}                               A timer tick
+    {"seq": n, "state": "won"|"lost", "mines": [...]}      The end of the game. mines is only sent for a loss.
+
+Publishing a delta encodes it once and stores it in a ring of the latest messages, so its cost does not depend on the
+number of viewers. The viewers are served by a background thread, each reading the ring at its own pace. A viewer
+which falls so far behind that its next message was overwritten skips ahead: it gets the current board and continues
+from there, so a slow viewer never stalls the game or the other viewers.
+"""
+
+import asyncore
+import errno
+import fcntl
+import logging
+import os
+import socket
+import threading
+import protocol
+from game_server import remove_stale_socket, remove_own_socket, get_file_id, LISTEN_BACKLOG
+logger = logging.getLogger(__name__)
+
+# The number of latest messages kept for the viewers
+RING_SIZE = 4096
+
+# The most messages sent to a viewer at once
+MAX_BATCH = 256
+
+# The characters of the tiles which are not shown in the board message
+HIDDEN = 'h'
+FLAGGED = 'f'
+MINE = '*'
+
+
+class SpectatorBroadcaster(object):
+    """
+    This class publishes the deltas of a live game and serves them to the viewers
+    """
+
+    def __init__(self, address, ring_size=RING_SIZE):
+        """
+        Starts listening for viewers and the thread serving them
+
+        Args:
+            address (str): HOST:PORT to listen on TCP or the path of a Unix socket
+            ring_size (int): The number of latest messages kept for the viewers. Defaults to RING_SIZE.
+        """
+
+        self.ring_size = ring_size
+        self.ring = [None] * ring_size
+        self.last_seq = 0
+        self.lock = threading.Lock()
+
+        # The board as the viewers know it. It is kept up to date so that a board message never touches the tiles.
+        self.cols = 0
+        self.board_header = {}
+        self.tiles = bytearray()
+
+        self.socket_map = {}
+        self.listener = ViewerListener(address, self)
+        self.wakeup_fd = WakeupDispatcher(self.socket_map).write_fd
+
+        self.thread = threading.Thread(target=self.run, name='SpectatorBroadcaster')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        """The broadcaster thread. Serves the viewers until the broadcaster is closed."""
+        logger.info('Broadcasting the game to spectators on %s', self.listener.socket_address)
+        asyncore.loop(timeout=1, use_poll=True, map=self.socket_map)
+
+    def publish(self, message):
+        """
+        Encodes a message once, stores it in the ring and wakes up the broadcaster thread.
+        The caller must hold the lock.
+
+        Args:
+            message (dict): The message without its seq
+        """
+
+        self.last_seq += 1
+        message['seq'] = self.last_seq
+        self.ring[self.last_seq % self.ring_size] = protocol.encode(message)
+        try:
+            os.write(self.wakeup_fd, 'x')
+        except OSError as e:
+            # The pipe is full, so the thread is already due to wake up
+            if e.errno not in (errno.EAGAIN, errno.EBADF):
+                raise
+
+    def publish_board(self, board, seconds, mines_left, state=protocol.PLAYING):
+        """
+        Publishes the whole board. This costs O(tiles), so it is only used when a game starts, is resumed or a move is
+        undone.
+
+        Args:
+            board (Board): The board
+            seconds (int): The time shown on the timer
+            mines_left (int): The number of mines minus the number of flags
+            state (str): protocol.PLAYING, WON or LOST. Defaults to PLAYING.
+        """
+
+        tiles = bytearray(get_tile_char(tile, state == protocol.LOST) for tile in board.flattened_board)
+        with self.lock:
+            self.cols = board.cols
+            self.tiles = tiles
+            self.board_header = {'rows': board.rows, 'cols': board.cols, 'mines': board.num_of_mines,
+                                 'seconds': seconds, 'mines_left': mines_left, 'state': state}
+            self.publish({'board': self.get_board()})
+
+    def publish_shown(self, tiles):
+        """
+        Publishes the tiles a move revealed. Does nothing if no tiles were revealed.
+
+        Args:
+            tiles (list<Tile>): The revealed tiles
+        """
+
+        if not tiles:
+            return
+
+        shown = []
+        with self.lock:
+            for tile in tiles:
+                tile_index = tile.row * self.cols + tile.col
+                self.tiles[tile_index] = str(tile.value)
+                shown.append(tile_index)
+                shown.append(tile.value)
+            self.publish({'shown': shown})
+
+    def publish_flag(self, tile):
+        """
+        Publishes a toggled flag
+
+        Args:
+            tile (Tile): The tile whose flag was toggled
+        """
+
+        with self.lock:
+            tile_index = tile.row * self.cols + tile.col
+            self.tiles[tile_index] = FLAGGED if tile.is_flagged else HIDDEN
+            self.board_header['mines_left'] += -1 if tile.is_flagged else 1
+            self.publish({'flag': [tile_index, tile.is_flagged]})
+
+    def publish_time(self, seconds):
+        """
+        Publishes a timer tick
+
+        Args:
+            seconds (int): The time shown on the timer
+        """
+
+        with self.lock:
+            self.board_header['seconds'] = seconds
+            self.publish({'seconds': seconds})
+
+    def publish_end(self, board, is_game_lost):
+        """
+        Publishes the end of the game. A loss also publishes where the mines are.
+
+        Args:
+            board (Board): The board
+            is_game_lost (bool): Was the game lost?
+        """
+
+        message = {'state': protocol.LOST if is_game_lost else protocol.WON}
+        mine_indices = []
+        if is_game_lost:
+            mine_indices = [tile.row * board.cols + tile.col for tile in board.flattened_board
+                            if tile.is_mine and not tile.is_flagged]
+            message['mines'] = mine_indices
+
+        with self.lock:
+            for tile_index in mine_indices:
+                self.tiles[tile_index] = MINE
+            self.board_header['state'] = message['state']
+            self.publish(message)
+
+    def get_board(self):
+        """
+        The caller must hold the lock.
+
+        Returns:
+            dict: The board as the viewers know it
+        """
+
+        board = dict(self.board_header)
+        board['tiles'] = str(self.tiles)
+        return board
+
+    def get_messages(self, next_seq):
+        """
+        Gets the messages a viewer has not been sent yet
+
+        Args:
+            next_seq (int): The seq of the next message the viewer needs
+        Returns:
+            (str, int): The messages and the seq of the next message after them. The messages start with the whole
+                board if the viewer fell behind the ring.
+        """
+
+        with self.lock:
+            if next_seq > self.last_seq:
+                return '', next_seq
+            if next_seq <= self.last_seq - self.ring_size or next_seq == 0:
+                return protocol.encode({'seq': self.last_seq, 'board': self.get_board()}), self.last_seq + 1
+
+            end_seq = min(self.last_seq, next_seq + MAX_BATCH - 1)
+            return ''.join(self.ring[seq % self.ring_size] for seq in xrange(next_seq, end_seq + 1)), end_seq + 1
+
+    def has_messages(self, next_seq):
+        """
+        Args:
+            next_seq (int): The seq of the next message the viewer needs
+        Returns:
+            bool: Are there messages the viewer has not been sent yet? There are none before the first board.
+        """
+
+        return 0 < self.last_seq >= next_seq
+
+    def close(self):
+        """Disconnects the viewers and stops the broadcaster thread"""
+        for dispatcher in self.socket_map.values():
+            dispatcher.close()
+
+
+class ViewerListener(asyncore.dispatcher):
+    """
+    This class accepts viewer connections
+    """
+
+    def __init__(self, address, broadcaster):
+        """
+        Args:
+            address (str): HOST:PORT to listen on TCP or the path of a Unix socket
+            broadcaster (SpectatorBroadcaster): The broadcaster serving the viewers
+        """
+
+        asyncore.dispatcher.__init__(self, map=broadcaster.socket_map)
+        self.broadcaster = broadcaster
+
+        family, self.socket_address = protocol.parse_address(address)
+        self.create_socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_UNIX:
+            remove_stale_socket(self.socket_address)
+        else:
+            self.set_reuse_addr()
+        self.bind(self.socket_address)
+        self.listen(LISTEN_BACKLOG)
+        # The Unix socket file this listener created, which it removes when it is closed
+        self.socket_file_id = get_file_id(self.socket_address) if family == socket.AF_UNIX else None
+
+    def handle_accept(self):
+        """Starts sending the game to a new viewer"""
+        pair = self.accept()
+        if pair is not None:
+            Viewer(pair[0], self.broadcaster)
+
+    def close(self):
+        """Stops listening"""
+        asyncore.dispatcher.close(self)
+        if self.socket_file_id is not None:
+            remove_own_socket(self.socket_address, self.socket_file_id)
+
+
+class Viewer(asyncore.dispatcher):
+    """
+    This class sends the game to a single viewer. A viewer only receives, anything it sends is ignored.
+    """
+
+    def __init__(self, sock, broadcaster):
+        """
+        Args:
+            sock (socket.socket): The connected socket
+            broadcaster (SpectatorBroadcaster): The broadcaster serving the viewer
+        """
+
+        asyncore.dispatcher.__init__(self, sock, map=broadcaster.socket_map)
+        self.broadcaster = broadcaster
+        self.next_seq = 0
+        self.unsent_data = ''
+
+    def writable(self):
+        """
+        Returns:
+            bool: Is there anything to send?
+        """
+
+        return bool(self.unsent_data) or self.broadcaster.has_messages(self.next_seq)
+
+    def handle_write(self):
+        """
+        Sends the messages the viewer has not been sent yet. New messages are only taken once the old ones are out.
+        """
+
+        if not self.unsent_data:
+            self.unsent_data, self.next_seq = self.broadcaster.get_messages(self.next_seq)
+        if self.unsent_data:
+            self.unsent_data = self.unsent_data[self.send(self.unsent_data):]
+
+    def handle_read(self):
+        """Ignores what the viewer sends"""
+        self.recv(4096)
+
+    def handle_close(self):
+        """The viewer hung up"""
+        self.close()
+
+
+class WakeupDispatcher(asyncore.file_dispatcher):
+    """
+    This class wakes up the broadcaster thread when a message is published. Writing a byte to write_fd wakes it up.
+    """
+
+    def __init__(self, socket_map):
+        """
+        Args:
+            socket_map (dict): The asyncore socket map of the broadcaster thread
+        """
+
+        read_fd, self.write_fd = os.pipe()
+        fcntl.fcntl(self.write_fd, fcntl.F_SETFL, fcntl.fcntl(self.write_fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+        asyncore.file_dispatcher.__init__(self, read_fd, map=socket_map)
+        os.close(read_fd)
+
+    def writable(self):
+        return False
+
+    def handle_read(self):
+        """Drains the pipe. The viewers pick up the new messages in the same loop iteration."""
+        self.recv(4096)
+
+    def close(self):
+        """Closes both ends of the pipe"""
+        asyncore.file_dispatcher.close(self)
+        os.close(self.write_fd)
+
+
+def get_tile_char(tile, is_game_lost):
+    """
+    Args:
+        tile (Tile): A tile
+        is_game_lost (bool): Was the game lost? The mines are only shown once the game is lost.
+    Returns:
+        int: The character of the tile in the board message
+    """
+
+    if tile.is_shown:
+        return ord(str(tile.value))
+    if tile.is_flagged:
+        return ord(FLAGGED)
+    if is_game_lost and tile.is_mine:
+        return ord(MINE)
+    return ord(HIDDEN)
+
+
+class NoBroadcaster(object):
+    """
+    This class publishes nothing. It is used when the game is not broadcast to spectators.
+    """
+
+    def publish_board(self, board, seconds, mines_left, state=protocol.PLAYING):
+        pass
+
+    def publish_shown(self, tiles):
+        pass
+
+    def publish_flag(self, tile):
+        pass
+
+    def publish_time(self, seconds):
+        pass
+
+    def publish_end(self, board, is_game_lost):
+        pass
+
+    def close(self):
+        pass
+
+
+NO_BROADCASTER = NoBroadcaster()
@@ -0,0 +1,248 @@
+"""
+This module contains the Telemetry class which records what happens in games (clicks, reveal sizes, frame times and
+outcomes) to rotating compressed JSONL files.
+
+Recording an event only stores a tuple in a preallocated ring buffer. A background thread takes the recorded events
+in batches, encodes them as one json object per line and appends each batch to the current gzip file as a gzip member
+of its own, so a file stays readable up to its last batch even if the game is killed. The game loop never waits for
+the disk: if the disk stalls long enough for the ring to fill up, new events are dropped and counted instead, so the
+memory used stays bounded.
+"""
+
+import atexit
+import glob
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from highscore.append_log import get_local_file_name
+logger = logging.getLogger(__name__)
+
+# The number of events the ring buffer holds
+RING_SIZE = 1 << 16
+
+# The writer thread is woken up early once this many events are waiting
+FLUSH_BATCH_SIZE = 4096
+
+# The longest time (in seconds) a recorded event waits to be written
+FLUSH_INTERVAL = 1.0
+
+# The size (in bytes) a telemetry file grows to before a new file is started
+MAX_FILE_BYTES = 4 * 1024 * 1024
+
+# The number of telemetry files kept in the directory. The oldest files are deleted.
+MAX_FILES = 20
+
+TELEMETRY_FILE_PATTERN = 'telemetry-*.jsonl.gz'
+
+
+def get_telemetry_dir():
+    """
+    Gets the default directory in which the telemetry files are saved
+
+    Returns:
+        str: The full telemetry directory name (with the path)
+    """
+
+    return get_local_file_name('telemetry')
+
+
+class Telemetry(object):
+    """
+    This class records telemetry events on the game loop and writes them on a background thread.
+
+    The game loop is the only thread recording events. The ring buffer needs no lock since the game loop only moves
+    its head and the writer thread only moves its tail.
+    """
+
+    def __init__(self, telemetry_dir, ring_size=RING_SIZE, max_file_bytes=MAX_FILE_BYTES, max_files=MAX_FILES):
+        """
+        Starts the writer thread. The recorded events are flushed when the interpreter exits.
+
+        Args:
+            telemetry_dir (str): The directory to write the telemetry files to. It is created if needed.
+            ring_size (int): The number of events the ring buffer holds. Defaults to RING_SIZE.
+            max_file_bytes (int): The size (in bytes) a file grows to before a new file is started. Defaults to
+                MAX_FILE_BYTES.
+            max_files (int): The number of files kept in the directory. Defaults to MAX_FILES.
+        """
+
+        if not os.path.isdir(telemetry_dir):
+            try:
+                os.makedirs(telemetry_dir)
+            except OSError:
+                # Another process may have created it in the meantime
+                if not os.path.isdir(telemetry_dir):
+                    raise
+
+        self.telemetry_dir = telemetry_dir
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+
+        self.ring = [None] * ring_size
+        self.ring_size = ring_size
+        # The number of events recorded and written so far. The events in between are waiting in the ring.
+        self.head = 0
+        self.tail = 0
+        self.num_of_dropped_events = 0
+        self.num_of_reported_dropped_events = 0
+
+        self.file_name_prefix = 'telemetry-{}-{}'.format(time.strftime('%Y%m%d-%H%M%S'), os.getpid())
+        self.num_of_files = 0
+        self.file_name = None
+
+        self.wakeup = threading.Event()
+        self.is_closed = False
+        self.thread = threading.Thread(target=self.run, name='Telemetry')
+        self.thread.daemon = True
+        self.thread.start()
+
+        atexit.register(self.close)
+
+    def record(self, event_type, **fields):
+        """
+        Records an event. The event is dropped if the ring buffer is full.
+
+        Args:
+            event_type (str): The type of the event (e.g. 'reveal')
+            **fields: The json serializable fields of the event
+        """
+
+        head = self.head
+        if head - self.tail >= self.ring_size:
+            self.num_of_dropped_events += 1
+            return
+
+        self.ring[head % self.ring_size] = (time.time(), event_type, fields)
+        self.head = head + 1
+        if head + 1 - self.tail == FLUSH_BATCH_SIZE:
+            self.wakeup.set()
+
+    def run(self):
+        """The writer thread. Writes the recorded events every FLUSH_INTERVAL seconds until the telemetry is closed."""
+        while not self.is_closed:
+            self.wakeup.wait(FLUSH_INTERVAL)
+            self.wakeup.clear()
+            self.flush()
+        self.flush()
+
+    def take_batch(self):
+        """
+        Takes the events waiting in the ring buffer. Their slots are free to be recorded into again.
+
+        Returns:
+            list<(float, str, dict)>: The time, type and fields of each event in the order they were recorded
+        """
+
+        head, tail = self.head, self.tail
+        start, end = tail % self.ring_size, head % self.ring_size
+        if head - tail == 0:
+            batch = []
+        elif start < end:
+            batch = self.ring[start:end]
+        else:
+            batch = self.ring[start:] + self.ring[:end]
+        self.tail = head
+        return batch
+
+    def flush(self):
+        """Writes the events waiting in the ring buffer. This runs on the writer thread."""
+        batch = self.take_batch()
+        num_of_dropped_events = self.num_of_dropped_events
+        if num_of_dropped_events != self.num_of_reported_dropped_events:
+            batch.append((time.time(), 'dropped', {'events': num_of_dropped_events
+                                                   - self.num_of_reported_dropped_events}))
+            self.num_of_reported_dropped_events = num_of_dropped_events
+        if not batch:
+            return
+
+        lines = []
+        for event_time, event_type, fields in batch:
+            event = dict(fields)
+            event['time'] = round(event_time, 3)
+            event['event'] = event_type
+            lines.append(json.dumps(event, separators=(',', ':')))
+        lines.append('')
+
+        try:
+            self.write('\n'.join(lines))
+        except (IOError, OSError):
+            logger.exception('Writing %d telemetry events failed', len(batch))
+
+    def write(self, data):
+        """
+        Appends data to the current telemetry file as a gzip member. Starts a new file once the current one is full.
+
+        Args:
+            data (str): The json lines
+        """
+
+        if self.file_name is None or os.path.getsize(self.file_name) >= self.max_file_bytes:
+            self.start_file()
+
+        telemetry_file = gzip.GzipFile(self.file_name, 'ab')
+        try:
+            telemetry_file.write(data)
+        finally:
+            telemetry_file.close()
+
+    def start_file(self):
+        """Starts a new telemetry file and deletes the oldest files beyond max_files"""
+        self.num_of_files += 1
+        self.file_name = os.path.join(self.telemetry_dir, '{}-{:04}.jsonl.gz'.format(self.file_name_prefix,
+                                                                                     self.num_of_files))
+        open(self.file_name, 'ab').close()
+
+        # The names start with the time, so they sort from the oldest to the newest
+        file_names = sorted(glob.glob(os.path.join(self.telemetry_dir, TELEMETRY_FILE_PATTERN)))
+        for file_name in file_names[:-self.max_files]:
+            try:
+                os.remove(file_name)
+            except OSError:
+                # Another process may have deleted it in the meantime
+                pass
+
+    def close(self):
+        """Writes every recorded event and stops the writer thread. Closing more than once does nothing."""
+        if not self.is_closed:
+            self.is_closed = True
+            self.wakeup.set()
+            self.thread.join()
+
+
+class NoTelemetry(object):
+    """
+    This class stands in for the telemetry when it is disabled. Recording does nothing.
+    """
+
+    def record(self, event_type, **fields):
+        """Does nothing"""
+        pass
+
+    def close(self):
+        """Does nothing"""
+        pass
+
+
+NO_TELEMETRY = NoTelemetry()
+
+
+def read_events(file_names):
+    """
+    Reads the events of telemetry files
+
+    Args:
+        file_names (list<str>): The telemetry files, from the oldest to the newest
+    Returns:
+        iterator<dict>: The events in the order they were recorded
+    """
+
+    for file_name in file_names:
+        telemetry_file = gzip.open(file_name, 'rb')
+        try:
+            for line in telemetry_file:
+                yield json.loads(line)
+        finally:
+            telemetry_file.close()
@@ -1,11 +1,16 @@
-"""This module contains the Tile class which represents a single tile on the Minesweeper board."""
+"""
+This module contains the Tile class which represents a single tile on the Minesweeper board.
+
+pygame is only imported when a tile is actually drawn so that headless boards (screen=None) do not need it.
+"""
 
-import pygame
 import logging
 from tile_reveal_result import TileRevealResult
 import display_params
+import fonts
 import pics
 import colors
+import frame_scheduler
 logger = logging.getLogger(__name__)
 
 
@@ -19,7 +24,7 @@ class Tile(object):
         Args:
             row (int): The row number of the tile
             col (int): The col number of the tile
-            screen (pygame.display): The screen on which to draw the rect
+            screen (pygame.display|None): The screen on which to draw the rect or None for a headless tile
             offset (int): The left most part of the board. Default is display_params.MARGIN_SIDE.
         """
 
@@ -33,6 +38,7 @@ class Tile(object):
         self.is_flagged = False
         self.is_mine = False
         self.is_hovered = False
+        self.is_hover_pressed = False
         self.value = 0
         self.color = None
         self.neighbors = []
@@ -42,9 +48,13 @@ class Tile(object):
         Args:
             offset (int): The left most part of the board
         Returns:
-            pygame.Rect: The location of the tile on the board
+            pygame.Rect|None: The location of the tile on the board or None for a headless tile
         """
 
+        if self.screen is None:
+            return None
+
+        import pygame
         left = display_params.RECT_SIZE * self.col + offset + 1
         top = display_params.RECT_SIZE * self.row + display_params.MARGIN_TOP + 1
         width = display_params.SPOT_SIZE
@@ -60,7 +70,9 @@ class Tile(object):
             color ((int, int, int)): The RGB color value. Defaults to GRAY.
         """
 
-        pygame.draw.rect(self.screen, color, self.location)
+        if self.screen is not None:
+            import pygame
+            frame_scheduler.add_dirty_rect(pygame.draw.rect(self.screen, color, self.location))
 
     def blit(self, content, background_color=None):
         """
@@ -71,9 +83,23 @@ class Tile(object):
             background_color ((int, int, int)): The RGB color value. Defaults to None.
         """
 
-        if background_color is not None:
-            self.draw(background_color)
-        self.screen.blit(content, self.location)
+        if self.screen is not None:
+            if background_color is not None:
+                self.draw(background_color)
+                self.screen.blit(content, self.location)
+            else:
+                frame_scheduler.add_dirty_rect(self.screen.blit(content, self.location))
+
+    def blit_pic(self, pic_name):
+        """
+        Print a picture on the tile. The picture is not even loaded for a headless tile.
+
+        Args:
+            pic_name (str): The name of the picture to show (e.g. pics.FLAG)
+        """
+
+        if self.screen is not None:
+            self.blit(pics.get_pic(pic_name))
 
     def set_mine(self):
         """Tag the tile as a mine. Add 1 to each neighbor's value."""
@@ -135,20 +161,26 @@ class Tile(object):
                 else:
                     self.show_value()
                     if self.value > 0:
-                        return TileRevealResult(non_mines_uncovered=1)
+                        return TileRevealResult(non_mines_uncovered=1, revealed_tiles=[self])
                     else:
-                        return TileRevealResult(non_mines_uncovered=1, additional_tiles_to_reveal=self.neighbors)
+                        return TileRevealResult(non_mines_uncovered=1, additional_tiles_to_reveal=self.neighbors,
+                                                revealed_tiles=[self])
 
     def show_value(self):
         """Player left clicked up on an unflagged non-mine. Show the value and mark as shown."""
         logger.debug('left_click_up {} show value'.format(str(self)))
         self.is_shown = True
-        text = display_params.BASIC_FONT.render(' {} '.format(' ' if self.value == 0 else self.value),
-                                                True,
-                                                self.color,
-                                                colors.SOFTWHITE)
+        if self.screen is None:
+            return
+        text = fonts.get_basic_font().render(' {} '.format(' ' if self.value == 0 else self.value), True,
+                                             self.color, colors.SOFTWHITE)
         self.blit(text, background_color=colors.SOFTWHITE)
 
+    def hide(self):
+        """Hides the value of the tile again. This is used to undo a move."""
+        self.is_shown = False
+        self.draw_hidden()
+
     def toggle_flag(self):
         """
         Toggles the flag state
@@ -159,39 +191,44 @@ class Tile(object):
 
         if not self.is_shown:
             self.is_flagged = not self.is_flagged
-            if self.is_flagged:
-                self.blit(pics.FLAG)
-                return -1
-            else:
-                self.draw(colors.GRAY)
-                return 1
+            self.draw_hidden()
+            return -1 if self.is_flagged else 1
 
         return 0
 
     def hover(self, is_left_mouse_down):
         """
         If the tile is not already shown, change the color appropriately.
+        Nothing is redrawn if the tile is already hovered and its look would not change.
 
         Args:
             is_left_mouse_down (bool): Is the left mouse down.
         """
-        if not self.is_hovered:
-            self.is_hovered = True
-            if not self.is_shown:
-                if self.is_flagged:
-                    self.blit(pics.FLAG_SCROLL)
-                else:
-                    self.draw(colors.SOFTWHITE if is_left_mouse_down else colors.LIGHTGRAY)
+
+        if self.is_hovered and (self.is_hover_pressed == is_left_mouse_down or self.is_flagged):
+            self.is_hover_pressed = is_left_mouse_down
+            return
+
+        self.is_hovered = True
+        self.is_hover_pressed = is_left_mouse_down
+        self.draw_hidden()
 
     def unhover(self):
         """If the tile is not already shown, return to base state."""
         if self.is_hovered:
             self.is_hovered = False
-            if not self.is_shown:
-                if self.is_flagged:
-                    self.blit(pics.FLAG)
-                else:
-                    self.draw(colors.GRAY)
+            self.is_hover_pressed = False
+            self.draw_hidden()
+
+    def draw_hidden(self):
+        """Draws the tile according to its flag and hover state. Does nothing if the tile is already shown."""
+        if not self.is_shown:
+            if self.is_flagged:
+                self.blit_pic(pics.FLAG_SCROLL if self.is_hovered else pics.FLAG)
+            elif self.is_hovered:
+                self.draw(colors.SOFTWHITE if self.is_hover_pressed else colors.LIGHTGRAY)
+            else:
+                self.draw(colors.GRAY)
 
     def is_fully_flagged(self):
         """
@@ -213,13 +250,13 @@ class Tile(object):
 
         if self.is_mine:
             if self.is_flagged:
-                self.blit(pics.FLAG_MINE)
+                self.blit_pic(pics.FLAG_MINE)
             elif is_losing_tile:
-                self.blit(pics.RED_MINE)
+                self.blit_pic(pics.RED_MINE)
             else:
-                self.blit(pics.MINE)
+                self.blit_pic(pics.MINE)
         elif self.is_flagged:
-            self.blit(pics.FLAG_X)
+            self.blit_pic(pics.FLAG_X)
 
     def __str__(self):
         return 'Tile(row={}, col={}, value={}, is_mine={})'.format(self.row, self.col, self.value, self.is_mine)
@@ -10,7 +10,8 @@ class TileRevealResult(object):
     It supports adding together objects of the class. This is useful for combining the results of a shortcut click.
     """
 
-    def __init__(self, non_mines_uncovered=0, hit_mine=False, mine_tiles=None, additional_tiles_to_reveal=None):
+    def __init__(self, non_mines_uncovered=0, hit_mine=False, mine_tiles=None, additional_tiles_to_reveal=None,
+                 revealed_tiles=None):
         """
         Initialize a TileRevealResult object.
 
@@ -21,12 +22,15 @@ class TileRevealResult(object):
                 contained a mine. Defaults to None.
             additional_tiles_to_reveal (list<Tile>|deque<Tile>|None): A list or deque of tiles that should also be
                 revealed or None if no additional tiles need to be revealed. Defaults to None.
+            revealed_tiles (list<Tile>|None): A list of the non-mine tiles uncovered by the click or None if no tiles
+                were uncovered. Defaults to None.
         """
         self.non_mines_uncovered = non_mines_uncovered
         self.hit_mine = hit_mine
         self.mine_tiles = [] if mine_tiles is None else mine_tiles
         self.additional_tiles_to_reveal = deque() if additional_tiles_to_reveal is None else \
             deque(additional_tiles_to_reveal)
+        self.revealed_tiles = [] if revealed_tiles is None else revealed_tiles
 
     def __add__(self, other):
         """
@@ -48,7 +52,29 @@ class TileRevealResult(object):
         return TileRevealResult(self.non_mines_uncovered + other.non_mines_uncovered,
                                 self.hit_mine or other.hit_mine,
                                 self.mine_tiles + other.mine_tiles,
-                                self.additional_tiles_to_reveal)
+                                self.additional_tiles_to_reveal,
+                                self.revealed_tiles + other.revealed_tiles)
+
+    def __iadd__(self, other):
+        """
+        Supports adding another TileRevealResult object to self in place. Unlike +, this does not copy the lists of
+        tiles, so accumulating a cascade of n tiles costs O(n) rather than O(n^2).
+
+        Args:
+            other (TileRevealResult|any): Another TileRevealResult object to add to self.
+                Any other object is ignored.
+        Returns:
+            (TileRevealResult): self
+        """
+        if not isinstance(other, TileRevealResult):
+            return self
+
+        self.non_mines_uncovered += other.non_mines_uncovered
+        self.hit_mine = self.hit_mine or other.hit_mine
+        self.mine_tiles.extend(other.mine_tiles)
+        self.additional_tiles_to_reveal.extend(other.additional_tiles_to_reveal)
+        self.revealed_tiles.extend(other.revealed_tiles)
+        return self
 
     def __radd__(self, other):
         """
@@ -68,9 +94,9 @@ class TileRevealResult(object):
     def __str__(self):
         """Get the string representation of the object."""
         format_str = 'TileRevealResult(non_mines_uncovered={}, hit_mine={}, mine_tiles={}, ' + \
-                     'additional_tiles_to_reveal={})'
+                     'additional_tiles_to_reveal={}, revealed_tiles={})'
         return format_str.format(self.non_mines_uncovered, self.hit_mine, self.mine_tiles,
-                                 self.additional_tiles_to_reveal)
+                                 self.additional_tiles_to_reveal, self.revealed_tiles)
 
 
 # TODO - move this to a test file
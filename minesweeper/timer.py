@@ -1,9 +1,21 @@
-"""This module contains the Timer class which controls the timer for the Minesweeper game."""
+"""
+This module contains the Timer class which controls the timer for the Minesweeper game.
+
+The play time is measured by a GameClock, independent of how often the screen is redrawn. The timer only wakes the game
+loop up when the shown seconds change.
+"""
 
 import pygame
+from pygame.locals import USEREVENT
 import display_params
 import colors
+import fonts
 import pics
+import frame_scheduler
+from game_clock import GameClock
+
+# The event posted when the shown seconds are due to change so that the game loop wakes up to update the timer
+TIMER_EVENT = USEREVENT
 
 
 class Timer(object):
@@ -20,14 +32,21 @@ class Timer(object):
         self.screen = screen
 
         self.seconds = 0
-        self.milliseconds = 0
+        self.clock = GameClock()
 
         # Print the initial timer
         self.rect = self.get_rect()
         self.draw_clock_symbol()
         self.print_time()
 
-        self.counter_clock = None
+    @property
+    def milliseconds(self):
+        """
+        Returns:
+            int: The play time in milliseconds
+        """
+
+        return self.clock.get_milliseconds()
 
     def get_rect(self):
         """
@@ -42,31 +61,59 @@ class Timer(object):
     def draw_clock_symbol(self):
         """Draws the clock symbol"""
         screen_width, screen_height = self.screen.get_size()
-        left = screen_width - display_params.MARGIN_SIDE - self.get_timer_text().get_width() - pics.CLOCK.get_width() \
-            - 10
+        left = screen_width - display_params.MARGIN_SIDE - self.get_timer_text().get_width() \
+            - pics.get_pic(pics.CLOCK).get_width() - 10
         top = screen_height - 52
-        self.screen.blit(pics.CLOCK, (left, top))
+        frame_scheduler.add_dirty_rect(self.screen.blit(pics.get_pic(pics.CLOCK), (left, top)))
 
     def print_time(self):
         """Prints the time on the timer rect"""
-        pygame.draw.rect(self.screen, colors.GRAY, self.rect)
+        frame_scheduler.add_dirty_rect(pygame.draw.rect(self.screen, colors.GRAY, self.rect))
         self.screen.blit(self.get_timer_text(), self.rect)
 
     def get_timer_text(self):
         """
         Returns:
-            pygame.font.SysFont: The formatted timer value in seconds to show on the screen
+            pygame.Surface: The formatted timer value in seconds to show on the screen
         """
 
-        return display_params.COUNTER_FONT.render(str(self.seconds).zfill(3), True, colors.BLACK, colors.GRAY)
+        return fonts.get_counter_font().render(str(self.seconds).zfill(3), True, colors.BLACK, colors.GRAY)
 
     def init_clock(self):
-        """Initialize the timer. This should be called after the player reveals the first tile."""
-        self.counter_clock = pygame.time.Clock()
+        """Starts the clock. This should be called after the player reveals the first tile."""
+        self.clock.start()
+        self.schedule_update()
 
-    def update(self):
-        """Updates the timer. Limits the frame rate of the game to display_params.FRAME_RATE per second."""
-        self.milliseconds += self.counter_clock.tick(display_params.FRAME_RATE)
-        if self.milliseconds > 1000 * self.seconds and self.seconds < 999:
-            self.seconds = int(self.milliseconds / 1000.0)
+    def resume_clock(self, milliseconds):
+        """
+        Continues the timer of a restored game
+
+        Args:
+            milliseconds (int): The game time when the game was saved
+        """
+
+        self.clock.start(milliseconds)
+        self.update()
+
+    def stop_clock(self):
+        """Stops the clock and the timer events. This should be called when the game ends."""
+        self.clock.stop()
+        pygame.time.set_timer(TIMER_EVENT, 0)
+        self.update_seconds()
+
+    def schedule_update(self):
+        """Posts the next timer event just after the shown seconds change"""
+        pygame.time.set_timer(TIMER_EVENT, 1000 - self.milliseconds % 1000 + 1)
+
+    def update_seconds(self):
+        """Prints the time if the shown seconds changed"""
+        seconds = min(self.milliseconds / 1000, 999)
+        if seconds != self.seconds:
+            self.seconds = seconds
             self.print_time()
+
+    def update(self):
+        """Updates the timer and schedules the next update while the clock is running"""
+        self.update_seconds()
+        if self.clock.is_running():
+            self.schedule_update()
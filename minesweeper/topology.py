@@ -0,0 +1,206 @@
+"""
+This module defines the grid topologies a board can have: which tiles are the neighbors of a tile.
+
+Each topology is an adjacency table, built once per (topology, rows, cols) and cached up to MAX_CACHED_BYTES, so
+starting another game of the same size does not compute the neighbors again. Revealing, chording and counting mines
+only follow tile.neighbors, which Board.set_neighbors fills in from the table, so they work on every topology unchanged.
+
+A table is two flat arrays of tile indices (row * cols + col): the neighbors of every tile one after the other, and
+where the neighbors of each tile start. It takes 4 bytes per neighbor, far less than a tuple per tile.
+
+    rect: the 8 tiles around a tile, within the board
+    torus: the 8 tiles around a tile, wrapping around the edges of the board
+    hex: the 6 tiles around a hexagon. Odd rows are shifted half a tile to the right.
+    four: the 4 tiles sharing an edge with a tile, within the board
+"""
+
+from array import array
+from collections import namedtuple, OrderedDict
+
+RECTANGULAR = 'rect'
+TORUS = 'torus'
+HEXAGONAL = 'hex'
+FOUR_CONNECTED = 'four'
+
+# The (row, col) offsets of the neighbors. The rectangular order is the order the neighbors always had.
+RECTANGULAR_DIRECTIONS = ((-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0))
+FOUR_CONNECTED_DIRECTIONS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+# A hexagon in an even row has its upper and lower neighbors to the left, in an odd (shifted) row to the right
+EVEN_ROW_HEXAGONAL_DIRECTIONS = ((-1, -1), (-1, 0), (0, -1), (0, 1), (1, -1), (1, 0))
+ODD_ROW_HEXAGONAL_DIRECTIONS = ((-1, 0), (-1, 1), (0, -1), (0, 1), (1, 0), (1, 1))
+
+# The total size (in bytes) of the adjacency tables kept. The rectangular table of a 2000x2000 board takes about
+# 140 MB, so tables that big are never kept.
+MAX_CACHED_BYTES = 64 * 1024 ** 2
+
+# The adjacency table of a topology. The neighbors of tile i are neighbors[offsets[i]:offsets[i + 1]].
+AdjacencyTable = namedtuple('AdjacencyTable', 'offsets neighbors')
+
+# The cached adjacency tables keyed by (topology, rows, cols), from the least to the most recently used
+ADJACENCY_TABLES = OrderedDict()
+
+
+def get_adjacency_table(topology, rows, cols):
+    """
+    Gets the adjacency table of a topology, building it if it is not cached
+
+    Args:
+        topology (str): The topology (e.g. RECTANGULAR)
+        rows (int): The total number of rows on the board
+        cols (int): The total number of columns on the board
+    Returns:
+        AdjacencyTable: The adjacency table
+    Raises:
+        ValueError: There is no such topology
+    """
+
+    key = (topology, rows, cols)
+    if key in ADJACENCY_TABLES:
+        adjacency_table = ADJACENCY_TABLES.pop(key)
+    else:
+        if topology not in TOPOLOGIES:
+            raise ValueError('unknown topology {}. Choose from {}'.format(topology, ','.join(sorted(TOPOLOGIES))))
+        adjacency_table = TOPOLOGIES[topology](rows, cols)
+        if get_table_size(adjacency_table) > MAX_CACHED_BYTES:
+            return adjacency_table
+
+    ADJACENCY_TABLES[key] = adjacency_table
+    while get_cached_table_size() > MAX_CACHED_BYTES:
+        ADJACENCY_TABLES.popitem(last=False)
+    return adjacency_table
+
+
+def get_table_size(adjacency_table):
+    """
+    Args:
+        adjacency_table (AdjacencyTable): An adjacency table
+    Returns:
+        int: The size (in bytes) of the arrays of the table
+    """
+
+    return sum(len(indices) * indices.itemsize for indices in adjacency_table)
+
+
+def get_cached_table_size():
+    """
+    Returns:
+        int: The total size (in bytes) of the cached adjacency tables
+    """
+
+    return sum(get_table_size(adjacency_table) for adjacency_table in ADJACENCY_TABLES.itervalues())
+
+
+def build_bounded_table(rows, cols, directions):
+    """
+    Builds the adjacency table of a grid whose neighbors end at the edges of the board
+
+    Args:
+        rows (int): The total number of rows on the board
+        cols (int): The total number of columns on the board
+        directions (tuple<(int, int)>): The (row, col) offsets of the neighbors
+    Returns:
+        AdjacencyTable: The adjacency table
+    """
+
+    offsets = array('i', [0])
+    neighbors = array('i')
+    for row in xrange(rows):
+        row_directions = [(row_offset * cols + col_offset, col_offset) for row_offset, col_offset in directions
+                          if 0 <= row + row_offset < rows]
+        index = row * cols
+        for col in xrange(cols):
+            neighbors.extend(index + index_offset for index_offset, col_offset in row_directions
+                             if 0 <= col + col_offset < cols)
+            offsets.append(len(neighbors))
+            index += 1
+    return AdjacencyTable(offsets, neighbors)
+
+
+def build_rectangular_table(rows, cols):
+    """
+    Args:
+        rows (int): The total number of rows on the board
+        cols (int): The total number of columns on the board
+    Returns:
+        AdjacencyTable: The 8-connected adjacency table
+    """
+
+    return build_bounded_table(rows, cols, RECTANGULAR_DIRECTIONS)
+
+
+def build_four_connected_table(rows, cols):
+    """
+    Args:
+        rows (int): The total number of rows on the board
+        cols (int): The total number of columns on the board
+    Returns:
+        AdjacencyTable: The 4-connected adjacency table
+    """
+
+    return build_bounded_table(rows, cols, FOUR_CONNECTED_DIRECTIONS)
+
+
+def build_torus_table(rows, cols):
+    """
+    Args:
+        rows (int): The total number of rows on the board
+        cols (int): The total number of columns on the board
+    Returns:
+        AdjacencyTable: The 8-connected adjacency table wrapping around the edges. On boards less than 3 tiles high
+            or wide, a tile reached from two sides is only counted once and a tile is never its own neighbor.
+    """
+
+    offsets = array('i', [0])
+    neighbors = array('i')
+    for row in xrange(rows):
+        for col in xrange(cols):
+            index = row * cols + col
+            tile_neighbors = []
+            for row_offset, col_offset in RECTANGULAR_DIRECTIONS:
+                neighbor = (row + row_offset) % rows * cols + (col + col_offset) % cols
+                if neighbor != index and neighbor not in tile_neighbors:
+                    tile_neighbors.append(neighbor)
+            neighbors.extend(tile_neighbors)
+            offsets.append(len(neighbors))
+    return AdjacencyTable(offsets, neighbors)
+
+
+def build_hexagonal_table(rows, cols):
+    """
+    Args:
+        rows (int): The total number of rows on the board
+        cols (int): The total number of columns on the board
+    Returns:
+        AdjacencyTable: The adjacency table of hexagons laid out in rows, with the odd rows shifted half a tile right
+    """
+
+    offsets = array('i', [0])
+    neighbors = array('i')
+    for row in xrange(rows):
+        directions = ODD_ROW_HEXAGONAL_DIRECTIONS if row % 2 else EVEN_ROW_HEXAGONAL_DIRECTIONS
+        for col in xrange(cols):
+            neighbors.extend((row + row_offset) * cols + col + col_offset for row_offset, col_offset in directions
+                             if 0 <= row + row_offset < rows and 0 <= col + col_offset < cols)
+            offsets.append(len(neighbors))
+    return AdjacencyTable(offsets, neighbors)
+
+
+def is_row_shifted(topology, row):
+    """
+    Args:
+        topology (str): The topology
+        row (int): A row of the board
+    Returns:
+        bool: Is the row drawn half a tile to the right?
+    """
+
+    return topology == HEXAGONAL and row % 2 == 1
+
+
+# The adjacency table builders keyed by topology
+TOPOLOGIES = {
+    RECTANGULAR: build_rectangular_table,
+    TORUS: build_torus_table,
+    HEXAGONAL: build_hexagonal_table,
+    FOUR_CONNECTED: build_four_connected_table,
+}
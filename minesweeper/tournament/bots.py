@@ -0,0 +1,135 @@
+"""
+This module contains the bots which play headless Minesweeper games in a tournament.
+
+A bot is a class with a no argument constructor and a play(game, start_tile_index, rng) method which plays a
+HeadlessGame until it is over. The first move should reveal start_tile_index, which is never a mine and never next to
+one. Besides the built-in bots, any bot can be named as module:Class, e.g. my_bots:CleverBot.
+"""
+
+import importlib
+from collections import deque
+
+
+class RandomBot(object):
+    """
+    This class reveals random tiles until the game is over. It is the baseline every other bot should beat.
+    """
+
+    def play(self, game, start_tile_index, rng):
+        """
+        Args:
+            game (HeadlessGame): The game to play
+            start_tile_index (int): The tile index to reveal first
+            rng (random.Random): The random number generator picking the guesses
+        """
+
+        game.reveal(start_tile_index)
+        while not game.is_game_over:
+            game.reveal(game.get_tile_index(rng.choice(get_hidden_tiles(game))))
+
+
+class SolverBot(object):
+    """
+    This class plays the safe moves that follow from a single numbered tile and guesses when there are none.
+
+    A numbered tile whose value equals its flagged neighbors is chorded and one whose value equals its flagged and
+    hidden neighbors gets all of them flagged. Only the tiles next to a change are checked again, so a game costs
+    O(tiles) apart from the guesses.
+    """
+
+    def play(self, game, start_tile_index, rng):
+        """
+        Args:
+            game (HeadlessGame): The game to play
+            start_tile_index (int): The tile index to reveal first
+            rng (random.Random): The random number generator picking the guesses
+        """
+
+        tiles_to_check = deque()
+        self.add_revealed_tiles(tiles_to_check, game.reveal(start_tile_index).revealed_tiles)
+
+        while not game.is_game_over:
+            if not tiles_to_check:
+                guess = rng.choice(get_hidden_tiles(game))
+                self.add_revealed_tiles(tiles_to_check, game.reveal(game.get_tile_index(guess)).revealed_tiles)
+                continue
+
+            tile = tiles_to_check.popleft()
+            hidden_neighbors = [neighbor for neighbor in tile.neighbors
+                                if not neighbor.is_shown and not neighbor.is_flagged]
+            if tile.value == 0 or not hidden_neighbors:
+                continue
+
+            num_of_flagged_neighbors = sum(neighbor.is_flagged for neighbor in tile.neighbors)
+            if num_of_flagged_neighbors == tile.value:
+                self.add_revealed_tiles(tiles_to_check, game.chord(game.get_tile_index(tile)).revealed_tiles)
+            elif num_of_flagged_neighbors + len(hidden_neighbors) == tile.value:
+                for neighbor in hidden_neighbors:
+                    game.flag(game.get_tile_index(neighbor))
+                    tiles_to_check.extend(get_shown_neighbors(neighbor))
+
+    @staticmethod
+    def add_revealed_tiles(tiles_to_check, revealed_tiles):
+        """
+        Queues the revealed tiles and their shown neighbors, which have one hidden neighbor less, to be checked
+
+        Args:
+            tiles_to_check (deque<Tile>): The tiles to check
+            revealed_tiles (list<Tile>): The tiles a move revealed
+        """
+
+        for tile in revealed_tiles:
+            tiles_to_check.append(tile)
+            tiles_to_check.extend(get_shown_neighbors(tile))
+
+
+def get_hidden_tiles(game):
+    """
+    Args:
+        game (HeadlessGame): The game
+    Returns:
+        list<Tile>: The tiles which are neither shown nor flagged
+    """
+
+    return [tile for tile in game.board.flattened_board if not tile.is_shown and not tile.is_flagged]
+
+
+def get_shown_neighbors(tile):
+    """
+    Args:
+        tile (Tile): A tile
+    Returns:
+        list<Tile>: The shown numbered neighbors of the tile
+    """
+
+    return [neighbor for neighbor in tile.neighbors if neighbor.is_shown and neighbor.value > 0]
+
+
+# The built-in bots keyed by name
+BOTS = {
+    'random': RandomBot,
+    'solver': SolverBot,
+}
+
+
+def get_bot_class(bot_name):
+    """
+    Args:
+        bot_name (str): The name of a built-in bot or module:Class
+    Returns:
+        type: The bot class
+    Raises:
+        ValueError: There is no such bot
+    """
+
+    if bot_name in BOTS:
+        return BOTS[bot_name]
+    if ':' not in bot_name:
+        raise ValueError('unknown bot {}. Choose from {} or name a bot as module:Class'.format(
+            bot_name, ','.join(sorted(BOTS))))
+
+    module_name, class_name = bot_name.split(':', 1)
+    try:
+        return getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError) as e:
+        raise ValueError('cannot load bot {}: {}'.format(bot_name, e))
@@ -0,0 +1,195 @@
+"""
+This module runs tournaments where bots play the same seeded boards on a pool of worker processes.
+
+The mine layouts of all the boards are generated once, before the workers start, and packed as bitsets into a single
+shared memory array. The workers inherit the array when they are forked, so a game only sends the bot name and the
+board number to a worker and its result back; the boards are neither regenerated nor pickled. Every board is laid out
+around the same start tile, which the bots reveal first, so all the bots play exactly the same games.
+"""
+
+import multiprocessing
+import random
+from collections import namedtuple
+from multiprocessing.sharedctypes import RawArray
+from timeit import default_timer
+from headless_game import HeadlessGame
+from bots import get_bot_class, BOTS
+import bitset
+
+# The number of chunks of games handed out per worker process. More chunks balance the load better, fewer cost less
+# to hand out.
+CHUNKS_PER_PROCESS = 8
+
+# The result of a single game. milliseconds is the time the bot took to play it, not counting setting up the board.
+GameResult = namedtuple('GameResult', 'bot_name board_number is_won milliseconds num_of_clicks bbbv')
+
+# The boards of the tournament. mine_bits holds the mine bitset of every board, one after the other.
+TournamentBoards = namedtuple('TournamentBoards', 'rows cols mines start_tile_index seeds bbbvs mine_bits')
+
+# The boards of the running tournament, inherited by the worker processes
+shared_boards = None
+
+# The bots of a worker process keyed by name
+worker_bots = {}
+
+
+class BotStanding(object):
+    """
+    This class sums up the games of a single bot
+    """
+
+    def __init__(self, bot_name):
+        """
+        Args:
+            bot_name (str): The name of the bot
+        """
+
+        self.bot_name = bot_name
+        self.games = 0
+        self.wins = 0
+        self.total_milliseconds = 0
+        self.total_clicks = 0
+        self.total_win_3bv = 0
+        self.total_win_milliseconds = 0
+
+    def add_game(self, game_result):
+        """
+        Args:
+            game_result (GameResult): A game of the bot
+        """
+
+        self.games += 1
+        self.total_milliseconds += game_result.milliseconds
+        self.total_clicks += game_result.num_of_clicks
+        if game_result.is_won:
+            self.wins += 1
+            self.total_win_3bv += game_result.bbbv
+            self.total_win_milliseconds += game_result.milliseconds
+
+    def get_summary(self):
+        """
+        Returns:
+            dict: The win rate, mean time and clicks per game and the 3BV per second of the won games
+        """
+
+        return {
+            'bot': self.bot_name,
+            'games': self.games,
+            'wins': self.wins,
+            'win_rate': float(self.wins) / self.games if self.games else 0,
+            'mean_milliseconds': float(self.total_milliseconds) / self.games if self.games else 0,
+            'mean_clicks': float(self.total_clicks) / self.games if self.games else 0,
+            '3bv_per_second': (1000.0 * self.total_win_3bv / self.total_win_milliseconds
+                               if self.total_win_milliseconds else 0),
+        }
+
+
+def generate_boards(rows, cols, mines, num_of_boards, seed=None):
+    """
+    Lays out the mines of the tournament boards into shared memory
+
+    Args:
+        rows (int): The total number of rows on the board
+        cols (int): The total number of columns on the board
+        mines (int): The total number of mines on the board
+        num_of_boards (int): The number of boards
+        seed (int|None): The seed the board seeds are drawn from or None for random boards. Defaults to None.
+    Returns:
+        TournamentBoards: The boards
+    """
+
+    size = rows * cols
+    num_of_bytes = bitset.get_num_of_bytes(size)
+    start_tile_index = rows / 2 * cols + cols / 2
+    rng = random.Random(seed)
+
+    seeds = []
+    bbbvs = []
+    mine_bits = RawArray('B', num_of_bytes * num_of_boards)
+    for board_number in xrange(num_of_boards):
+        board_seed = rng.getrandbits(32)
+        game = HeadlessGame(rows, cols, mines, board_seed)
+        game.board.first_click(game.get_tile(start_tile_index))
+
+        offset = board_number * num_of_bytes
+        mine_bits[offset:offset + num_of_bytes] = bitset.pack(
+            (index for index, tile in enumerate(game.board.flattened_board) if tile.is_mine), size)
+        seeds.append(board_seed)
+        bbbvs.append(game.board.get_3bv())
+
+    return TournamentBoards(rows, cols, mines, start_tile_index, seeds, bbbvs, mine_bits)
+
+
+def play_game(task):
+    """
+    Plays a single tournament game on the shared boards. This runs in the worker processes.
+
+    Args:
+        task ((str, int)): The bot name and the board number
+    Returns:
+        GameResult: The result of the game
+    """
+
+    bot_name, board_number = task
+    boards = shared_boards
+    size = boards.rows * boards.cols
+    num_of_bytes = bitset.get_num_of_bytes(size)
+    offset = board_number * num_of_bytes
+
+    if bot_name not in worker_bots:
+        worker_bots[bot_name] = get_bot_class(bot_name)()
+
+    game = HeadlessGame(boards.rows, boards.cols, boards.mines, boards.seeds[board_number])
+    game.set_mine_layout(bitset.unpack(bytearray(boards.mine_bits[offset:offset + num_of_bytes]), size))
+    start_time = default_timer()
+    worker_bots[bot_name].play(game, boards.start_tile_index, random.Random(boards.seeds[board_number]))
+    milliseconds = (default_timer() - start_time) * 1000
+
+    return GameResult(bot_name, board_number, game.is_game_over and not game.is_game_lost, milliseconds,
+                      game.num_of_clicks, boards.bbbvs[board_number])
+
+
+def run_tournament(bot_names, boards, processes=None):
+    """
+    Plays every bot on every board in parallel
+
+    Args:
+        bot_names (list<str>): The bots (see bots.get_bot_class). Each bot plays once even if it is named twice.
+        boards (TournamentBoards): The boards
+        processes (int|None): The number of worker processes or None to use one per CPU. With 1 process, the games are
+            played in this process. Defaults to None.
+    Returns:
+        list<BotStanding>: The standing of each bot in the order of bot_names
+    Raises:
+        ValueError: A bot does not exist
+    """
+
+    global shared_boards
+
+    bot_names = [bot_name for i, bot_name in enumerate(bot_names) if bot_name not in bot_names[:i]]
+    for bot_name in bot_names:
+        get_bot_class(bot_name)
+
+    # Interleaving the bots spreads the slow bots evenly over the chunks
+    tasks = [(bot_name, board_number) for board_number in xrange(len(boards.seeds)) for bot_name in bot_names]
+    standings = dict((bot_name, BotStanding(bot_name)) for bot_name in bot_names)
+
+    shared_boards = boards
+    try:
+        if processes == 1:
+            for game_result in (play_game(task) for task in tasks):
+                standings[game_result.bot_name].add_game(game_result)
+        else:
+            processes = processes or multiprocessing.cpu_count()
+            pool = multiprocessing.Pool(processes)
+            try:
+                chunk_size = max(1, len(tasks) / (processes * CHUNKS_PER_PROCESS))
+                for game_result in pool.imap_unordered(play_game, tasks, chunk_size):
+                    standings[game_result.bot_name].add_game(game_result)
+            finally:
+                pool.close()
+                pool.join()
+    finally:
+        shared_boards = None
+
+    return [standings[bot_name] for bot_name in bot_names]
@@ -0,0 +1,52 @@
+"""
+This module encodes and decodes unsigned varints, which store small numbers (such as tile indices and delays) in
+fewer bytes than fixed size integers.
+
+Varints are unsigned LEB128: 7 bits per byte, least significant first, the high bit set on all but the last byte.
+"""
+
+
+class TruncatedError(ValueError):
+    """Raised when the data ends in the middle of a value"""
+    pass
+
+
+def encode(value, output):
+    """
+    Appends an unsigned varint to a bytearray
+
+    Args:
+        value (int): The non negative value to encode
+        output (bytearray): The bytearray to append to
+    """
+
+    while value > 0x7f:
+        output.append(value & 0x7f | 0x80)
+        value >>= 7
+    output.append(value)
+
+
+def decode(data, offset):
+    """
+    Decodes an unsigned varint
+
+    Args:
+        data (bytearray): The data to decode from
+        offset (int): The offset of the varint in the data
+    Returns:
+        (int, int): The value and the offset right after the varint
+    Raises:
+        TruncatedError: The data ends in the middle of the varint
+    """
+
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise TruncatedError('truncated varint')
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7